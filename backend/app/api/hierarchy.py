@@ -0,0 +1,115 @@
+"""University hierarchy API endpoints."""
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, raiseload, selectinload
+from app.core.auth import get_current_user
+from app.core.metrics import phase
+from app.core.query_counter import count_queries, install_query_counter
+from app.database import get_db
+from app.models import Batch, Department, Faculty, University
+
+router = APIRouter()
+
+# Hook the Engine class, so the lazily created engine is covered too
+install_query_counter(Engine)
+
+# Relationship followed at each level of the tree, and the key it is served under
+LEVELS = [
+    (University.faculties, "faculties"),
+    (Faculty.departments, "departments"),
+    (Department.batches, "batches"),
+    (Batch.routines, "routines"),
+]
+MAX_DEPTH = len(LEVELS)
+
+
+def tree_options(depth: int) -> list:
+    """
+    Loader options that fetch ``depth`` levels below a university.
+
+    Each level is one ``selectinload``: a ``SELECT ... WHERE parent_id IN
+    (...)`` per level (SQLAlchemy splits the IN list every 500 parents), so
+    the query count depends on the depth, not on the number of rows.
+    Anything deeper raises instead of lazy loading.
+    """
+    options = []
+    if depth:
+        loader = selectinload(LEVELS[0][0])
+        for relationship, _ in LEVELS[1:depth]:
+            loader = loader.selectinload(relationship)
+        options.append(loader)
+    options.append(raiseload("*"))
+    return options
+
+
+def _columns(obj: Any) -> dict[str, Any]:
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def serialize_tree(obj: Any, depth: int, level: int = 0) -> dict[str, Any]:
+    """Turn an eagerly loaded model into nested dicts, ``depth`` levels deep."""
+    node = _columns(obj)
+    if level < depth:
+        relationship, key = LEVELS[level]
+        node[key] = [
+            serialize_tree(child, depth, level + 1)
+            for child in getattr(obj, relationship.key)
+        ]
+    return node
+
+
+@router.get("/")
+def list_universities(
+    db: Session = Depends(get_db),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    List universities (id and name).
+
+    Requires authentication.
+    """
+    with count_queries() as queries, phase("repo"):
+        rows = db.execute(select(University.id, University.name).order_by(University.id)).all()
+    return ORJSONResponse(
+        [{"id": row.id, "name": row.name} for row in rows],
+        headers={"X-Query-Count": str(queries.value)},
+    )
+
+
+@router.get("/{university_id}/tree")
+def get_university_tree(
+    university_id: int,
+    depth: int = Query(
+        default=MAX_DEPTH,
+        ge=0,
+        le=MAX_DEPTH,
+        description="Levels to include: 1 faculties, 2 departments, 3 batches, 4 routines"
+    ),
+    db: Session = Depends(get_db),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Get a university with its faculties, departments, batches and routines.
+
+    Requires authentication.
+    Every level is eager-loaded with one query, so the response needs at
+    most ``depth + 1`` queries regardless of the size of the university
+    (reported in the X-Query-Count header). Returns 404 if the university
+    does not exist.
+    """
+    with count_queries() as queries:
+        with phase("repo"):
+            university = db.execute(
+                select(University).where(University.id == university_id).options(*tree_options(depth))
+            ).scalar_one_or_none()
+        if university is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"University with id {university_id} not found"
+            )
+        with phase("serialize"):
+            tree = serialize_tree(university, depth)
+    return ORJSONResponse(tree, headers={"X-Query-Count": str(queries.value)})
@@ -0,0 +1,28 @@
+"""Runtime metrics endpoints."""
+from fastapi import APIRouter
+from app.core.jwt import get_token_cache_stats
+from app.core.logging import logging_stats
+from app.api import notifications, routines
+from app.database import pool_stats
+from app.repos.cached_routines_repo import CachedRoutinesRepo
+
+router = APIRouter()
+
+
+@router.get("/")
+def get_metrics():
+    """
+    Get in-process cache and performance counters.
+    
+    Counters are per worker process and reset on restart.
+    """
+    cache = routines.repo
+    return {
+        "auth_token_cache": get_token_cache_stats(),
+        "routines_cache": cache.stats() if isinstance(cache, CachedRoutinesRepo) else None,
+        "routines_coalescing": routines.coalescer.stats() if routines.coalescer is not None else None,
+        "database_pool": pool_stats(),
+        "logging": logging_stats(),
+        "change_feed": routines.change_hub.stats(),
+        "notifications": notifications.scheduler.stats(),
+    }
@@ -1,15 +1,122 @@
-from fastapi import APIRouter
+from datetime import datetime, timezone
+from typing import Dict, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field, model_validator
+from app.api.routines import repo
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.events import routine_events
+from app.core.reminders import ReminderScheduler, create_sink
 
 router = APIRouter()
 
-@router.get("/")
-def get_all_notifications():
-    return {"data": []}
+scheduler = ReminderScheduler(
+    create_sink(settings.NOTIFICATIONS_SINK_URL),
+    lead_minutes=settings.NOTIFICATIONS_LEAD_MINUTES,
+    tz=settings.TIMETABLE_TIMEZONE,
+    batch_size=settings.NOTIFICATIONS_BATCH_SIZE,
+    tick=settings.NOTIFICATIONS_TICK_SECONDS,
+)
+if settings.NOTIFICATIONS_ENABLED:
+    routine_events.subscribe(scheduler.on_change)
+
+
+class NotificationCreate(BaseModel):
+    """Request body for a reminder: before a routine's class each week, or once at a given time."""
+    routine_id: int | None = Field(None, description="Remind before this routine's weekly class")
+    minutes_before: int = Field(settings.NOTIFICATIONS_LEAD_MINUTES, ge=0, le=7 * 24 * 60, description="Lead time for a routine reminder")
+    fire_at: datetime | None = Field(None, description="One-off reminder time (UTC when no offset is given)")
+    title: str | None = Field(None, max_length=200, description="Defaults to the routine title")
+
+    @model_validator(mode="after")
+    def _one_target(self):
+        if (self.routine_id is None) == (self.fire_at is None):
+            raise ValueError("Give exactly one of routine_id or fire_at")
+        if self.fire_at is not None and not self.title:
+            raise ValueError("title is required for a one-off reminder")
+        return self
+
+
+class NotificationResponse(BaseModel):
+    """A pending reminder."""
+    id: int
+    kind: Literal["class", "custom"]
+    routine_id: int | None = None
+    title: str
+    minutes_before: int
+    fire_at: datetime
+    starts_at: datetime | None = None
+
+
+def _require_enabled() -> None:
+    if not settings.NOTIFICATIONS_ENABLED:
+        raise HTTPException(status_code=503, detail="Notifications are disabled")
+
+
+@router.get("/", response_model=Dict[str, list[NotificationResponse]])
+async def get_all_notifications(
+    limit: int = Query(default=100, ge=1, le=1000, description="Maximum reminders to return"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Get the user's pending reminders, soonest first.
+
+    Requires authentication.
+    Every routine with a recognisable day and time has a ``class``
+    reminder; ``custom`` ones were created through this API.
+    """
+    _require_enabled()
+    reminders = scheduler.for_user(user["user_id"])[:limit]
+    return {"data": [reminder.as_dict() for reminder in reminders]}
+
+
+@router.post("/", response_model=NotificationResponse, status_code=201)
+async def create_notification(
+    body: NotificationCreate,
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Create a reminder.
+
+    Requires authentication.
+    With ``routine_id`` the reminder repeats ``minutes_before`` each weekly
+    class of that routine (which must belong to the user); with
+    ``fire_at`` it fires once.
+    """
+    _require_enabled()
+    user_id = user["user_id"]
+
+    if body.routine_id is not None:
+        routine = await repo.get_routine(body.routine_id)
+        if routine.get("user_id") != user_id:
+            raise HTTPException(status_code=404, detail=f"Routine with id {body.routine_id} not found")
+        try:
+            reminder = scheduler.add_custom(user_id, body.title, routine=routine, minutes_before=body.minutes_before)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    else:
+        fire_at = body.fire_at if body.fire_at.tzinfo else body.fire_at.replace(tzinfo=timezone.utc)
+        if fire_at <= datetime.now(timezone.utc):
+            raise HTTPException(status_code=422, detail="fire_at must be in the future")
+        reminder = scheduler.add_custom(user_id, body.title, fire_at=fire_at.timestamp())
+
+    return reminder.as_dict()
 
-@router.post("/")
-def create_notification():
-    return {"message": "Notification created"}
 
 @router.delete("/{notification_id}")
-def delete_notification(notification_id: int):
+async def delete_notification(
+    notification_id: int,
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Cancel a pending reminder.
+
+    Requires authentication.
+    Deleting a routine's ``class`` reminder turns it off for that routine.
+    """
+    _require_enabled()
+    reminder = scheduler.get(notification_id)
+    if reminder is None or reminder.user_id != user["user_id"]:
+        raise HTTPException(status_code=404, detail=f"Notification {notification_id} not found")
+    scheduler.delete(reminder)
     return {"message": f"Notification {notification_id} deleted"}
@@ -1,52 +1,248 @@
 """Routines API endpoints."""
-from typing import Dict
-from fastapi import APIRouter, Query, Depends
-from pydantic import BaseModel, Field
+import asyncio
+import csv
+import math
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Query, Depends, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from app.repos.routines_repo import RoutinesRepo
-from app.core.auth import get_current_user, get_current_user_optional
+from app.repos.cached_routines_repo import CachedRoutinesRepo
+from app.repos.coalescing_routines_repo import CoalescingRoutinesRepo
+from app.repos.pagination import encode_cursor, decode_cursor
+from app.core.auth import get_current_user, get_current_user_optional, get_current_user_with_query_token
+from app.core.change_feed import CLOSED, PING, ChangeHub, FeedEvent, sse_stream
+from app.core.cache import create_cache_backend
+from app.core.config import settings
+from app.core.conflicts import RESOURCE_COLUMNS, SCHEDULE_COLUMNS, TimetableIndex
+from app.core.events import routine_events
+from app.core.etag import compute_etag, if_match, if_none_match
+from app.core.logging import get_logger
+from app.core.responses import trusted_response
+from app.core.schedule import MINUTES_PER_DAY, ScheduledClass, WeeklySchedule
+from app.core.timeparse import DAY_NAMES, normalize_day, parse_clock, parse_day
+from app.core.timetable_io import ENCODERS, MEDIA_TYPES, PARSERS, iter_lines
+from app.core.user_index_cache import UserIndexCache
 
 router = APIRouter()
-repo = RoutinesRepo()
+logger = get_logger(__name__)
+
+# Uncached, uncoalesced access for reads that must see the database's
+# current row (If-Match preconditions)
+db_repo = RoutinesRepo()
+
+# Concurrent identical reads share one Supabase call (under the cache, so
+# a burst of misses for the same key is coalesced too)
+coalescer = CoalescingRoutinesRepo(db_repo) if settings.ROUTINES_COALESCE_READS else None
+if coalescer is not None:
+    routine_events.subscribe(coalescer.on_change)
+base_repo = coalescer or db_repo
+
+if settings.ROUTINES_CACHE_ENABLED:
+    repo = CachedRoutinesRepo(
+        base_repo,
+        create_cache_backend(settings.ROUTINES_CACHE_URL, settings.ROUTINES_CACHE_MAX_ENTRIES),
+        ttl=settings.ROUTINES_CACHE_TTL_SECONDS,
+    )
+else:
+    repo = base_repo
+
+conflict_engine = UserIndexCache(
+    lambda: TimetableIndex(settings.ROUTINE_DEFAULT_DURATION_MINUTES),
+    ttl=settings.TIMETABLE_INDEX_TTL_SECONDS,
+    name="conflict",
+)
+routine_events.subscribe(conflict_engine.on_change)
+
+weekly_schedules = UserIndexCache(
+    lambda: WeeklySchedule(settings.ROUTINE_DEFAULT_DURATION_MINUTES),
+    ttl=settings.TIMETABLE_INDEX_TTL_SECONDS,
+    name="weekly schedule",
+)
+routine_events.subscribe(weekly_schedules.on_change)
+
+change_hub = ChangeHub(
+    queue_size=settings.ROUTINES_STREAM_QUEUE_SIZE,
+    replay_size=settings.ROUTINES_STREAM_REPLAY_SIZE,
+    replay_users=settings.ROUTINES_STREAM_REPLAY_USERS,
+    heartbeat=settings.ROUTINES_STREAM_HEARTBEAT_SECONDS,
+)
+if settings.ROUTINES_STREAM_SOURCE == "events":
+    routine_events.subscribe(change_hub.on_change)
+
+
+def _check_day(value: str | None) -> str | None:
+    """Normalise a day name ('mon' -> 'Monday'), rejecting unknown ones."""
+    if value is None:
+        return None
+    day = normalize_day(value)
+    if day is None:
+        raise ValueError(f"day must be one of {', '.join(DAY_NAMES)}")
+    return day
 
 
 # Pydantic models
 class RoutineBase(BaseModel):
     """Base routine model with common fields."""
     title: str = Field(..., min_length=1, max_length=255, description="Routine title")
-    time: str | None = Field(None, description="Time for the routine (e.g., '09:00 AM')")
+    day: str | None = Field(None, description="Day of the week (e.g., 'Monday')")
+    time: str | None = Field(None, description="Time for the routine (e.g., '09:00 AM' or '09:00 - 10:30 AM')")
+    teacher: str | None = Field(None, max_length=255, description="Teacher taking the class")
+    batch_id: int | None = Field(None, description="Batch attending the class")
+    room: str | None = Field(None, max_length=100, description="Room the class is held in")
     section_id: int | None = Field(None, description="Optional section ID")
 
 
 class RoutineCreate(RoutineBase):
     """Model for creating a new routine."""
-    pass
+    check_day = field_validator("day")(_check_day)
 
 
 class RoutineUpdate(BaseModel):
     """Model for updating a routine (all fields optional)."""
     title: str | None = Field(None, min_length=1, max_length=255)
+    day: str | None = None
     time: str | None = None
+    teacher: str | None = Field(None, max_length=255)
+    batch_id: int | None = None
+    room: str | None = Field(None, max_length=100)
     section_id: int | None = None
+    
+    check_day = field_validator("day")(_check_day)
 
 
 class RoutineResponse(RoutineBase):
     """Response model for a routine."""
     id: int
+    weekday: int | None = Field(None, description="Parsed day (Monday is 0)")
+    start_minute: int | None = Field(None, description="Parsed start, in minutes since midnight")
+    end_minute: int | None = Field(None, description="Parsed end, in minutes since midnight")
     created_at: str | None = None
+    updated_at: str | None = None
     
     class Config:
         from_attributes = True
 
 
+class RoutineBulkUpdate(RoutineUpdate):
+    """One item of a bulk update: the routine ID plus the fields to change."""
+    id: int
+
+
+class RoutineBulkDelete(BaseModel):
+    """Request body for a bulk delete."""
+    ids: list[int] = Field(..., min_length=1, description="Routine IDs to delete")
+
+
+class BulkItemResult(BaseModel):
+    """Outcome of one item of a bulk request."""
+    index: int = Field(..., description="Position of the item in the request")
+    id: int | None = None
+    status: int = Field(..., description="HTTP-style status for this item")
+    error: str | None = None
+    data: RoutineResponse | None = None
+
+
+class BulkResponse(BaseModel):
+    """Per-item results of a bulk request."""
+    succeeded: int
+    failed: int
+    results: list[BulkItemResult]
+
+
+class RoutineSearchHit(RoutineResponse):
+    """A routine ranked by semantic similarity to a search query."""
+    score: float = Field(..., description="Cosine similarity to the query")
+
+
+class TimetableConflict(BaseModel):
+    """Two routines booking the same teacher, batch or room at overlapping times."""
+    kind: Literal["teacher", "batch", "room"]
+    resource: str = Field(..., description="Teacher name, batch ID or room")
+    day: str
+    routine_id: int | None = Field(None, description="Routine being checked (None for a new routine)")
+    conflicting_id: int
+    start: str = Field(..., description="Start of the overlap (HH:MM)")
+    end: str = Field(..., description="End of the overlap (HH:MM)")
+
+
+class ScheduledClassResponse(BaseModel):
+    """A class occurrence with concrete local start and end times."""
+    id: int
+    title: str | None = None
+    day: str | None = None
+    time: str | None = None
+    teacher: str | None = None
+    room: str | None = None
+    batch_id: int | None = None
+    starts_at: datetime
+    ends_at: datetime
+
+
+class NowResponse(BaseModel):
+    """The classes running now and the next one to start."""
+    now: datetime
+    current: list[ScheduledClassResponse]
+    next: ScheduledClassResponse | None = None
+    valid_until: datetime | None = Field(None, description="When this answer next changes")
+
+
+PROJECTABLE_FIELDS = frozenset(RoutineResponse.model_fields)
+
+
+def _parse_fields(fields: str | None) -> list[str] | None:
+    """Validate a comma-separated ``fields`` projection."""
+    if not fields:
+        return None
+    columns = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(columns) - PROJECTABLE_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return columns or None
+
+
+def _parse_query_value(name: str, value: str | None, parse) -> int | None:
+    """Parse a day/time query parameter, rejecting values that cannot be parsed."""
+    if value is None:
+        return None
+    parsed = parse(value)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value!r}")
+    return parsed
+
+
 # API endpoints
 @router.get("/", response_model=list[RoutineResponse])
-def list_routines(
+async def list_routines(
+    request: Request,
     limit: int | None = Query(
         default=None,
         ge=1,
         le=100,
         description="Maximum number of routines to return"
     ),
+    cursor: str | None = Query(
+        default=None,
+        description="Opaque cursor from the X-Next-Cursor header of the previous page"
+    ),
+    fields: str | None = Query(
+        default=None,
+        description="Comma-separated columns to return (id and created_at are always included)"
+    ),
+    day: str | None = Query(default=None, description="Only routines on this day (e.g., 'Monday')"),
+    from_: str | None = Query(
+        default=None,
+        alias="from",
+        description="Only routines still running after this time (e.g., '09:00 AM')"
+    ),
+    to: str | None = Query(default=None, description="Only routines starting before this time"),
     user: Dict[str, str] | None = Depends(get_current_user_optional)
 ):
     """
@@ -54,24 +250,667 @@ def list_routines(
     
     Optionally limit the number of results.
     If authenticated, returns only user's routines.
+    
+    ``day``, ``from`` and ``to`` select routines overlapping a time window
+    using the parsed weekday/start/end columns.
+    
+    Results are ordered by (created_at, id). When a full page is returned,
+    the cursor for the next page is sent in the X-Next-Cursor header and as
+    a Link rel="next" URL.
+    
+    Sends a strong ETag and answers 304 when If-None-Match still matches.
     """
     user_id = user["user_id"] if user else None
-    return repo.list_routines(limit, user_id=user_id)
+    columns = _parse_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+    weekday = _parse_query_value("day", day, parse_day)
+    ends_after = _parse_query_value("from", from_, parse_clock)
+    starts_before = _parse_query_value("to", to, parse_clock)
+    
+    rows = await repo.list_routines(
+        limit,
+        user_id=user_id,
+        cursor=after,
+        fields=columns,
+        weekday=weekday,
+        starts_before=starts_before,
+        ends_after=ends_after,
+    )
+    
+    headers = {}
+    if limit and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1])
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    
+    etag = compute_etag(rows, variant=fields or "")
+    headers["ETag"] = etag
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if columns:
+        # Projected rows do not satisfy RoutineResponse, return them as-is
+        return ORJSONResponse(rows, headers=headers)
+    
+    return trusted_response(RoutineResponse, rows, headers=headers)
+
+
+def _chunks(items: list, size: int):
+    """Yield ``(offset, chunk)`` slices of at most ``size`` items."""
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def _check_bulk_size(count: int) -> None:
+    """Reject bulk requests above the configured item limit."""
+    if count > settings.ROUTINES_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items: {count} > {settings.ROUTINES_BULK_MAX_ITEMS}"
+        )
+
+
+def _bulk_response(results: list[BulkItemResult]) -> BulkResponse:
+    succeeded = sum(1 for r in results if r.status < 400)
+    return BulkResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_create_routines(
+    routines: list[RoutineCreate],
+    allow_conflicts: bool = Query(default=False, description="Create even if they clash with other bookings"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Create many routines at once.
+    
+    Requires authentication.
+    The whole body is validated before anything is written, then rows are
+    inserted with one multi-row insert per chunk. A failing chunk does not
+    stop the others; see the per-item results. Routines that would
+    double-book a teacher, batch or room (with the timetable or with each
+    other) are reported as 409 and not written, unless ``allow_conflicts``
+    is set.
+    """
+    _check_bulk_size(len(routines))
+    payloads = []
+    for routine in routines:
+        routine_data = routine.model_dump(exclude_unset=True)
+        routine_data["user_id"] = user["user_id"]
+        payloads.append(routine_data)
+    
+    results: list[BulkItemResult] = []
+    for offset, chunk in _chunks(payloads, settings.ROUTINES_BULK_CHUNK_SIZE):
+        indexed = list(enumerate(chunk, offset))
+        rejected: dict[int, str] = {}
+        try:
+            if not allow_conflicts:
+                rejected = await _screen_conflicts(user["user_id"], indexed)
+                indexed = [(index, payload) for index, payload in indexed if index not in rejected]
+            rows = await repo.create_routines([payload for _, payload in indexed])
+        except HTTPException as e:
+            results.extend(
+                BulkItemResult(index=index, status=e.status_code, error=str(e.detail))
+                for index, _ in indexed
+            )
+        else:
+            results.extend(
+                BulkItemResult(index=index, id=row["id"], status=201, data=row)
+                for (index, _), row in zip(indexed, rows)
+            )
+        results.extend(BulkItemResult(index=index, status=409, error=error) for index, error in rejected.items())
+    results.sort(key=lambda r: r.index)
+    return _bulk_response(results)
+
+
+@router.patch("/bulk", response_model=BulkResponse)
+async def bulk_update_routines(
+    routines: list[RoutineBulkUpdate],
+    allow_conflicts: bool = Query(default=False, description="Update even if they clash with other bookings"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Update many of the user's routines at once.
+    
+    Requires authentication.
+    Each chunk costs one read of the current rows, then one conditional
+    update per routine (run concurrently) that only applies while the row
+    still has the ``updated_at`` that was read. Unknown or foreign IDs are
+    reported as 404, routines changed or deleted since the read as 412,
+    and schedule changes that would double-book a teacher, batch or room
+    as 409 (unless ``allow_conflicts`` is set).
+    """
+    _check_bulk_size(len(routines))
+    duplicates = sorted(i for i, n in Counter(r.id for r in routines).items() if n > 1)
+    if duplicates:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Duplicate routine ids: {', '.join(map(str, duplicates))}"
+        )
+    
+    user_id = user["user_id"]
+    gate = asyncio.Semaphore(settings.ROUTINES_BULK_UPDATE_CONCURRENCY)
+    
+    async def write(routine_id: int, current: dict, changes: dict) -> dict | HTTPException:
+        if not changes:
+            return current  # No updates, just return current
+        async with gate:
+            try:
+                return await repo.update_routine(
+                    routine_id, changes, current.get("updated_at"), user_id=user_id
+                )
+            except HTTPException as e:
+                return e
+    
+    results: list[BulkItemResult] = []
+    for offset, chunk in _chunks(routines, settings.ROUTINES_BULK_CHUNK_SIZE):
+        changes = [item.model_dump(exclude_unset=True, exclude={"id"}) for item in chunk]
+        try:
+            current = await repo.get_routines_by_ids([item.id for item in chunk], user_id=user_id)
+            by_id = {row["id"]: row for row in current}
+            rejected = {} if allow_conflicts else await _screen_conflicts(user_id, [
+                (offset + i, {**by_id[item.id], **changes[i]})
+                for i, item in enumerate(chunk)
+                if item.id in by_id and SCHEDULE_COLUMNS & changes[i].keys()
+            ])
+        except HTTPException as e:
+            results.extend(
+                BulkItemResult(index=offset + i, id=item.id, status=e.status_code, error=str(e.detail))
+                for i, item in enumerate(chunk)
+            )
+            continue
+        
+        pending = [
+            (offset + i, item, changes[i]) for i, item in enumerate(chunk)
+            if item.id in by_id and offset + i not in rejected
+        ]
+        outcomes = await asyncio.gather(*(write(item.id, by_id[item.id], change) for _, item, change in pending))
+        for (index, item, _), outcome in zip(pending, outcomes):
+            if isinstance(outcome, HTTPException):
+                results.append(BulkItemResult(
+                    index=index, id=item.id, status=outcome.status_code, error=str(outcome.detail)
+                ))
+            else:
+                results.append(BulkItemResult(index=index, id=item.id, status=200, data=outcome))
+        results.extend(
+            BulkItemResult(index=index, id=chunk[index - offset].id, status=409, error=error)
+            for index, error in rejected.items()
+        )
+        results.extend(
+            BulkItemResult(
+                index=offset + i, id=item.id, status=404,
+                error=f"Routine with id {item.id} not found or you don't have permission to update it",
+            )
+            for i, item in enumerate(chunk) if item.id not in by_id
+        )
+    results.sort(key=lambda r: r.index)
+    return _bulk_response(results)
+
+
+@router.post("/bulk/delete", response_model=BulkResponse)
+async def bulk_delete_routines(
+    body: RoutineBulkDelete,
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Delete many of the user's routines at once.
+    
+    Requires authentication.
+    Runs one filtered delete per chunk. Unknown or foreign IDs are
+    reported as 404.
+    """
+    _check_bulk_size(len(body.ids))
+    ids = list(dict.fromkeys(body.ids))
+    
+    results: list[BulkItemResult] = []
+    for offset, chunk in _chunks(ids, settings.ROUTINES_BULK_CHUNK_SIZE):
+        try:
+            deleted = {row["id"]: row for row in await repo.delete_routines(chunk, user_id=user["user_id"])}
+        except HTTPException as e:
+            results.extend(
+                BulkItemResult(index=offset + i, id=routine_id, status=e.status_code, error=str(e.detail))
+                for i, routine_id in enumerate(chunk)
+            )
+            continue
+        for i, routine_id in enumerate(chunk):
+            if routine_id in deleted:
+                results.append(BulkItemResult(index=offset + i, id=routine_id, status=200, data=deleted[routine_id]))
+            else:
+                results.append(BulkItemResult(
+                    index=offset + i, id=routine_id, status=404,
+                    error=f"Routine with id {routine_id} not found or you don't have permission to delete it",
+                ))
+    return _bulk_response(results)
+
+
+@router.get("/export")
+async def export_routines(
+    format: Literal["ndjson", "csv", "ics"] = Query(default="ndjson", description="Export format"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Stream all of the user's routines as NDJSON, CSV or iCalendar.
+    
+    Requires authentication.
+    Rows are paged out of the database and encoded page by page, so memory
+    use does not grow with the size of the timetable.
+    """
+    pages = repo.iter_routine_pages(
+        user_id=user["user_id"], page_size=settings.ROUTINES_EXPORT_PAGE_SIZE
+    )
+    return StreamingResponse(
+        ENCODERS[format](pages),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="routines.{format}"'},
+    )
+
+
+@router.post("/import")
+async def import_routines(
+    request: Request,
+    format: Literal["ndjson", "csv", "ics"] = Query(..., description="Format of the request body"),
+    allow_conflicts: bool = Query(default=False, description="Import rows even if they clash with other bookings"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Import routines from a CSV, NDJSON or iCalendar request body.
+    
+    Requires authentication.
+    The body is read and parsed incrementally; valid rows are written in
+    chunks of ROUTINES_BULK_CHUNK_SIZE with one multi-row insert each.
+    Invalid rows, and rows that would double-book a teacher, batch or room
+    (unless ``allow_conflicts`` is set), are skipped and reported (up to
+    ROUTINES_IMPORT_MAX_ERRORS). CSV input needs a header row with at
+    least a ``title`` column.
+    """
+    imported = failed = 0
+    errors: list[dict] = []
+    batch: list[dict] = []
+    
+    def record_error(record: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.ROUTINES_IMPORT_MAX_ERRORS:
+            errors.append({"record": record, "error": message})
+    
+    async def flush() -> None:
+        nonlocal imported
+        numbered = [(row.pop("_record"), row) for row in batch]
+        batch.clear()
+        try:
+            if not allow_conflicts:
+                rejected = await _screen_conflicts(user["user_id"], numbered, label="record")
+                for number, message in rejected.items():
+                    record_error(number, message)
+                numbered = [(number, row) for number, row in numbered if number not in rejected]
+            if numbered:
+                imported += len(await repo.create_routines([row for _, row in numbered]))
+        except HTTPException as e:
+            for number, _ in numbered:
+                record_error(number, str(e.detail))
+    
+    try:
+        async for number, record in PARSERS[format](iter_lines(request.stream())):
+            try:
+                routine = RoutineCreate.model_validate(record)
+            except ValidationError as e:
+                record_error(number, "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                ))
+                continue
+            routine_data = routine.model_dump(exclude_unset=True)
+            routine_data["user_id"] = user["user_id"]
+            routine_data["_record"] = number
+            batch.append(routine_data)
+            if len(batch) >= settings.ROUTINES_BULK_CHUNK_SIZE:
+                await flush()
+    except (ValueError, csv.Error) as e:
+        if batch:
+            await flush()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Malformed {format} input after {imported} imported rows: {str(e)}"
+        )
+    
+    if batch:
+        await flush()
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+@router.get("/search", response_model=list[RoutineSearchHit])
+async def search_routines(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500, description="Free-text query"),
+    keyword: str | None = Query(
+        default=None,
+        min_length=1,
+        max_length=100,
+        description="Only rank routines whose title or time contains this text"
+    ),
+    limit: int = Query(default=20, ge=1, le=100, description="Results per page"),
+    offset: int = Query(default=0, ge=0, le=1000, description="Number of ranked results to skip"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Search the user's routines by meaning.
+    
+    Requires authentication and VECTOR_INDEX_ENABLED.
+    Routines are ranked by cosine similarity between the query embedding
+    and the user's persistent routine index; ``keyword`` narrows the
+    candidates with a database filter first. When more results exist, the
+    next page's URL is sent as a Link rel="next" header. Stage durations
+    are reported in the Server-Timing header.
+    """
+    if not settings.VECTOR_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="Semantic search is not enabled")
+    user_id = user["user_id"]
+    timings: dict[str, float] = {}
+    
+    allowed = None
+    if keyword:
+        start = time.perf_counter()
+        allowed = await repo.search_routine_ids(keyword, user_id=user_id)
+        timings["filter"] = (time.perf_counter() - start) * 1000
+    
+    # Imported here so numpy and the index code load only when search is used
+    from app.core import rag_pipeline
+    
+    ranked = []
+    if allowed is None or allowed:
+        ranked = await rag_pipeline.search_routines(
+            user_id,
+            q,
+            offset + limit + 1,
+            pages=repo.iter_routine_pages(user_id=user_id, page_size=settings.ROUTINES_EXPORT_PAGE_SIZE),
+            allowed=allowed,
+            timings=timings,
+        )
+    page = ranked[offset:offset + limit]
+    
+    start = time.perf_counter()
+    rows = {row["id"]: row for row in await repo.get_routines_by_ids([i for i, _ in page], user_id=user_id)}
+    timings["fetch"] = (time.perf_counter() - start) * 1000
+    # Rows deleted since they were indexed are dropped from the page
+    results = [{**rows[i], "score": round(score, 6)} for i, score in page if i in rows]
+    
+    if len(ranked) > offset + limit:
+        next_url = request.url.include_query_params(offset=offset + limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={duration:.2f}" for name, duration in timings.items()
+    )
+    logger.debug("Routine search for %s: %d results, timings %s", user_id, len(results), timings)
+    return results
+
+
+async def _timetable(user_id: str) -> TimetableIndex:
+    """The user's timetable interval index (built from their routines on first use)."""
+    return await conflict_engine.index_for(
+        user_id,
+        lambda: repo.iter_routine_pages(
+            user_id=user_id,
+            page_size=settings.ROUTINES_EXPORT_PAGE_SIZE,
+            fields=["user_id", *sorted(SCHEDULE_COLUMNS)],
+        ),
+    )
+
+
+async def _check_conflicts(routine: dict) -> None:
+    """
+    Reject a routine that would double-book a teacher, batch or room.
+    
+    Raises:
+        HTTPException: 409 listing the clashing routines
+    """
+    if not routine.get("user_id") or not routine.get("day") or not routine.get("time"):
+        return
+    if all(routine.get(column) is None for column in RESOURCE_COLUMNS.values()):
+        return
+    index = await _timetable(routine["user_id"])
+    conflicts = index.conflicts_for(routine)
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": f"Routine clashes with {len(conflicts)} existing booking(s)",
+                "conflicts": [conflict.to_dict() for conflict in conflicts],
+            },
+        )
+
+
+async def _screen_conflicts(
+    user_id: str,
+    routines: list[tuple[int, dict]],
+    label: str = "item",
+) -> dict[int, str]:
+    """
+    Find the routines of a bulk chunk that would double-book a teacher, batch or room.
+    
+    Each routine is checked against the stored timetable and against the
+    routines of the chunk accepted before it, so two new rows cannot take
+    the same slot either. Stored placements of routines the chunk moves
+    are ignored in favour of their new ones.
+    
+    Args:
+        user_id: Owner of the routines
+        routines: ``(request index, row)`` pairs; rows being updated are the
+            current row merged with the changes
+        label: What the index counts, for messages about clashes within the chunk
+        
+    Returns:
+        Error message by request index, for the routines to reject
+    """
+    candidates = [
+        (index, routine) for index, routine in routines
+        if routine.get("day") and routine.get("time")
+        and any(routine.get(column) is not None for column in RESOURCE_COLUMNS.values())
+    ]
+    if not candidates:
+        return {}
+    stored = await _timetable(user_id)
+    accepted = TimetableIndex(settings.ROUTINE_DEFAULT_DURATION_MINUTES)
+    moving = {routine["id"] for _, routine in candidates if routine.get("id") is not None}
+    rejected: dict[int, str] = {}
+    for index, routine in candidates:
+        clashes = [c for c in stored.conflicts_for(routine) if c.conflicting_id not in moving]
+        clashes += accepted.conflicts_for(routine)
+        if not clashes:
+            # New rows have no id yet; stand in with one that names the item
+            accepted.add({**routine, "id": routine.get("id") or -(index + 1)})
+            continue
+        moving.discard(routine.get("id"))  # stays where it is
+        rejected[index] = "Routine clashes with " + "; ".join(
+            f"{c.kind} {c.resource} on {c.day} {c.start}-{c.end} "
+            + (f"(routine {c.conflicting_id})" if c.conflicting_id >= 0 else f"({label} {-c.conflicting_id - 1})")
+            for c in clashes
+        )
+    return rejected
+
+
+@router.get("/conflicts", response_model=list[TimetableConflict])
+async def list_conflicts(
+    kind: Literal["teacher", "batch", "room"] | None = Query(
+        default=None,
+        description="Only report clashes of this resource kind"
+    ),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Report every clash in the user's timetable.
+    
+    Requires authentication.
+    Each pair of routines that book the same teacher, batch or room at
+    overlapping times on the same day is listed once. Computed by sweeping
+    per-day interval indexes instead of comparing every pair of routines.
+    """
+    index = await _timetable(user["user_id"])
+    conflicts = index.find_all()
+    if kind:
+        conflicts = [conflict for conflict in conflicts if conflict.kind == kind]
+    return [conflict.to_dict() for conflict in conflicts]
+
+
+def _scheduled_class(entry: ScheduledClass, week_start: datetime, start: int | None = None) -> dict:
+    """Turn a week-minute placement into concrete local datetimes."""
+    start = entry.start if start is None else start
+    routine = entry.routine
+    return {
+        "id": entry.routine_id,
+        "title": routine.get("title"),
+        "day": routine.get("day"),
+        "time": routine.get("time"),
+        "teacher": routine.get("teacher"),
+        "room": routine.get("room"),
+        "batch_id": routine.get("batch_id"),
+        "starts_at": week_start + timedelta(minutes=start),
+        "ends_at": week_start + timedelta(minutes=start + entry.end - entry.start),
+    }
+
+
+@router.get("/now", response_model=NowResponse)
+async def current_and_next(
+    response: Response,
+    batch_id: int | None = Query(default=None, description="Only classes of this batch"),
+    tz: str | None = Query(default=None, description="IANA time zone of the timetable (default TIMETABLE_TIMEZONE)"),
+    at: datetime | None = Query(default=None, description="Answer for this instant instead of now"),
+    user: Dict[str, str] = Depends(get_current_user)
+):
+    """
+    Get the class(es) running now and the next class to start.
+    
+    Requires authentication.
+    Answered from an in-memory weekly schedule of the user's timetable
+    (kept current by routine writes) with two binary searches. The
+    response may be cached until ``valid_until``, the next moment a class
+    starts or ends, which is also expressed as Cache-Control max-age.
+    """
+    try:
+        zone = ZoneInfo(tz or settings.TIMETABLE_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {tz}")
+    
+    user_id = user["user_id"]
+    schedule = await weekly_schedules.index_for(
+        user_id,
+        lambda: repo.iter_routine_pages(
+            user_id=user_id,
+            page_size=settings.ROUTINES_EXPORT_PAGE_SIZE,
+            fields=[
+                "user_id", "title", "day", "time", "teacher", "room", "batch_id",
+                "weekday", "start_minute", "end_minute",
+            ],
+        ),
+    )
+    
+    if at is None:
+        now = datetime.now(zone)
+    elif at.tzinfo is None:
+        now = at.replace(tzinfo=zone)
+    else:
+        now = at.astimezone(zone)
+    now = now.replace(microsecond=0)
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0)
+    minute = now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+    found = schedule.lookup(minute, batch_id)
+    
+    valid_until = None
+    if found.valid_until is not None:
+        valid_until = week_start + timedelta(minutes=found.valid_until)
+        max_age = max(1, min(math.ceil((valid_until - now).total_seconds()), 86400))
+        response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    else:
+        response.headers["Cache-Control"] = f"private, max-age={int(settings.TIMETABLE_INDEX_TTL_SECONDS)}"
+    
+    return {
+        "now": now,
+        "current": [_scheduled_class(entry, week_start) for entry in found.current],
+        "next": _scheduled_class(found.next, week_start, found.next_start) if found.next else None,
+        "valid_until": valid_until,
+    }
+
+
+@router.get("/stream")
+async def stream_changes(
+    last_event_id: str | None = Query(default=None, description="Resume after this event id (if no Last-Event-ID header)"),
+    last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID"),
+    user: Dict[str, str] = Depends(get_current_user_with_query_token)
+):
+    """
+    Stream changes to the user's routines as Server-Sent Events.
+    
+    Requires authentication (Bearer header, or ``access_token`` query
+    parameter for EventSource). Each event is ``created``, ``updated`` or
+    ``deleted`` with the routine row as data. Reconnecting with
+    Last-Event-ID replays what was missed; when that is no longer possible
+    the stream starts with a ``reset`` event and the client should refetch.
+    """
+    subscriber = change_hub.subscribe(user["user_id"], last_event_id_header or last_event_id)
+    return StreamingResponse(
+        sse_stream(change_hub, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_changes_ws(
+    websocket: WebSocket,
+    access_token: str | None = Query(default=None),
+    last_event_id: str | None = Query(default=None),
+):
+    """
+    Stream changes to the user's routines over a WebSocket.
+    
+    Same events as ``/stream``, one JSON text frame each
+    (``{"id", "event", "data"}``), plus ``{"event": "ping"}`` keep-alives.
+    The token is passed as the ``access_token`` query parameter.
+    """
+    try:
+        user = await get_current_user_with_query_token(None, access_token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    subscriber = change_hub.subscribe(user["user_id"], last_event_id)
+    try:
+        while True:
+            item = await subscriber.get()
+            if item is PING:
+                await websocket.send_text('{"event":"ping"}')
+            elif isinstance(item, FeedEvent):
+                await websocket.send_text(item.message().decode())
+            else:
+                # Shutdown: "service restart"; overflow: "try again later"
+                await websocket.close(code=1012 if item is CLOSED else 1013)
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_hub.unsubscribe(subscriber)
 
 
 @router.get("/{routine_id}", response_model=RoutineResponse)
-def get_routine(routine_id: int):
+async def get_routine(routine_id: int, request: Request):
     """
     Get a specific routine by ID.
     
     Returns 404 if routine not found.
+    Sends a strong ETag and answers 304 when If-None-Match still matches.
     """
-    return repo.get_routine(routine_id)
+    routine = await repo.get_routine(routine_id)
+    etag = compute_etag([routine])
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return trusted_response(RoutineResponse, routine, headers={"ETag": etag})
 
 
 @router.post("/", response_model=RoutineResponse, status_code=201)
-def create_routine(
+async def create_routine(
     routine: RoutineCreate,
+    allow_conflicts: bool = Query(default=False, description="Create even if it clashes with another booking"),
     user: Dict[str, str] = Depends(get_current_user)
 ):
     """
@@ -79,29 +918,78 @@ def create_routine(
     
     Requires authentication.
     Returns the created routine with its ID.
+    Returns 409 if it would double-book its teacher, batch or room, unless
+    ``allow_conflicts`` is set.
     """
     routine_data = routine.model_dump(exclude_unset=True)
     routine_data["user_id"] = user["user_id"]  # Associate with authenticated user
-    return repo.create_routine(routine_data)
+    if not allow_conflicts:
+        await _check_conflicts(routine_data)
+    created = await repo.create_routine(routine_data)
+    return trusted_response(RoutineResponse, created, status_code=201)
+
+
+async def _check_if_match(request: Request, routine_id: int) -> str | None:
+    """
+    Enforce an If-Match precondition against the routine's current ETag.
+    
+    The row is read straight from the database: a cached or coalesced copy
+    could be older than the client's and accept a tag the database would
+    reject.
+    
+    Returns:
+        The row's ``updated_at`` to make the write conditional on, or None
+        when the request carries no If-Match header
+        
+    Raises:
+        HTTPException: 412 if the client's ETag is out of date
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return None
+    current = await db_repo.get_routine(routine_id)
+    if not if_match(header, compute_etag([current])):
+        raise HTTPException(
+            status_code=412,
+            detail=f"Routine with id {routine_id} has been modified"
+        )
+    # Re-checked by the database so a concurrent write between the two
+    # round-trips still fails the precondition
+    return current.get("updated_at")
 
 
 @router.patch("/{routine_id}", response_model=RoutineResponse)
-def update_routine(routine_id: int, routine: RoutineUpdate):
+async def update_routine(
+    routine_id: int,
+    routine: RoutineUpdate,
+    request: Request,
+    allow_conflicts: bool = Query(default=False, description="Update even if it clashes with another booking"),
+):
     """
     Update an existing routine.
     
     Only provided fields will be updated.
     Returns 404 if routine not found.
+    Honors If-Match for optimistic concurrency (412 on mismatch).
+    Returns 409 if a schedule change would double-book its teacher, batch
+    or room, unless ``allow_conflicts`` is set.
     """
+    expected_updated_at = await _check_if_match(request, routine_id)
     update_data = routine.model_dump(exclude_unset=True)
+    if not allow_conflicts and SCHEDULE_COLUMNS & update_data.keys():
+        current = await repo.get_routine(routine_id)
+        await _check_conflicts({**current, **update_data})
     if not update_data:
-        return repo.get_routine(routine_id)  # No updates, just return current
-    return repo.update_routine(routine_id, update_data)
+        updated = await repo.get_routine(routine_id)  # No updates, just return current
+    else:
+        updated = await repo.update_routine(routine_id, update_data, expected_updated_at)
+    return trusted_response(RoutineResponse, updated, headers={"ETag": compute_etag([updated])})
 
 
 @router.delete("/{routine_id}", response_model=RoutineResponse)
-def delete_routine(
+async def delete_routine(
     routine_id: int,
+    request: Request,
     user: Dict[str, str] = Depends(get_current_user)
 ):
     """
@@ -111,5 +999,10 @@ def delete_routine(
     Users can only delete their own routines.
     Returns the deleted routine.
     Returns 404 if routine not found or not owned by user.
+    Honors If-Match for optimistic concurrency (412 on mismatch).
     """
-    return repo.delete_routine(routine_id, user_id=user["user_id"])
+    expected_updated_at = await _check_if_match(request, routine_id)
+    deleted = await repo.delete_routine(
+        routine_id, user_id=user["user_id"], expected_updated_at=expected_updated_at
+    )
+    return trusted_response(RoutineResponse, deleted)
@@ -1,9 +1,10 @@
 """FastAPI authentication dependencies."""
 from typing import Dict, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.jwt import verify_clerk_jwt
 from app.core.logging import get_logger
+from app.core.metrics import phase
 
 logger = get_logger(__name__)
 
@@ -30,7 +31,8 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        payload = await verify_clerk_jwt(token)
+        with phase("jwt"):
+            payload = await verify_clerk_jwt(token)
         
         # Extract user information
         user_id = payload.get("sub")
@@ -44,18 +46,18 @@ async def get_current_user(
             "email": email or "",
         }
         
-        logger.info(f"User authenticated: {user_id}")
+        logger.info("User authenticated: %s", user_id, extra={"sample_key": "auth.user_authenticated"})
         return user_info
         
     except ValueError as e:
-        logger.warning(f"Authentication failed: {str(e)}")
+        logger.warning("Authentication failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authentication credentials: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except Exception as e:
-        logger.error(f"Unexpected authentication error: {str(e)}")
+        logger.error("Unexpected authentication error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed",
@@ -85,3 +87,37 @@ async def get_current_user_optional(
         return await get_current_user(credentials)
     except HTTPException:
         return None
+
+
+async def get_current_user_with_query_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    access_token: Optional[str] = Query(
+        default=None,
+        description="JWT for clients that cannot send an Authorization header (EventSource, WebSocket)"
+    ),
+) -> Dict[str, str]:
+    """
+    Authentication dependency for streaming endpoints.
+    
+    Browsers' EventSource and WebSocket APIs cannot set an Authorization
+    header, so the token may also be passed as the ``access_token`` query
+    parameter. The header wins when both are present.
+    
+    Args:
+        credentials: Optional HTTP Bearer credentials
+        access_token: Optional JWT from the query string
+        
+    Returns:
+        Dictionary containing user_id and email
+        
+    Raises:
+        HTTPException: 401 if no token is given or it is invalid
+    """
+    token = credentials.credentials if credentials is not None else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
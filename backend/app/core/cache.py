@@ -0,0 +1,137 @@
+"""Pluggable key/value cache backends."""
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import orjson
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class CacheBackend:
+    """
+    Minimal async key/value interface used by the read-through caches.
+
+    Values are JSON-compatible Python objects. Backends may share stored
+    objects between callers, so cached values must never be mutated.
+    """
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the value for a key, or None if absent or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after ``ttl`` seconds when given."""
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        """Remove keys (missing keys are ignored)."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process TTL + LRU cache.
+
+    Only used from the event loop, so it needs no locking. Each uvicorn
+    worker holds its own copy; use a Redis-compatible backend to share
+    entries between workers.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else float("inf")
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache backend for any Redis-compatible server (Redis, Valkey, KeyDB,
+    Dragonfly), letting several uvicorn workers share one local store.
+
+    Requires the optional ``redis`` package.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "classmind:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "RedisCacheBackend requires the 'redis' package (pip install redis)"
+            ) from e
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self.prefix + key)
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        px = int(ttl * 1000) if ttl else None
+        await self._client.set(self.prefix + key, orjson.dumps(value), px=px)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*(self.prefix + key for key in keys))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_cache_backend(url: str, max_entries: int = 10_000) -> CacheBackend:
+    """
+    Build a cache backend from a URL.
+
+    Args:
+        url: ``memory://`` for the in-process cache, or a ``redis://``,
+            ``rediss://`` or ``unix://`` URL for a shared Redis-compatible store
+        max_entries: Size cap for the in-process cache
+
+    Returns:
+        CacheBackend instance
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    scheme = url.split("://", 1)[0].lower()
+    if scheme == "memory":
+        return MemoryCacheBackend(max_entries=max_entries)
+    if scheme in ("redis", "rediss", "unix"):
+        logger.info("Using Redis-compatible cache backend at %s", url.split("@")[-1])
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported cache backend URL: {url}")
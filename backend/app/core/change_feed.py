@@ -0,0 +1,287 @@
+"""Per-user routine change feed: an in-process pub/sub hub for SSE and WebSocket streams."""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Optional
+import orjson
+from app.core.events import RoutineChange, RoutineEvents
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class FeedEvent:
+    """One change as delivered to subscribers, encoded once and shared by all of them."""
+
+    __slots__ = ("id", "seq", "action", "data", "sse")
+
+    def __init__(self, epoch: str, seq: int, action: str, routine: Optional[dict[str, Any]]):
+        self.id = f"{epoch}-{seq}"
+        self.seq = seq
+        self.action = action
+        self.data = orjson.dumps({"action": action, "routine": routine})
+        self.sse = b"id: %s\nevent: %s\ndata: %s\n\n" % (self.id.encode(), action.encode(), self.data)
+
+    def message(self) -> bytes:
+        """WebSocket frame: the SSE fields as one JSON object."""
+        return b'{"id":"%s","event":"%s","data":%s}' % (self.id.encode(), self.action.encode(), self.data)
+
+
+# Control items placed on subscriber queues next to FeedEvents
+PING = object()
+CLOSED = object()
+OVERFLOWED = object()
+
+SSE_PING = b": ping\n\n"
+
+
+class Subscriber:
+    """One open stream: a bounded queue of events for a single user."""
+
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def offer(self, item: Any) -> bool:
+        """Queue an item without waiting; False when the queue is full."""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def terminate(self, reason: object) -> None:
+        """Drop anything queued and make ``reason`` the next (and last) item."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(reason)
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+
+class ChangeHub:
+    """
+    Fans routine changes out to every open stream of the changed row's owner.
+
+    Each subscriber has a bounded queue. Publishing never waits: a
+    subscriber whose queue is full is disconnected rather than slowing the
+    writer down (backpressure by shedding the slow consumer); its client
+    reconnects with the id of the last event it saw and resumes from the
+    replay buffer. Each user's most recent events are kept for that, with
+    buffers for the least recently active users evicted first. Event ids
+    carry a per-process epoch, so an id from another process or an earlier
+    run is answered with a ``reset`` event telling the client to refetch.
+
+    An idle subscriber costs one queue and one waiting task; keep-alive
+    pings come from one shared timer rather than a timer per stream.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        replay_size: int = 100,
+        replay_users: int = 10_000,
+        heartbeat: float = 15.0,
+    ):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.replay_users = replay_users
+        self.heartbeat = heartbeat
+        self.epoch = format(int(time.time() * 1000), "x")
+        self._seq = itertools.count(1)
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._replay: OrderedDict[str, deque[FeedEvent]] = OrderedDict()
+        # Highest seq no longer replayable, per user and for evicted users
+        self._trimmed_through: dict[str, int] = {}
+        self._evicted_through = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.overflows = 0
+        self.resets = 0
+
+    # Publishing
+
+    def on_change(self, change: RoutineChange) -> None:
+        """Routine event listener: publish the change to its owner's streams."""
+        if change.user_id:
+            self.publish(change.user_id, change.action, change.routine)
+
+    def publish(self, user_id: str, action: str, routine: Optional[dict[str, Any]]) -> FeedEvent:
+        """Record an event for replay and offer it to the user's subscribers."""
+        event = FeedEvent(self.epoch, next(self._seq), action, routine)
+        self.published += 1
+        self._remember(user_id, event)
+        for subscriber in tuple(self._subscribers.get(user_id, ())):
+            if not subscriber.offer(event):
+                self.overflows += 1
+                logger.warning("Change stream for user %s fell behind, disconnecting it", user_id)
+                self._remove(subscriber)
+                subscriber.terminate(OVERFLOWED)
+        return event
+
+    def _remember(self, user_id: str, event: FeedEvent) -> None:
+        buffer = self._replay.get(user_id)
+        if buffer is None:
+            buffer = self._replay[user_id] = deque(maxlen=self.replay_size)
+            while len(self._replay) > self.replay_users:
+                evicted_user, evicted = self._replay.popitem(last=False)
+                self._trimmed_through.pop(evicted_user, None)
+                if evicted:
+                    self._evicted_through = max(self._evicted_through, evicted[-1].seq)
+        else:
+            self._replay.move_to_end(user_id)
+        if len(buffer) == buffer.maxlen:
+            self._trimmed_through[user_id] = buffer[0].seq
+        buffer.append(event)
+
+    def _backlog(self, user_id: str, last_event_id: Optional[str]) -> Optional[list[FeedEvent]]:
+        """Events after ``last_event_id``, or None when they can no longer be replayed."""
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        last_seq = int(seq)
+        if last_seq < self._trimmed_through.get(user_id, 0):
+            return None
+        buffer = self._replay.get(user_id)
+        if buffer is None:
+            # Nothing retained for the user: only safe if nothing was evicted since
+            return None if last_seq < self._evicted_through else []
+        return [event for event in buffer if event.seq > last_seq]
+
+    # Subscribing
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Open a stream for a user, resuming after ``last_event_id`` when given.
+
+        Missed events still in the replay buffer are queued first; if some
+        are gone, the stream starts with a ``reset`` event instead.
+        """
+        subscriber = Subscriber(user_id, self.queue_size)
+        backlog = self._backlog(user_id, last_event_id)
+        if backlog is None or len(backlog) >= self.queue_size:
+            self.resets += 1
+            subscriber.offer(FeedEvent(self.epoch, next(self._seq), "reset", None))
+        else:
+            for event in backlog:
+                subscriber.offer(event)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        self._ensure_heartbeat()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Close a stream (idempotent)."""
+        self._remove(subscriber)
+
+    def _remove(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+
+    # Keep-alive
+
+    def _ensure_heartbeat(self) -> None:
+        if self.heartbeat > 0 and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._beat())
+
+    async def _beat(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.heartbeat)
+            for subscribers in tuple(self._subscribers.values()):
+                for subscriber in tuple(subscribers):
+                    # A full queue has data to send anyway
+                    subscriber.offer(PING)
+
+    async def close(self) -> None:
+        """End every open stream (call on shutdown)."""
+        for subscribers in tuple(self._subscribers.values()):
+            for subscriber in tuple(subscribers):
+                subscriber.terminate(CLOSED)
+        self._subscribers.clear()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "replay_users": len(self._replay),
+            "published": self.published,
+            "overflows": self.overflows,
+            "resets": self.resets,
+        }
+
+
+async def sse_stream(hub: ChangeHub, subscriber: Subscriber, retry_ms: int = 3000) -> AsyncIterator[bytes]:
+    """
+    Server-Sent Events body for a subscriber; unsubscribes when the client goes away.
+
+    The stream ends after an overflow or shutdown, and the client's
+    EventSource reconnects with Last-Event-ID after ``retry_ms``.
+    """
+    try:
+        yield b"retry: %d\n\n" % retry_ms
+        while True:
+            item = await subscriber.get()
+            if item is PING:
+                yield SSE_PING
+            elif isinstance(item, FeedEvent):
+                yield item.sse
+            else:
+                return
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+class SupabaseRealtimeSource:
+    """
+    Publish Supabase Realtime changes on the routines table to a RoutineEvents bus.
+
+    Unlike the in-process ``routine_events`` this also sees writes made by
+    other workers and services, so listeners that must hear every write
+    (the change hub, the vector indexer) subscribe to ``events``. Deletes
+    only carry the owner when the table uses ``REPLICA IDENTITY FULL``
+    (see migration 006).
+    """
+
+    ACTIONS = {"INSERT": "created", "UPDATE": "updated", "DELETE": "deleted"}
+
+    def __init__(self, events: RoutineEvents, url: str, key: str, table: str = "routines"):
+        self.events = events
+        self.url = url
+        self.key = key
+        self.table = table
+        self._client = None
+
+    def _on_change(self, payload: dict[str, Any]) -> None:
+        data = payload.get("data", {})
+        action = self.ACTIONS.get(data.get("type"))
+        routine = data.get("record") or data.get("old_record") or {}
+        if action is None or "id" not in routine:
+            return
+        self.events.publish(action, [routine])
+
+    async def start(self) -> None:
+        """Connect and subscribe to the table's changes."""
+        from realtime import AsyncRealtimeClient
+
+        self._client = AsyncRealtimeClient(f"{self.url.rstrip('/')}/realtime/v1", self.key)
+        await self._client.connect()
+        channel = self._client.channel(f"classmind-{self.table}")
+        channel.on_postgres_changes("*", callback=self._on_change, table=self.table, schema="public")
+        await channel.subscribe()
+        logger.info("Subscribed to Supabase Realtime changes on %s", self.table)
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,316 @@
+"""Response compression (zstd, brotli, gzip) negotiated through Accept-Encoding."""
+import asyncio
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+import zstandard
+from app.core.etag import matching_tag, with_coding
+from app.core.logging import get_logger
+from app.core.metrics import Counter, registry
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = get_logger(__name__)
+
+COMPRESSED_BYTES = registry.register(Counter(
+    "classmind_http_compressed_bytes_total",
+    "Response body bytes before ('in') and after ('out') compression, by encoding.",
+    ("encoding", "stage"),
+))
+
+# Prefixes of content types worth compressing; text/event-stream is excluded
+# explicitly because buffering or re-framing would delay events
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/xml", "application/javascript",
+    "application/problem+json", "application/geo+json", "image/svg+xml", "text/",
+)
+NEVER_COMPRESS = ("text/event-stream",)
+
+
+class _Stream(ABC):
+    """Incremental compressor for one response: ``chunk`` per body part, then ``finish``."""
+
+    @abstractmethod
+    def chunk(self, data: bytes) -> bytes:
+        """Compress one body part, returning whatever output is ready."""
+
+    @abstractmethod
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last body part and flush the end of the stream."""
+
+
+class _GzipStream(_Stream):
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Sync flush so the client can decode what it has so far
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH)
+
+
+class _ZstdStream(_Stream):
+    def __init__(self, level: int):
+        self._level = level
+        self._z = None
+
+    def _obj(self):
+        if self._z is None:
+            self._z = zstandard.ZstdCompressor(level=self._level).compressobj()
+        return self._z
+
+    def chunk(self, data: bytes) -> bytes:
+        z = self._obj()
+        return z.compress(data) + z.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._z is None:
+            # Whole body at once: the frame records its size
+            return zstandard.ZstdCompressor(level=self._level).compress(data)
+        return self._z.compress(data) + self._z.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class _BrotliStream(_Stream):
+    def __init__(self, quality: int):
+        self._z = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.process(data) + self._z.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.process(data) + self._z.finish()
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses the client can decode.
+
+    The encoding is the client's most preferred (by q-value) of
+    ``encodings``, ties going to the earlier entry, so the default order
+    favours zstd, then brotli (when the ``brotli`` package is installed),
+    then gzip.
+
+    A body sent in one message is compressed whole, and only if it has at
+    least ``minimum_size`` bytes. Streaming responses (exports) are
+    compressed chunk by chunk with a flush after each, so the client still
+    receives data as it is produced. Server-Sent Events, responses that
+    already have a Content-Encoding or ask for ``no-transform``, and
+    non-text types pass through untouched. Bodies or chunks of at least
+    ``offload_size`` bytes are compressed in a worker thread so the event
+    loop keeps serving other requests.
+
+    Encoded responses get their own strong ETag (``"<tag>-<coding>"``, see
+    :func:`app.core.etag.with_coding`). Every compressible response, and
+    every 304, carries ``Vary: Accept-Encoding`` so caches keep the variants
+    apart; a 304 echoes the tag of the variant the client already holds.
+    """
+
+    def __init__(
+        self,
+        app,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+        minimum_size: int = 1024,
+        offload_size: int = 256 * 1024,
+        zstd_level: int = 3,
+        brotli_quality: int = 4,
+        gzip_level: int = 6,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        factories: dict[str, Callable[[], _Stream]] = {
+            "zstd": lambda: _ZstdStream(zstd_level),
+            "gzip": lambda: _GzipStream(gzip_level),
+        }
+        if brotli is not None:
+            factories["br"] = lambda: _BrotliStream(brotli_quality)
+        elif "br" in encodings:
+            logger.info("brotli is not installed; 'br' responses are disabled")
+        self.encodings = [encoding for encoding in encodings if encoding in factories]
+        self._factories = factories
+
+    def choose(self, accept_encoding: str) -> Optional[str]:
+        """Pick the encoding for a request, or None to send the body as is."""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = if_none_match = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+            elif name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+        encoding = self.choose(accept) if accept else None
+        responder = _CompressingResponder(self, encoding, send, if_none_match)
+        await self.app(scope, receive, responder.send)
+
+    def new_stream(self, encoding: str) -> _Stream:
+        return self._factories[encoding]()
+
+    async def compress(self, fn: Callable[[bytes], bytes], data: bytes) -> bytes:
+        """Run ``fn(data)``, in a worker thread when ``data`` is large."""
+        if len(data) >= self.offload_size:
+            return await asyncio.to_thread(fn, data)
+        return fn(data)
+
+
+class _CompressingResponder:
+    """Per-response ``send`` wrapper deciding whether and how to compress."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self._send = send
+        self._start: Optional[dict] = None
+        self._stream: Optional[_Stream] = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def _eligible(self, start: dict) -> bool:
+        if start["status"] < 200 or start["status"] in (204, 206, 304):
+            return False
+        content_type = ""
+        for name, value in start.get("headers", ()):
+            if name == b"content-encoding":
+                return False
+            if name == b"cache-control" and b"no-transform" in value.lower():
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        if content_type.startswith(NEVER_COMPRESS):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _with_vary(start: dict) -> dict:
+        """The start message with Accept-Encoding added to its Vary header."""
+        headers = list(start.get("headers", ()))
+        vary = [value for name, value in headers if name == b"vary"]
+        vary_values = {v.strip().lower() for value in vary for v in value.split(b",")}
+        if b"accept-encoding" in vary_values or b"*" in vary_values:
+            return start
+        vary.append(b"Accept-Encoding")
+        headers = [(name, value) for name, value in headers if name != b"vary"]
+        headers.append((b"vary", b", ".join(vary)))
+        return {**start, "headers": headers}
+
+    def _start_message(self, length: Optional[int]) -> dict:
+        headers = []
+        for name, value in self._with_vary(self._start)["headers"]:
+            if name == b"content-length":
+                continue
+            if name == b"etag":
+                value = with_coding(value.decode("latin-1"), self.encoding).encode("latin-1")
+            headers.append((name, value))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return {**self._start, "headers": headers}
+
+    def _not_modified(self, start: dict) -> dict:
+        """A 304 with the full response's Vary and the ETag of the variant the client holds."""
+        headers = []
+        for name, value in self._with_vary(start)["headers"]:
+            if name == b"etag":
+                held = matching_tag(self.if_none_match, value.decode("latin-1"))
+                if held is not None:
+                    value = held.encode("latin-1")
+            headers.append((name, value))
+        return {**start, "headers": headers}
+
+    async def send(self, message: dict) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            if message["status"] == 304:
+                self._passthrough = True
+                await self._send(self._not_modified(message))
+            elif not self._eligible(message):
+                self._passthrough = True
+                await self._send(message)
+            elif self.encoding is None:
+                # Identity for this client, but others get an encoded variant
+                self._passthrough = True
+                await self._send(self._with_vary(message))
+            else:
+                self._start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        middleware = self.middleware
+
+        if self._stream is None and not more_body:
+            # Whole body in one message
+            if len(body) < middleware.minimum_size:
+                # Uncompressed because of its size, but another request could get a compressed copy
+                self._passthrough = True
+                await self._send(self._with_vary(self._start))
+                await self._send(message)
+                return
+            compressed = await middleware.compress(middleware.new_stream(self.encoding).finish, body)
+            self._record(len(body), len(compressed))
+            await self._send(self._start_message(len(compressed)))
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self._stream is None:
+            # First part of a streamed body: the length is unknown from here on
+            self._stream = middleware.new_stream(self.encoding)
+            await self._send(self._start_message(None))
+
+        compress = self._stream.chunk if more_body else self._stream.finish
+        compressed = await middleware.compress(compress, body)
+        self._bytes_in += len(body)
+        self._bytes_out += len(compressed)
+        if not more_body:
+            self._record(self._bytes_in, self._bytes_out)
+        if compressed or not more_body:
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _record(self, bytes_in: int, bytes_out: int) -> None:
+        COMPRESSED_BYTES.inc(self.encoding, "in", amount=bytes_in)
+        COMPRESSED_BYTES.inc(self.encoding, "out", amount=bytes_out)
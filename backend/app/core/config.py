@@ -9,12 +9,98 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_POOL_TIMEOUT_SECONDS: float = 5.0
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0
+    SUPABASE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    SUPABASE_HTTP2: bool = True
+    
+    # Routines read-through cache ("memory://" or a redis:// URL shared by workers)
+    ROUTINES_CACHE_ENABLED: bool = True
+    ROUTINES_CACHE_URL: str = "memory://"
+    ROUTINES_CACHE_TTL_SECONDS: float = 30.0
+    ROUTINES_CACHE_MAX_ENTRIES: int = 10_000
+    
+    # Single-flight reads: concurrent identical get/list calls share one query
+    ROUTINES_COALESCE_READS: bool = True
+    
+    # Serve routine rows without re-validating them through the response model
+    RESPONSE_TRUSTED_ROWS: bool = True
+    
+    # Response compression, in server preference order ("br" needs the brotli package)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_OFFLOAD_SIZE: int = 256 * 1024
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_GZIP_LEVEL: int = 6
+    
+    # Bulk routine endpoints
+    ROUTINES_BULK_MAX_ITEMS: int = 5_000
+    ROUTINES_BULK_CHUNK_SIZE: int = 500
+    ROUTINES_BULK_UPDATE_CONCURRENCY: int = 20
+    ROUTINES_EXPORT_PAGE_SIZE: int = 1_000
+    ROUTINES_IMPORT_MAX_ERRORS: int = 100
+    
+    # Timetable indexes (conflict detection, current/next class)
+    ROUTINE_DEFAULT_DURATION_MINUTES: int = 60
+    TIMETABLE_INDEX_TTL_SECONDS: float = 300.0
+    TIMETABLE_TIMEZONE: str = "UTC"
+    
+    # Routine change stream (/api/routines/stream; source "events" is this
+    # process's writes, "realtime" is Supabase Realtime for multi-worker
+    # setups, and then also keeps the vector index current)
+    ROUTINES_STREAM_SOURCE: str = "events"
+    ROUTINES_STREAM_QUEUE_SIZE: int = 256
+    ROUTINES_STREAM_REPLAY_SIZE: int = 100
+    ROUTINES_STREAM_REPLAY_USERS: int = 10_000
+    ROUTINES_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    
+    # Class reminders (/api/notifications); sink is log://, memory:// or a webhook URL.
+    # Opt-in: the scheduler reads every routine at startup, and exactly one
+    # process may run it (each one would deliver every reminder)
+    NOTIFICATIONS_ENABLED: bool = False
+    NOTIFICATIONS_LEAD_MINUTES: int = 10
+    NOTIFICATIONS_SINK_URL: str = "log://"
+    NOTIFICATIONS_BATCH_SIZE: int = 500
+    NOTIFICATIONS_TICK_SECONDS: float = 1.0
     
     # OpenAI
     OPENAI_API_KEY: str
     
+    # Embeddings ("openai", or "hash" for the deterministic offline backend)
+    EMBEDDINGS_BACKEND: str = "openai"
+    EMBEDDINGS_CACHE_PATH: str = "data/embeddings.sqlite3"
+    EMBEDDINGS_CACHE_MAX_ENTRIES: int = 100_000
+    EMBEDDINGS_BATCH_SIZE: int = 256
+    EMBEDDINGS_MAX_CONCURRENCY: int = 4
+    
+    # Persistent routine vector index (opt-in: every routine write is embedded)
+    VECTOR_INDEX_ENABLED: bool = False
+    VECTOR_INDEX_DIR: str = "data/vector_index"
+    VECTOR_INDEX_RESYNC_SECONDS: float = 3600.0
+    EMBEDDING_DIM: int = 1536
+    
     # Clerk Auth
     CLERK_JWKS_URL: str
+    JWKS_CACHE_SECONDS: float = 12 * 3600
+    JWKS_REFRESH_AHEAD_SECONDS: float = 3600
+    JWKS_UNKNOWN_KID_REFETCH_SECONDS: float = 60
+    JWT_CACHE_MAX_SIZE: int = 10_000
+    JWT_CACHE_MAX_TTL_SECONDS: float = 300.0
+    
+    # Logging ("text" or "json"; LOG_QUEUE writes from a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_QUEUE: bool = False
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_SAMPLE_RATES: str = ""  # e.g. "auth.user_authenticated=0.01"
+    
+    # Prometheus metrics on /metrics (request latency, in-flight, phase timings)
+    METRICS_ENABLED: bool = True
     
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000"
@@ -0,0 +1,181 @@
+"""Timetable clash detection over per-day interval indexes."""
+import heapq
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator
+from app.core.timeparse import DAY_NAMES, parse_day, parse_time_range
+
+# Routine columns that name a resource which cannot be in two places at once
+RESOURCE_COLUMNS = {"teacher": "teacher", "batch": "batch_id", "room": "room"}
+
+# Columns whose change can create or resolve a clash
+SCHEDULE_COLUMNS = frozenset({"day", "time", *RESOURCE_COLUMNS.values()})
+
+BucketKey = tuple[str, str, int]  # (resource kind, normalised resource, weekday)
+
+
+@dataclass(frozen=True)
+class Slot:
+    """One routine occupying ``[start, end)`` minutes of a day."""
+    routine_id: int
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """Two routines that book the same resource at overlapping times."""
+    kind: str
+    resource: str
+    day: str
+    routine_id: int | None
+    conflicting_id: int
+    start: str
+    end: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _clock(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class IntervalBucket:
+    """
+    Bookings of one resource on one day, kept sorted by start minute.
+
+    Overlap queries bisect the start list and only scan the window of
+    starts that could still be running, which is bounded by the longest
+    booking seen, so a lookup is O(log n) plus the handful of candidates.
+    """
+
+    __slots__ = ("label", "starts", "slots", "max_length")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.starts: list[int] = []
+        self.slots: list[Slot] = []
+        self.max_length = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, slot: Slot) -> None:
+        i = bisect_right(self.starts, slot.start)
+        self.starts.insert(i, slot.start)
+        self.slots.insert(i, slot)
+        self.max_length = max(self.max_length, slot.end - slot.start)
+
+    def remove(self, slot: Slot) -> None:
+        i = bisect_left(self.starts, slot.start)
+        while i < len(self.slots) and self.starts[i] == slot.start:
+            if self.slots[i].routine_id == slot.routine_id:
+                del self.starts[i]
+                del self.slots[i]
+                return
+            i += 1
+
+    def overlapping(self, start: int, end: int) -> list[Slot]:
+        """Bookings that overlap ``[start, end)``."""
+        lo = bisect_right(self.starts, start - self.max_length)
+        hi = bisect_left(self.starts, end)
+        return [slot for slot in self.slots[lo:hi] if slot.end > start]
+
+    def overlapping_pairs(self) -> Iterator[tuple[Slot, Slot]]:
+        """Every overlapping pair, by a sweep over the sorted bookings."""
+        running: list[tuple[int, int, Slot]] = []
+        for slot in self.slots:
+            while running and running[0][0] <= slot.start:
+                heapq.heappop(running)
+            for _, _, other in running:
+                yield other, slot
+            heapq.heappush(running, (slot.end, slot.routine_id, slot))
+
+
+class TimetableIndex:
+    """
+    Interval indexes for one timetable: a bucket per (resource, weekday).
+
+    Routines without a recognisable day or time, or without any resource
+    column set, are not placed and never conflict.
+    """
+
+    def __init__(self, default_minutes: int = 60):
+        self.default_minutes = default_minutes
+        self._buckets: dict[BucketKey, IntervalBucket] = {}
+        self._placed: dict[int, list[tuple[BucketKey, Slot]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._placed)
+
+    def placements(self, routine: dict[str, Any]) -> list[tuple[BucketKey, str, Slot]]:
+        """Buckets a routine would occupy, as (bucket key, resource label, slot)."""
+        day = parse_day(routine.get("day"))
+        span = parse_time_range(routine.get("time"), self.default_minutes)
+        if day is None or span is None:
+            return []
+        slot = Slot(routine.get("id"), span[0], span[1])
+        placements = []
+        for kind, column in RESOURCE_COLUMNS.items():
+            value = routine.get(column)
+            if value is None or str(value).strip() == "":
+                continue
+            label = str(value).strip()
+            placements.append(((kind, label.casefold(), day), label, slot))
+        return placements
+
+    def add(self, routine: dict[str, Any]) -> None:
+        """Place a routine, replacing its previous placement."""
+        self.remove(routine["id"])
+        placed = []
+        for key, label, slot in self.placements(routine):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = IntervalBucket(label)
+            bucket.add(slot)
+            placed.append((key, slot))
+        if placed:
+            self._placed[routine["id"]] = placed
+
+    def remove(self, routine_id: int) -> None:
+        """Remove a routine's placement, if any."""
+        for key, slot in self._placed.pop(routine_id, []):
+            bucket = self._buckets[key]
+            bucket.remove(slot)
+            if not bucket:
+                del self._buckets[key]
+
+    def conflicts_for(self, routine: dict[str, Any]) -> list[Conflict]:
+        """
+        Clashes a routine would have with the rest of the timetable.
+
+        The routine's own current placement (same ``id``) is ignored, so
+        this answers both "can I insert this?" and "can I update to this?".
+        """
+        conflicts = []
+        own_id = routine.get("id")
+        for (kind, _, day), label, slot in self.placements(routine):
+            bucket = self._buckets.get((kind, label.casefold(), day))
+            if bucket is None:
+                continue
+            for other in bucket.overlapping(slot.start, slot.end):
+                if own_id is not None and other.routine_id == own_id:
+                    continue
+                conflicts.append(Conflict(
+                    kind, bucket.label, DAY_NAMES[day], own_id, other.routine_id,
+                    _clock(max(slot.start, other.start)), _clock(min(slot.end, other.end)),
+                ))
+        return conflicts
+
+    def find_all(self) -> list[Conflict]:
+        """Every clash in the timetable, in O(n log n + conflicts)."""
+        conflicts = []
+        for (kind, _, day), bucket in sorted(self._buckets.items(), key=lambda item: (item[0][2], item[0][0], item[0][1])):
+            for first, second in bucket.overlapping_pairs():
+                conflicts.append(Conflict(
+                    kind, bucket.label, DAY_NAMES[day], first.routine_id, second.routine_id,
+                    _clock(max(first.start, second.start)), _clock(min(first.end, second.end)),
+                ))
+        return conflicts
+
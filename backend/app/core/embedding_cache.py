@@ -0,0 +1,241 @@
+"""Content-addressed embedding cache and a deterministic local embedding backend."""
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+import numpy as np
+from langchain_core.embeddings import Embeddings
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic, dependency-free embeddings for offline use and benchmarks.
+
+    Word unigrams and bigrams are hashed into ``dim`` signed buckets (the
+    hashing trick) and the result is L2-normalised, so texts sharing words
+    end up close under cosine similarity. The same text always yields the
+    same vector, across processes and machines.
+    """
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+        self.model = f"hash-{dim}"
+
+    def _embed(self, text: str) -> list[float]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+class EmbeddingStore:
+    """
+    SQLite table of embeddings keyed by content hash, with LRU eviction.
+
+    Each row records when it was last read; once the table grows past
+    ``max_entries`` the least recently used rows are removed, down to 90%
+    of the limit so eviction does not run on every insert. All methods are
+    blocking and thread-safe; async callers run them in a worker thread.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 100_000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        """Return the stored vectors for the keys that are present."""
+        found: dict[bytes, np.ndarray] = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+        return found
+
+    def put_many(self, items: dict[bytes, np.ndarray]) -> None:
+        """Store vectors, evicting least recently used rows if over capacity."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()],
+            )
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+                self.evictions += excess
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only sends texts it has never seen to the model.
+
+    Texts are keyed by a hash of the model name and the exact text, so the
+    same course title across sections and batches is embedded once. Within
+    a call, duplicates are collapsed before the lookup; the remaining misses
+    are split into batches of at most ``batch_size`` texts and up to
+    ``max_concurrency`` batches are sent to the model at once.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        store: EmbeddingStore,
+        batch_size: int = 256,
+        max_concurrency: int = 4,
+        namespace: str | None = None,
+    ):
+        self.underlying = underlying
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.namespace = namespace or getattr(underlying, "model", type(underlying).__name__)
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.namespace}\0{text}".encode("utf-8"), digest_size=20).digest()
+
+    def _plan(self, texts: list[str]) -> tuple[list[bytes], dict[bytes, str]]:
+        keys = [self._key(text) for text in texts]
+        unique = dict(zip(keys, texts))
+        return keys, unique
+
+    def _batches(self, missing: dict[bytes, str]) -> list[list[tuple[bytes, str]]]:
+        items = list(missing.items())
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    def _finish(
+        self,
+        keys: list[bytes],
+        found: dict[bytes, np.ndarray],
+        computed: dict[bytes, np.ndarray],
+    ) -> list[list[float]]:
+        self.hits += len(found)
+        self.misses += len(computed)
+        found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, serving repeats from the cache and batching misses."""
+        if not texts:
+            return []
+        keys, unique = self._plan(texts)
+        found = await asyncio.to_thread(self.store.get_many, list(unique))
+        missing = {key: text for key, text in unique.items() if key not in found}
+
+        computed: dict[bytes, np.ndarray] = {}
+        if missing:
+            gate = asyncio.Semaphore(self.max_concurrency)
+
+            async def run(batch: list[tuple[bytes, str]]) -> None:
+                async with gate:
+                    vectors = await self.underlying.aembed_documents([text for _, text in batch])
+                self.batches += 1
+                for (key, _), vector in zip(batch, vectors):
+                    computed[key] = np.asarray(vector, dtype=np.float32)
+
+            await asyncio.gather(*(run(batch) for batch in self._batches(missing)))
+            await asyncio.to_thread(self.store.put_many, computed)
+        return self._finish(keys, found, computed)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Blocking variant of :meth:`aembed_documents` (batches run one after another)."""
+        if not texts:
+            return []
+        keys, unique = self._plan(texts)
+        found = self.store.get_many(list(unique))
+        missing = {key: text for key, text in unique.items() if key not in found}
+
+        computed: dict[bytes, np.ndarray] = {}
+        for batch in self._batches(missing):
+            vectors = self.underlying.embed_documents([text for _, text in batch])
+            self.batches += 1
+            for (key, _), vector in zip(batch, vectors):
+                computed[key] = np.asarray(vector, dtype=np.float32)
+        self.store.put_many(computed)
+        return self._finish(keys, found, computed)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters for this worker."""
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "evictions": self.store.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
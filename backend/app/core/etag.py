@@ -0,0 +1,107 @@
+"""Strong ETag computation and conditional request matching."""
+import hashlib
+from typing import Any, Iterable
+import orjson
+
+# Content-codings that get their own strong ETag ("<tag>-<coding>") when
+# CompressionMiddleware encodes a response
+CODINGS = ("zstd", "br", "gzip")
+
+
+def compute_etag(rows: Iterable[dict[str, Any]], variant: str = "") -> str:
+    """
+    Compute a strong ETag for one or more routine rows.
+    
+    Rows carrying ``updated_at`` are hashed by ``(id, updated_at)`` only,
+    which is cheap and changes whenever the row does. Rows without it (for
+    example projections that leave the column out) fall back to hashing
+    their full content.
+    
+    Args:
+        rows: Rows in response order
+        variant: Anything else that changes the representation (e.g. the
+            requested fields), so different projections get different tags
+        
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.blake2b(variant.encode("utf-8"), digest_size=16)
+    for row in rows:
+        stamp = row.get("updated_at")
+        if stamp is not None:
+            digest.update(f"{row.get('id')}@{stamp};".encode("utf-8"))
+        else:
+            digest.update(orjson.dumps(row, option=orjson.OPT_SORT_KEYS))
+            digest.update(b";")
+    return f'"{digest.hexdigest()}"'
+
+
+def with_coding(etag: str, coding: str) -> str:
+    """
+    ETag of a representation encoded with ``coding``.
+    
+    A strong validator must differ between content-codings (RFC 9110
+    8.8.3), so ``"abc"`` becomes ``"abc-gzip"``. Weak tags are returned
+    unchanged.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def strip_coding(tag: str) -> str:
+    """Undo :func:`with_coding`, so encoded and identity tags compare equal."""
+    for coding in CODINGS:
+        suffix = f'-{coding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def _parse(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def matching_tag(header: str | None, etag: str) -> str | None:
+    """
+    The tag in an ``If-None-Match`` header that matches ``etag``, if any.
+    
+    Uses weak comparison and ignores content-coding suffixes, and returns
+    the tag as the client holds it (without ``W/``).
+    """
+    if not header:
+        return None
+    for tag in _parse(header):
+        tag = tag.removeprefix("W/")
+        if strip_coding(tag) == etag:
+            return tag
+    return None
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """
+    Evaluate ``If-None-Match`` (weak comparison, RFC 9110 13.1.2).
+    
+    Tags of any content-coding of the representation match.
+    
+    Returns:
+        True if the client's copy is current and a 304 should be sent
+    """
+    if not header:
+        return False
+    return "*" in _parse(header) or matching_tag(header, etag) is not None
+
+
+def if_match(header: str | None, etag: str) -> bool:
+    """
+    Evaluate ``If-Match`` (strong comparison, RFC 9110 13.1.1).
+    
+    Tags of any content-coding of the representation match.
+    
+    Returns:
+        True if the request may proceed (no header, ``*`` or a matching tag)
+    """
+    if header is None:
+        return True
+    tags = _parse(header)
+    return "*" in tags or any(strip_coding(tag) == etag for tag in tags)
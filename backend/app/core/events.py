@@ -0,0 +1,63 @@
+"""In-process notifications for routine writes."""
+from dataclasses import dataclass
+from typing import Any, Callable, Literal
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+RoutineAction = Literal["created", "updated", "deleted"]
+
+
+@dataclass(frozen=True)
+class RoutineChange:
+    """A routine row that was written through RoutinesRepo."""
+    action: RoutineAction
+    routine: dict[str, Any]
+
+    @property
+    def routine_id(self) -> int:
+        return self.routine["id"]
+
+    @property
+    def user_id(self) -> str | None:
+        return self.routine.get("user_id")
+
+
+class RoutineEvents:
+    """
+    Synchronous fan-out of routine changes to registered listeners.
+
+    Listeners run inline on the event loop right after the write succeeds,
+    so they must be cheap: anything slow (embedding, I/O) should be handed
+    to a background task or queue. A failing listener is logged and does
+    not affect the write or the other listeners.
+    """
+
+    def __init__(self):
+        self._listeners: list[Callable[[RoutineChange], None]] = []
+
+    def subscribe(self, listener: Callable[[RoutineChange], None]) -> None:
+        """Register a listener for every subsequent change."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[RoutineChange], None]) -> None:
+        """Stop delivering changes to a listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def publish(self, action: RoutineAction, routines: list[dict[str, Any]]) -> None:
+        """Deliver one change per routine to every listener."""
+        if not self._listeners:
+            return
+        for routine in routines:
+            change = RoutineChange(action, routine)
+            for listener in self._listeners:
+                try:
+                    listener(change)
+                except Exception as e:
+                    logger.error("Routine change listener %r failed: %s", listener, e)
+
+
+# Global routine change bus
+routine_events = RoutineEvents()
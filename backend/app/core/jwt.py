@@ -1,21 +1,112 @@
 """Clerk JWT verification and JWKS management."""
+import asyncio
 import httpx
 import time
-from jose import jwt
-from typing import Dict, Optional
+from jose import jwk, jwt
+from jose.backends.base import Key
+from typing import Any, Dict, Optional, Tuple
 from app.core.logging import get_logger
+from app.core.token_cache import VerifiedTokenCache
 
 logger = get_logger(__name__)
 
 
 class ClerkJWKS:
-    """Manages Clerk JWKS fetching and caching."""
+    """
+    Manages Clerk JWKS fetching and caching.
+    
+    Keys are parsed once per fetch and indexed by ``kid``. Concurrent refreshes
+    share a single in-flight fetch, keys are refreshed in the background shortly
+    before the cache expires, and an unknown ``kid`` (key rotation) triggers a
+    rate-limited refetch instead of failing straight away.
+    """
     
-    def __init__(self, jwks_url: str):
+    def __init__(
+        self,
+        jwks_url: str,
+        cache_duration: float = 12 * 3600,
+        refresh_ahead: float = 3600,
+        unknown_kid_refetch_interval: float = 60,
+        retry_interval: float = 30,
+        timeout: float = 10.0,
+    ):
         self.jwks_url = jwks_url
         self._jwks: Optional[Dict] = None
+        self._keys: Dict[str, Tuple[Key, str]] = {}
         self._fetched_at: float = 0
-        self._cache_duration = 12 * 3600  # 12 hours
+        self._cache_duration = cache_duration  # 12 hours by default
+        self._refresh_ahead = refresh_ahead
+        self._unknown_kid_refetch_interval = unknown_kid_refetch_interval
+        self._retry_interval = retry_interval
+        self._timeout = timeout
+        self._last_forced_refresh: float = float("-inf")
+        self._retry_after: float = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self._timeout)
+        return self._client
+    
+    async def _fetch(self) -> None:
+        """Fetch JWKS from Clerk and rebuild the kid index. Never raises."""
+        logger.info("Fetching JWKS from %s", self.jwks_url)
+        try:
+            response = await self._http_client().get(self.jwks_url)
+            response.raise_for_status()
+            jwks = response.json()
+        except Exception as e:
+            self._retry_after = time.monotonic() + self._retry_interval
+            logger.error("Failed to fetch JWKS: %s", e)
+            return
+        
+        keys: Dict[str, Tuple[Key, str]] = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            alg = key_data.get("alg", "RS256")
+            try:
+                keys[kid] = (jwk.construct(key_data, alg), alg)
+            except Exception as e:
+                logger.warning("Skipping unusable JWK %s: %s", kid, e)
+        
+        self._jwks = jwks
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        logger.info("JWKS fetched and cached successfully (%d keys)", len(keys))
+    
+    async def refresh(self) -> None:
+        """Refresh JWKS, joining the in-flight fetch if there is one."""
+        task = self._refresh_task
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch())
+            self._refresh_task = task
+        # Shield so a cancelled request does not abort the shared fetch
+        await asyncio.shield(task)
+    
+    def _refresh_in_background(self) -> None:
+        """Start a refresh without waiting for it."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+    
+    async def _ensure_fresh(self) -> None:
+        """Fetch on a cold or expired cache, refresh ahead of expiry otherwise."""
+        now = time.monotonic()
+        age = now - self._fetched_at
+        
+        if not self._keys:
+            if now >= self._retry_after:
+                await self.refresh()
+        elif age > self._cache_duration:
+            # Keep serving the stale keys while Clerk is unreachable
+            if now >= self._retry_after:
+                await self.refresh()
+        elif age > self._cache_duration - self._refresh_ahead:
+            if now >= self._retry_after:
+                self._refresh_in_background()
     
     async def get(self) -> Dict:
         """
@@ -24,35 +115,91 @@ class ClerkJWKS:
         Returns:
             JWKS dictionary
         """
-        current_time = time.time()
+        await self._ensure_fresh()
+        return self._jwks or {"keys": []}
+    
+    async def get_key(self, kid: str) -> Optional[Tuple[Key, str]]:
+        """
+        Get the parsed signing key for a key ID.
         
-        if not self._jwks or (current_time - self._fetched_at) > self._cache_duration:
-            logger.info(f"Fetching JWKS from {self.jwks_url}")
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.jwks_url, timeout=10.0)
-                response.raise_for_status()
-                self._jwks = response.json()
-                self._fetched_at = current_time
-                logger.info("JWKS fetched and cached successfully")
+        Args:
+            kid: Key ID from the token header
+            
+        Returns:
+            Tuple of (parsed key, algorithm), or None if the kid is unknown
+        """
+        await self._ensure_fresh()
+        entry = self._keys.get(kid)
+        
+        if entry is None:
+            now = time.monotonic()
+            if now - self._last_forced_refresh >= self._unknown_kid_refetch_interval:
+                self._last_forced_refresh = now
+                logger.info("Unknown JWK kid %s, refetching JWKS", kid)
+                await self.refresh()
+                entry = self._keys.get(kid)
         
-        return self._jwks
+        return entry
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 
 # Global JWKS client instance
 _jwks_client: Optional[ClerkJWKS] = None
 
+# Global cache of verified tokens
+_token_cache = VerifiedTokenCache()
+
 
-def init_jwks_client(jwks_url: str) -> None:
-    """Initialize the global JWKS client."""
+def init_jwks_client(jwks_url: str, **options: float) -> None:
+    """
+    Initialize the global JWKS client.
+    
+    Args:
+        jwks_url: Clerk JWKS endpoint
+        **options: Optional ClerkJWKS tuning (cache_duration, refresh_ahead,
+            unknown_kid_refetch_interval, retry_interval, timeout)
+    """
     global _jwks_client
-    _jwks_client = ClerkJWKS(jwks_url)
-    logger.info(f"JWKS client initialized with URL: {jwks_url}")
+    _jwks_client = ClerkJWKS(jwks_url, **options)
+    logger.info("JWKS client initialized with URL: %s", jwks_url)
+
+
+async def close_jwks_client() -> None:
+    """Release the global JWKS client's HTTP connections."""
+    if _jwks_client is not None:
+        await _jwks_client.aclose()
+
+
+def configure_token_cache(max_size: int, max_ttl: float) -> None:
+    """
+    Replace the global verified-token cache with one of the given size.
+
+    Args:
+        max_size: Maximum number of cached tokens (0 disables caching)
+        max_ttl: Upper bound in seconds on how long a token stays cached
+    """
+    global _token_cache
+    _token_cache = VerifiedTokenCache(max_size=max_size, max_ttl=max_ttl)
+    logger.info("Verified-token cache configured: max_size=%s, max_ttl=%ss", max_size, max_ttl)
+
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the verified-token cache."""
+    return _token_cache.stats()
 
 
 async def verify_clerk_jwt(token: str) -> Dict:
     """
     Verify a Clerk JWT token.
     
+    Successfully verified tokens are cached until they expire, so repeated
+    requests carrying the same bearer token skip the RS256 signature check.
+    
     Args:
         token: The JWT token to verify
         
@@ -65,10 +212,11 @@ async def verify_clerk_jwt(token: str) -> Dict:
     if _jwks_client is None:
         raise ValueError("JWKS client not initialized. Call init_jwks_client first.")
     
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
+    
     try:
-        # Get JWKS
-        jwks = await _jwks_client.get()
-        
         # Get the key ID from token header
         headers = jwt.get_unverified_header(token)
         kid = headers.get("kid")
@@ -76,29 +224,32 @@ async def verify_clerk_jwt(token: str) -> Dict:
         if not kid:
             raise ValueError("Token missing 'kid' in header")
         
-        # Find the matching key in JWKS
-        key = next((k for k in jwks.get("keys", []) if k.get("kid") == kid), None)
+        # Look up the pre-parsed key for this kid
+        entry = await _jwks_client.get_key(kid)
         
-        if key is None:
+        if entry is None:
             raise ValueError(f"No matching JWK found for kid: {kid}")
         
+        key, alg = entry
+        
         # Decode and verify the token
         payload = jwt.decode(
             token,
             key,
-            algorithms=[key.get("alg", "RS256")],
+            algorithms=[alg],
             options={
                 "verify_aud": False,  # Clerk uses multiple audiences
                 "verify_iss": True,
             }
         )
         
-        logger.debug(f"Successfully verified JWT for user: {payload.get('sub')}")
+        logger.debug("Successfully verified JWT for user: %s", payload.get("sub"))
+        _token_cache.put(token, payload)
         return payload
         
     except jwt.JWTError as e:
-        logger.warning(f"JWT verification failed: {str(e)}")
+        logger.warning("JWT verification failed: %s", e)
         raise ValueError(f"Invalid JWT: {str(e)}")
     except Exception as e:
-        logger.error(f"Unexpected error during JWT verification: {str(e)}")
+        logger.error("Unexpected error during JWT verification: %s", e)
         raise ValueError(f"JWT verification error: {str(e)}")
@@ -1,4 +1,35 @@
-from langchain_openai import OpenAIEmbeddings
-from app.core.config import OPENAI_API_KEY
+"""Embedding model provider, built on first use."""
+from functools import lru_cache
+from typing import Any
+from app.core.config import OPENAI_API_KEY, settings
 
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+
+@lru_cache
+def get_embeddings() -> Any:
+    """
+    Get the shared cached embedding model.
+
+    The backend (and, for "openai", the langchain_openai import) is only
+    loaded when embeddings are first needed.
+    """
+    from app.core.embedding_cache import CachedEmbeddings, EmbeddingStore, HashEmbeddings
+
+    if settings.EMBEDDINGS_BACKEND == "hash":
+        base_embeddings = HashEmbeddings(settings.EMBEDDING_DIM)
+    else:
+        from langchain_openai import OpenAIEmbeddings
+        base_embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+
+    return CachedEmbeddings(
+        base_embeddings,
+        EmbeddingStore(settings.EMBEDDINGS_CACHE_PATH, settings.EMBEDDINGS_CACHE_MAX_ENTRIES),
+        batch_size=settings.EMBEDDINGS_BATCH_SIZE,
+        max_concurrency=settings.EMBEDDINGS_MAX_CONCURRENCY,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # ``from app.core.langchain_utils import embeddings`` keeps working
+    if name == "embeddings":
+        return get_embeddings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
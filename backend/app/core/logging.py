@@ -1,33 +1,169 @@
 """Logging configuration for the application."""
+import atexit
+import itertools
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Any
+import time
+from typing import Any, Optional, TextIO
+
+import orjson
 
 
 # Define log format
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_sampler: Optional["SamplingFilter"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, plus any
+    ``extra`` fields passed to the logging call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = record.stack_info
+        return orjson.dumps(payload, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in every N records for high-frequency messages.
+
+    Records opt in with ``extra={"sample_key": "..."}``; ``rates`` maps a
+    key to the fraction of its records to keep (0.01 keeps every 100th).
+    Kept records carry ``sampled_every`` so counts can be scaled back up.
+    Warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.every = {key: max(1, round(1 / rate)) for key, rate in rates.items() if 0 < rate < 1}
+        self.dropped_keys = {key for key, rate in rates.items() if rate <= 0}
+        self._counters = {key: itertools.count() for key in self.every}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        if key in self.dropped_keys:
+            self.sampled_out += 1
+            return False
+        every = self.every.get(key)
+        if every is None:
+            return True
+        # itertools.count is atomic under the GIL, so no lock is needed
+        if next(self._counters[key]) % every:
+            self.sampled_out += 1
+            return False
+        record.sampled_every = every
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the listener thread without formatting them.
+
+    The stock QueueHandler formats every message in the calling thread;
+    here the message and its arguments travel as they are and are only
+    formatted by the listener. Exceptions are rendered up front because
+    tracebacks hold frames. When the queue is full the record is dropped
+    and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
-def setup_logging(level: str = "INFO") -> None:
+
+def setup_logging(
+    level: str = "INFO",
+    fmt: str = "text",
+    use_queue: bool = False,
+    queue_size: int = 10_000,
+    sample_rates: Optional[dict[str, float]] = None,
+    stream: Optional[TextIO] = None,
+) -> None:
     """
     Configure logging for the application.
     
     Args:
         level: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        fmt: "text" for the human-readable format, "json" for one JSON object per line
+        use_queue: Write from a background listener thread, so logging calls
+            never block on the output stream
+        queue_size: Records buffered for the listener before new ones are dropped
+        sample_rates: Fraction of records to keep per ``sample_key``
+        stream: Output stream (stdout by default)
     """
+    global _listener, _queue_handler, _sampler
+    
     # Convert string level to logging constant
     numeric_level = getattr(logging, level.upper(), logging.INFO)
     
+    stop_listener()
+    
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+    
+    handler: logging.Handler = output
+    if use_queue:
+        _queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        handler = _queue_handler
+    else:
+        _queue_handler = None
+    
+    _sampler = SamplingFilter(sample_rates) if sample_rates else None
+    if _sampler is not None:
+        handler.addFilter(_sampler)
+    
     # Configure root logger
-    logging.basicConfig(
-        level=numeric_level,
-        format=LOG_FORMAT,
-        datefmt=DATE_FORMAT,
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(numeric_level)
     
     # Configure uvicorn loggers
     uvicorn_logger = logging.getLogger("uvicorn")
@@ -40,7 +176,56 @@ def setup_logging(level: str = "INFO") -> None:
     app_logger = logging.getLogger("app")
     app_logger.setLevel(numeric_level)
     
-    logging.info("Logging configured successfully")
+    logging.info("Logging configured successfully (format=%s, queue=%s)", fmt, use_queue)
+
+
+def stop_listener() -> None:
+    """Flush queued records and stop the listener thread, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_listener)
+
+
+def logging_stats() -> dict[str, Any]:
+    """Records dropped on a full queue or sampled out, for this worker."""
+    return {
+        "queued": _listener is not None,
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+        "dropped": _queue_handler.dropped if _queue_handler is not None else 0,
+        "sampled_out": _sampler.sampled_out if _sampler is not None else 0,
+    }
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    Parse ``"key=rate,key=rate"`` into a dict.
+
+    Args:
+        value: Comma-separated ``sample_key=fraction`` pairs
+
+    Returns:
+        Mapping of sample key to the fraction of records to keep
+
+    Raises:
+        ValueError: If a pair is malformed or a rate is outside 0..1
+    """
+    rates: dict[str, float] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, rate = item.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"Invalid log sample rate {item!r}, expected key=rate")
+        fraction = float(rate)
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"Log sample rate for {key.strip()!r} must be between 0 and 1")
+        rates[key.strip()] = fraction
+    return rates
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -49,7 +234,7 @@ def get_logger(name: str) -> logging.Logger:
     
     Args:
         name: Name of the logger (typically __name__)
-        
+    
     Returns:
         Logger instance
     """
@@ -0,0 +1,336 @@
+"""
+Request-level performance metrics in Prometheus text format.
+
+Counters and histograms keep one cell per thread, so recording a value is a
+few list increments with no lock; cells are only summed when ``/metrics`` is
+scraped. Time spent in JWT verification, repository calls and serialization
+is attributed to the request being served through :func:`phase`.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    """Labelled values kept in per-thread cells and summed on read."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._cells: list[dict[tuple, list[float]]] = []
+        self._cells_lock = threading.Lock()  # taken once per thread, on its first record
+
+    def _width(self) -> int:
+        return 1
+
+    def _values(self, labels: tuple) -> list[float]:
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._local.cell = {}
+            with self._cells_lock:
+                self._cells.append(cell)
+        values = cell.get(labels)
+        if values is None:
+            values = cell[labels] = [0.0] * self._width()
+        return values
+
+    def collect(self) -> dict[tuple, list[float]]:
+        """Sum the per-thread cells, by label values."""
+        with self._cells_lock:
+            cells = list(self._cells)
+        totals: dict[tuple, list[float]] = {}
+        for cell in cells:
+            for labels, values in list(cell.items()):
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return totals
+
+    def _label_text(self, labels: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, values in sorted(self.collect().items()):
+            lines.extend(self._samples(labels, values))
+        return lines
+
+    def _samples(self, labels: tuple, values: list[float]) -> list[str]:
+        return [f"{self.name}{self._label_text(labels)} {_number(values[0])}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally labelled."""
+
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        self._values(labels)[0] += amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. requests in flight)."""
+
+    kind = "gauge"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        self._values(labels)[0] += amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self._values(labels)[0] -= amount
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, plus their sum."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _width(self) -> int:
+        # One count per bucket, one for +Inf, then the sum
+        return len(self.buckets) + 2
+
+    def observe(self, value: float, *labels: Any) -> None:
+        values = self._values(labels)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def _samples(self, labels: tuple, values: list[float]) -> list[str]:
+        lines = []
+        cumulative = 0.0
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, values):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{self._label_text(labels, le)} {_number(cumulative)}")
+        lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(values[-1])}")
+        lines.append(f"{self.name}_count{self._label_text(labels)} {_number(cumulative)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Registry:
+    """Metrics exposed together on ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "classmind_http_requests_total",
+    "HTTP requests served, by method, route template and status code.",
+    ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "classmind_http_request_duration_seconds",
+    "HTTP request latency from first byte in to last byte out.",
+    ("method", "route"),
+))
+IN_FLIGHT = registry.register(Gauge(
+    "classmind_http_requests_in_flight",
+    "HTTP requests currently being served.",
+))
+PHASE_DURATION = registry.register(Histogram(
+    "classmind_http_request_phase_seconds",
+    "Time a request spent in one phase (jwt, repo, serialize), per route.",
+    ("method", "route", "phase"),
+))
+REPO_CALL_DURATION = registry.register(Histogram(
+    "classmind_repo_call_duration_seconds",
+    "Latency of repository calls, by repository and method.",
+    ("repo", "method"),
+))
+COALESCED_CALLS = registry.register(Counter(
+    "classmind_repo_coalesced_calls_total",
+    "Coalesced repository reads: 'leader' ran the backend call, 'shared' joined one in flight.",
+    ("repo", "method", "outcome"),
+))
+
+UNMATCHED_ROUTE = "unmatched"
+BACKGROUND_ROUTE = "background"
+
+
+class RequestPhases:
+    """Seconds spent per phase while serving one request."""
+
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+
+_current_phases: ContextVar[RequestPhases | None] = ContextVar("request_phases", default=None)
+_phase_depth: ContextVar[int] = ContextVar("phase_depth", default=0)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Attribute the time spent in the block to phase ``name`` of the current request.
+
+    Outside a request (background tasks) the time is recorded under the
+    ``background`` route straight away. Nested phases are not counted
+    twice: only the outermost one records.
+    """
+    depth = _phase_depth.get()
+    token = _phase_depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _phase_depth.reset(token)
+        if depth == 0:
+            phases = _current_phases.get()
+            if phases is None:
+                PHASE_DURATION.observe(elapsed, "", BACKGROUND_ROUTE, name)
+            else:
+                phases.add(name, elapsed)
+
+
+def instrument_repo(name: str) -> Callable[[type], type]:
+    """
+    Class decorator timing every public coroutine method of a repository.
+
+    Each call is recorded in ``classmind_repo_call_duration_seconds`` and in
+    the ``repo`` phase of the current request.
+    """
+    def decorate(cls: type) -> type:
+        for attr, method in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, attr, _timed_repo_method(name, attr, method))
+        return cls
+    return decorate
+
+
+def _timed_repo_method(repo: str, attr: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with phase("repo"):
+                return await method(*args, **kwargs)
+        finally:
+            REPO_CALL_DURATION.observe(time.perf_counter() - start, repo, attr)
+    return wrapper
+
+
+def instrument_serialization() -> None:
+    """
+    Time FastAPI's response validation and encoding as the ``serialize`` phase.
+
+    ``fastapi.routing`` looks ``serialize_response`` up at call time, so
+    wrapping the module attribute covers every ``response_model`` route.
+    Idempotent.
+    """
+    import fastapi.routing
+
+    original = fastapi.routing.serialize_response
+    if getattr(original, "__wrapped__", None) is not None:
+        return
+
+    @functools.wraps(original)
+    async def serialize_response(*args, **kwargs):
+        with phase("serialize"):
+            return await original(*args, **kwargs)
+
+    fastapi.routing.serialize_response = serialize_response
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and phases per route.
+
+    The route label is the matched path template (``/api/routines/{routine_id}``),
+    so label cardinality stays bounded by the number of routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        phases = RequestPhases()
+        token = _current_phases.set(phases)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            _current_phases.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            REQUESTS.inc(method, route_label, status_code)
+            REQUEST_DURATION.observe(elapsed, method, route_label)
+            for name, seconds in phases.seconds.items():
+                PHASE_DURATION.observe(seconds, method, route_label, name)
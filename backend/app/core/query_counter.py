@@ -0,0 +1,51 @@
+"""Count SQL statements issued by SQLAlchemy within a block of code."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCount:
+    """Number of statements executed while the counter was active."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+_active: ContextVar[QueryCount | None] = ContextVar("query_count", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _active.get()
+    if counter is not None:
+        counter.value += 1
+
+
+def install_query_counter(engine: Engine | type[Engine]) -> None:
+    """
+    Hook an engine so :func:`count_queries` sees its statements (idempotent).
+
+    Pass the ``Engine`` class itself to cover every engine, including ones
+    created later.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """
+    Count statements executed in the current context.
+
+    The counter lives in a context variable, so concurrent requests (threads
+    or tasks) each see only their own queries.
+    """
+    counter = QueryCount()
+    token = _active.set(counter)
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
@@ -1,9 +1,217 @@
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from app.core.langchain_utils import embeddings
-
-def generate_routine_embeddings(routines: list):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    docs = splitter.create_documents([r["title"] + " " + r["description"] for r in routines])
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    return vectorstore
+"""Incremental embedding pipeline for routines."""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.events import RoutineChange
+from app.core.logging import get_logger
+from app.core.vector_index import RoutineVectorIndex, VectorIndexStore, text_digest
+
+logger = get_logger(__name__)
+
+
+def routine_text(routine: dict[str, Any]) -> str:
+    """Text that represents a routine in the vector index."""
+    return f"{routine.get('title') or ''} {routine.get('description') or ''}".strip()
+
+
+class RoutineIndexer:
+    """
+    Keeps each user's persistent vector index in step with their routines.
+
+    Changes published by RoutinesRepo (and, with Supabase Realtime, by other
+    workers) are queued per user and routine id, so bursts of writes to the
+    same routine collapse into one update. A single background task drains
+    the queue; only routines whose text digest changed are embedded, so
+    embedding spend is proportional to the change.
+
+    Changes only keep an index current once it holds all of the user's
+    routines; :meth:`needs_sync` tells when it has to be reconciled with
+    the database first.
+    """
+
+    def __init__(self, store: VectorIndexStore, embeddings: Any = None):
+        self.store = store
+        self._embeddings = embeddings
+        self._pending: dict[str, dict[int, Optional[dict[str, Any]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self.embedded = 0
+        self.skipped = 0
+
+    @property
+    def embeddings(self) -> Any:
+        """Embedding model, imported on first use."""
+        if self._embeddings is None:
+            from app.core.langchain_utils import get_embeddings
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    def on_change(self, change: RoutineChange) -> None:
+        """Routine event listener: queue the change for the background worker."""
+        if not change.user_id:
+            return
+        routine = None if change.action == "deleted" else change.routine
+        self._pending.setdefault(change.user_id, {})[change.routine_id] = routine
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._pending:
+            user_id = next(iter(self._pending))
+            changes = self._pending.pop(user_id)
+            try:
+                await self.apply(user_id, changes)
+            except Exception as e:
+                logger.error("Failed to update vector index for %s: %s", user_id, e)
+
+    async def apply(self, user_id: str, changes: dict[int, Optional[dict[str, Any]]]) -> int:
+        """
+        Apply routine changes to a user's index.
+
+        Args:
+            user_id: Owner of the routines
+            changes: Routine id -> current row, or None if the routine was deleted
+
+        Returns:
+            Number of texts that had to be embedded
+        """
+        index = self.store.get(user_id)
+        await asyncio.to_thread(index.refresh)
+        deleted = [routine_id for routine_id, routine in changes.items() if routine is None]
+
+        todo: list[tuple[int, str, bytes]] = []
+        for routine_id, routine in changes.items():
+            if routine is None:
+                continue
+            text = routine_text(routine)
+            digest = text_digest(text)
+            if index.digest(routine_id) == digest:
+                self.skipped += 1
+                continue
+            todo.append((routine_id, text, digest))
+
+        vectors = []
+        if todo:
+            vectors = await self.embeddings.aembed_documents([text for _, text, _ in todo])
+            self.embedded += len(todo)
+
+        async with self._write_lock:
+            await asyncio.to_thread(self._write, index, deleted, todo, vectors)
+        return len(todo)
+
+    @staticmethod
+    def _write(
+        index: RoutineVectorIndex,
+        deleted: list[int],
+        todo: list[tuple[int, str, bytes]],
+        vectors: list[list[float]],
+    ) -> None:
+        index.delete(deleted)
+        if todo:
+            index.upsert(
+                [routine_id for routine_id, _, _ in todo],
+                [digest for _, _, digest in todo],
+                np.asarray(vectors, dtype=np.float32),
+            )
+        index.compact()
+
+    async def sync(self, user_id: str, routines: list[dict[str, Any]]) -> RoutineVectorIndex:
+        """
+        Reconcile a user's index with their full routine list.
+
+        Unchanged routines are skipped, missing ones are removed, and the
+        index is marked as synced.
+        """
+        started = time.time()
+        index = self.store.get(user_id)
+        await asyncio.to_thread(index.refresh)
+        current = {routine["id"]: routine for routine in routines}
+        changes: dict[int, Optional[dict[str, Any]]] = dict(current)
+        for routine_id in index.ids():
+            if routine_id not in current:
+                changes[routine_id] = None
+        await self.apply(user_id, changes)
+        index = self.store.get(user_id)
+        index.mark_synced(started)
+        return index
+
+    def needs_sync(self, index: RoutineVectorIndex) -> bool:
+        """
+        Whether an index must be reconciled with the database before use.
+
+        True until it has been fully synced once (an index filled only from
+        change events misses routines written before indexing was enabled),
+        and again every VECTOR_INDEX_RESYNC_SECONDS to pick up writes no
+        event reported.
+        """
+        synced_at = index.synced_at()
+        return synced_at is None or time.time() - synced_at > settings.VECTOR_INDEX_RESYNC_SECONDS
+
+    def stats(self) -> dict[str, Any]:
+        """Embedding counters for this worker."""
+        return {
+            "embedded": self.embedded,
+            "skipped_unchanged": self.skipped,
+            "pending_users": len(self._pending),
+        }
+
+
+# Global indexer, created on first use
+_indexer: Optional[RoutineIndexer] = None
+
+
+def get_routine_indexer() -> RoutineIndexer:
+    """Get the global routine indexer configured from settings."""
+    global _indexer
+    if _indexer is None:
+        _indexer = RoutineIndexer(VectorIndexStore(settings.VECTOR_INDEX_DIR, settings.EMBEDDING_DIM))
+    return _indexer
+
+
+async def generate_routine_embeddings(user_id: str, routines: list) -> RoutineVectorIndex:
+    """Bring a user's persistent routine index up to date and return it."""
+    return await get_routine_indexer().sync(user_id, routines)
+
+
+async def search_routines(
+    user_id: str,
+    query: str,
+    k: int,
+    pages: Optional[AsyncIterator[list[dict[str, Any]]]] = None,
+    allowed: Optional[list[int]] = None,
+    timings: Optional[dict[str, float]] = None,
+) -> list[tuple[int, float]]:
+    """
+    Rank a user's routines by semantic similarity to a query.
+
+    Args:
+        user_id: Owner of the routines
+        query: Free-text query; its embedding is served from the embedding cache
+        k: Number of results to return
+        pages: Source of the user's routines, consumed only when the index needs a sync
+        allowed: Optional routine ids to restrict the ranking to (keyword prefilter)
+        timings: Optional dict that receives per-stage durations in milliseconds
+
+    Returns:
+        (routine id, score) pairs, best match first
+    """
+    timings = timings if timings is not None else {}
+    indexer = get_routine_indexer()
+    index = indexer.store.get(user_id)
+
+    if pages is not None and indexer.needs_sync(index):
+        start = time.perf_counter()
+        routines = [routine async for page in pages for routine in page]
+        index = await indexer.sync(user_id, routines)
+        timings["index"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    vector = await indexer.embeddings.aembed_query(query)
+    timings["embed"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    ids, scores = await asyncio.to_thread(index.search, np.asarray(vector, dtype=np.float32), k, allowed)
+    timings["rank"] = (time.perf_counter() - start) * 1000
+    return list(zip(ids.tolist(), scores.tolist()))
@@ -0,0 +1,441 @@
+"""Class reminders: an in-process scheduler on a timing wheel, delivering in batches to a sink."""
+import asyncio
+import itertools
+import time
+from collections import deque
+from datetime import datetime, time as clock, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Optional
+from zoneinfo import ZoneInfo
+import httpx
+from app.core.events import RoutineChange
+from app.core.logging import get_logger
+from app.core.timeparse import parse_day, parse_time_range
+from app.core.timing_wheel import TimingWheel
+
+logger = get_logger(__name__)
+
+
+class Reminder:
+    """
+    One pending reminder.
+
+    Routine reminders (``routine_id`` set) fire ``minutes_before`` the
+    routine's weekly class and are rescheduled for the following week after
+    firing; one-off reminders (``routine_id`` None) fire once at ``fire_at``.
+    """
+
+    __slots__ = (
+        "id", "user_id", "routine_id", "title", "minutes_before", "custom",
+        "weekday", "start_minute", "fire_at", "starts_at", "wheel_tick", "wheel_slot",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        user_id: str,
+        title: str,
+        routine_id: Optional[int] = None,
+        minutes_before: int = 0,
+        custom: bool = False,
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.routine_id = routine_id
+        self.minutes_before = minutes_before
+        self.custom = custom
+        self.weekday: Optional[int] = None
+        self.start_minute: Optional[int] = None
+        self.fire_at = 0.0
+        self.starts_at: Optional[float] = None
+        self.wheel_tick = 0
+        self.wheel_slot: Optional[dict] = None
+
+    @property
+    def kind(self) -> str:
+        return "custom" if self.custom else "class"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "routine_id": self.routine_id,
+            "title": self.title,
+            "minutes_before": self.minutes_before,
+            "fire_at": datetime.fromtimestamp(self.fire_at, timezone.utc),
+            "starts_at": datetime.fromtimestamp(self.starts_at, timezone.utc) if self.starts_at is not None else None,
+        }
+
+    def notification(self) -> dict[str, Any]:
+        """The delivered payload; ``key`` is stable across processes, for de-duplication."""
+        return {
+            "key": f"{self.routine_id}:{self.minutes_before}:{int(self.fire_at)}" if self.routine_id is not None
+            else f"{self.user_id}:{self.id}:{int(self.fire_at)}",
+            "reminder_id": self.id,
+            "user_id": self.user_id,
+            "routine_id": self.routine_id,
+            "title": self.title,
+            "minutes_before": self.minutes_before,
+            "fire_at": datetime.fromtimestamp(self.fire_at, timezone.utc).isoformat(),
+            "starts_at": datetime.fromtimestamp(self.starts_at, timezone.utc).isoformat()
+            if self.starts_at is not None else None,
+        }
+
+
+# Sinks
+
+class NotificationSink:
+    """Where due notifications go, one batch at a time."""
+
+    async def send(self, batch: list[dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LogSink(NotificationSink):
+    """Log each batch (the default until a real delivery channel is configured)."""
+
+    async def send(self, batch: list[dict[str, Any]]) -> None:
+        logger.info("Delivering %d notification(s)", len(batch), extra={"sample_key": "reminders.batch"})
+
+
+class MemorySink(NotificationSink):
+    """
+    Keep delivered notifications in memory.
+
+    The local stand-in for a real channel in development, benchmarks and
+    tests: nothing leaves the process and deliveries can be inspected.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.delivered: deque[dict[str, Any]] = deque(maxlen=max_entries)
+        self.batches = 0
+
+    async def send(self, batch: list[dict[str, Any]]) -> None:
+        self.batches += 1
+        self.delivered.extend(batch)
+
+
+class WebhookSink(NotificationSink):
+    """POST each batch as ``{"notifications": [...]}`` to an HTTP endpoint."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, batch: list[dict[str, Any]]) -> None:
+        response = await self._client.post(self.url, json={"notifications": batch})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_sink(url: str) -> NotificationSink:
+    """
+    Build a notification sink from a URL.
+
+    Args:
+        url: ``log://``, ``memory://`` or an ``http(s)://`` webhook URL
+
+    Returns:
+        NotificationSink instance
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    scheme = url.split("://", 1)[0].lower()
+    if scheme == "log":
+        return LogSink()
+    if scheme == "memory":
+        return MemorySink()
+    if scheme in ("http", "https"):
+        return WebhookSink(url)
+    raise ValueError(f"Unsupported notification sink URL: {url}")
+
+
+# Scheduler
+
+def class_slot(routine: dict[str, Any]) -> Optional[tuple[int, int]]:
+    """(weekday, start minute) of a routine's class, or None when it cannot be placed."""
+    weekday, start = routine.get("weekday"), routine.get("start_minute")
+    if weekday is None or start is None:
+        weekday = parse_day(routine.get("day"))
+        span = parse_time_range(routine.get("time"))
+        if weekday is None or span is None:
+            return None
+        start = span[0]
+    return weekday, start
+
+
+class ReminderScheduler:
+    """
+    Pending reminders for every user, on one timing wheel.
+
+    Each placeable routine gets a ``class`` reminder ``lead_minutes`` before
+    it starts; users can add custom reminders for a routine or one-off ones
+    and delete any of theirs. The wheel is loaded from all routines on
+    startup and kept current by routine events. A single task ticks the
+    wheel and hands everything that came due to the sink in batches, so
+    there is no task or timer per reminder.
+
+    State is per process: exactly one process may run the scheduler (every
+    running scheduler delivers every reminder, unless the sink's consumer
+    is idempotent on ``key``), and reminders created through the API live
+    until restart.
+    """
+
+    def __init__(
+        self,
+        sink: NotificationSink,
+        lead_minutes: int = 10,
+        tz: str = "UTC",
+        batch_size: int = 500,
+        tick: float = 1.0,
+        now: Optional[float] = None,
+    ):
+        self.sink = sink
+        self.lead_minutes = lead_minutes
+        self.zone = ZoneInfo(tz)
+        self.batch_size = batch_size
+        self.wheel = TimingWheel(tick, now=now)
+        self._ids = itertools.count(1)
+        self._reminders: dict[int, Reminder] = {}
+        self._by_user: dict[str, set[int]] = {}
+        # A routine's class reminder, and its (rarer) custom ones
+        self._class_reminder: dict[int, Reminder] = {}
+        self._custom: dict[int, set[int]] = {}
+        self._muted: set[int] = set()
+        # Routine ids written while the startup load is running
+        self._touched: Optional[set[int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.batches = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._reminders)
+
+    # Timing
+
+    def next_class_start(self, weekday: int, start_minute: int, after: float) -> float:
+        """First start of a weekly class strictly after ``after``, in the scheduler's zone."""
+        local = datetime.fromtimestamp(after, self.zone)
+        day = local.date() + timedelta(days=(weekday - local.weekday()) % 7)
+        at = clock(start_minute // 60, start_minute % 60)
+        starts = datetime.combine(day, at, self.zone)
+        if starts.timestamp() <= after:
+            starts = datetime.combine(day + timedelta(days=7), at, self.zone)
+        return starts.timestamp()
+
+    def _arm(self, reminder: Reminder, now: float) -> None:
+        if reminder.routine_id is not None:
+            reminder.starts_at = self.next_class_start(
+                reminder.weekday, reminder.start_minute, now + reminder.minutes_before * 60
+            )
+            reminder.fire_at = reminder.starts_at - reminder.minutes_before * 60
+        self.wheel.add(reminder, reminder.fire_at)
+
+    # Bookkeeping
+
+    def _register(self, reminder: Reminder) -> None:
+        self._reminders[reminder.id] = reminder
+        self._by_user.setdefault(reminder.user_id, set()).add(reminder.id)
+        if reminder.routine_id is None:
+            return
+        if reminder.custom:
+            self._custom.setdefault(reminder.routine_id, set()).add(reminder.id)
+        else:
+            self._class_reminder[reminder.routine_id] = reminder
+
+    def _forget(self, reminder: Reminder) -> None:
+        self.wheel.discard(reminder)
+        del self._reminders[reminder.id]
+        ids = self._by_user[reminder.user_id]
+        ids.discard(reminder.id)
+        if not ids:
+            del self._by_user[reminder.user_id]
+        if reminder.routine_id is None:
+            return
+        if reminder.custom:
+            ids = self._custom[reminder.routine_id]
+            ids.discard(reminder.id)
+            if not ids:
+                del self._custom[reminder.routine_id]
+        else:
+            del self._class_reminder[reminder.routine_id]
+
+    def _routine_reminders(self, routine_id: int) -> list[Reminder]:
+        reminders = [self._reminders[i] for i in self._custom.get(routine_id, ())]
+        if routine_id in self._class_reminder:
+            reminders.append(self._class_reminder[routine_id])
+        return reminders
+
+    # Routines
+
+    def add_routine(self, routine: dict[str, Any], now: Optional[float] = None) -> None:
+        """Schedule (or reschedule) every reminder of a routine from its current row."""
+        now = time.time() if now is None else now
+        routine_id, user_id = routine["id"], routine.get("user_id")
+        slot = class_slot(routine) if user_id else None
+        if slot is None:
+            self.remove_routine(routine_id)
+            return
+        if routine_id not in self._class_reminder and routine_id not in self._muted:
+            self._register(Reminder(next(self._ids), user_id, "", routine_id, self.lead_minutes))
+        for reminder in self._routine_reminders(routine_id):
+            if not reminder.custom:
+                reminder.title = routine.get("title") or ""
+            reminder.weekday, reminder.start_minute = slot
+            self._arm(reminder, now)
+
+    def remove_routine(self, routine_id: int) -> None:
+        """Drop every reminder of a routine."""
+        for reminder in self._routine_reminders(routine_id):
+            self._forget(reminder)
+        self._muted.discard(routine_id)
+
+    def on_change(self, change: RoutineChange) -> None:
+        """Routine event listener: keep the routine's reminders in step with the row."""
+        if self._touched is not None:
+            self._touched.add(change.routine_id)
+        if change.action == "deleted":
+            self.remove_routine(change.routine_id)
+        else:
+            self.add_routine(change.routine)
+
+    async def load(self, pages: Callable[[], AsyncIterator[list[dict[str, Any]]]]) -> int:
+        """
+        Schedule reminders for all routines yielded by ``pages()``.
+
+        Rows written through the API while loading are skipped, since the
+        event for that write already applied a newer version.
+        """
+        self._touched = set()
+        loaded = 0
+        try:
+            async for page in pages():
+                now = time.time()
+                for routine in page:
+                    if routine["id"] not in self._touched:
+                        self.add_routine(routine, now)
+                        loaded += 1
+        finally:
+            self._touched = None
+        return loaded
+
+    # API
+
+    def for_user(self, user_id: str) -> list[Reminder]:
+        """A user's pending reminders, soonest first."""
+        reminders = [self._reminders[i] for i in self._by_user.get(user_id, ())]
+        return sorted(reminders, key=lambda r: (r.fire_at, r.id))
+
+    def get(self, reminder_id: int) -> Optional[Reminder]:
+        return self._reminders.get(reminder_id)
+
+    def add_custom(
+        self,
+        user_id: str,
+        title: str,
+        routine: Optional[dict[str, Any]] = None,
+        minutes_before: int = 0,
+        fire_at: Optional[float] = None,
+    ) -> Reminder:
+        """
+        Create a user reminder: weekly before ``routine``, or once at ``fire_at``.
+
+        Raises:
+            ValueError: If the routine's day or time cannot be placed on the week
+        """
+        if routine is not None:
+            slot = class_slot(routine)
+            if slot is None:
+                raise ValueError("Routine has no recognisable day and time")
+            reminder = Reminder(next(self._ids), user_id, title or routine.get("title") or "",
+                                routine["id"], minutes_before, custom=True)
+            reminder.weekday, reminder.start_minute = slot
+        else:
+            reminder = Reminder(next(self._ids), user_id, title, custom=True)
+            reminder.fire_at = fire_at
+        self._register(reminder)
+        self._arm(reminder, time.time())
+        return reminder
+
+    def delete(self, reminder: Reminder) -> None:
+        """Cancel a reminder; a routine's class reminder stays off until the routine is deleted."""
+        if reminder.routine_id is not None and not reminder.custom:
+            self._muted.add(reminder.routine_id)
+        self._forget(reminder)
+
+    # Delivery
+
+    async def fire_due(self, now: Optional[float] = None) -> int:
+        """Deliver everything due by ``now`` and re-arm weekly reminders; returns the count."""
+        now = time.time() if now is None else now
+        due = self.wheel.advance(now)
+        if not due:
+            return 0
+        notifications = []
+        for reminder in due:
+            notifications.append(reminder.notification())
+            if reminder.routine_id is not None:
+                self._arm(reminder, max(now, reminder.fire_at + 1))
+            else:
+                self._forget(reminder)
+        for i in range(0, len(notifications), self.batch_size):
+            batch = notifications[i:i + self.batch_size]
+            try:
+                await self.sink.send(batch)
+                self.delivered += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error("Failed to deliver %d notification(s): %s", len(batch), e)
+        return len(notifications)
+
+    async def _run(self) -> None:
+        tick = self.wheel.tick
+        while True:
+            await asyncio.sleep(tick - time.time() % tick)
+            try:
+                await self.fire_due()
+            except Exception:
+                logger.exception("Reminder tick failed")
+
+    def start(self, pages: Optional[Callable[[], AsyncIterator[list[dict[str, Any]]]]] = None) -> None:
+        """Start ticking, loading routines in the background first when ``pages`` is given."""
+        async def run() -> None:
+            if pages is not None:
+                started = time.perf_counter()
+                try:
+                    count = await self.load(pages)
+                    logger.info("Scheduled reminders for %d routines in %.2fs", count, time.perf_counter() - started)
+                except Exception as e:
+                    logger.error("Failed to load routines for reminders: %s", e)
+            await self._run()
+
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(run())
+
+    async def stop(self) -> None:
+        """Stop ticking and close the sink."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sink.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._reminders),
+            "users": len(self._by_user),
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
@@ -0,0 +1,135 @@
+"""Precomputed weekly schedules for "current / next class" lookups."""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any
+from app.core.timeparse import parse_day, parse_time_range
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+@dataclass(frozen=True, order=True)
+class ScheduledClass:
+    """A routine placed on the week, in minutes since Monday 00:00."""
+    start: int
+    end: int
+    routine_id: int
+    routine: dict[str, Any] = field(compare=False, hash=False)
+
+
+@dataclass(frozen=True)
+class Lookup:
+    """What is on at a given minute of the week."""
+    current: list[ScheduledClass]
+    next: ScheduledClass | None
+    next_start: int | None  # may exceed MINUTES_PER_WEEK when the next class is next week
+    valid_until: int | None  # first minute at which the answer can change
+
+
+class WeekLine:
+    """Classes of one schedule, sorted by start minute of the week."""
+
+    __slots__ = ("starts", "classes", "max_length")
+
+    def __init__(self):
+        self.starts: list[int] = []
+        self.classes: list[ScheduledClass] = []
+        self.max_length = 0
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def add(self, entry: ScheduledClass) -> None:
+        i = bisect_right(self.classes, entry)
+        self.starts.insert(i, entry.start)
+        self.classes.insert(i, entry)
+        self.max_length = max(self.max_length, entry.end - entry.start)
+
+    def remove(self, entry: ScheduledClass) -> None:
+        i = bisect_left(self.classes, entry)
+        if i < len(self.classes) and self.classes[i].routine_id == entry.routine_id:
+            del self.starts[i]
+            del self.classes[i]
+
+    def lookup(self, minute: int) -> Lookup:
+        """
+        Classes running at ``minute`` and the next one to start after it.
+
+        Two bisections over the start list: one bounds the window of classes
+        that can still be running (by the longest class), the other finds the
+        next start, wrapping around to the start of the following week.
+        """
+        if not self.classes:
+            return Lookup([], None, None, None)
+        hi = bisect_right(self.starts, minute)
+        lo = bisect_right(self.starts, minute - self.max_length, 0, hi)
+        current = [entry for entry in self.classes[lo:hi] if entry.end > minute]
+
+        if hi < len(self.classes):
+            upcoming, next_start = self.classes[hi], self.starts[hi]
+        else:
+            upcoming, next_start = self.classes[0], self.starts[0] + MINUTES_PER_WEEK
+        valid_until = min([entry.end for entry in current] + [next_start])
+        return Lookup(current, upcoming, next_start, valid_until)
+
+
+class WeeklySchedule:
+    """
+    A timetable's classes on the week, overall and per batch.
+
+    Routines with an unrecognisable day or time are left out. Rows carrying
+    the canonical ``weekday``/``start_minute``/``end_minute`` columns are
+    placed from them; others are parsed from ``day``/``time``.
+    """
+
+    def __init__(self, default_minutes: int = 60):
+        self.default_minutes = default_minutes
+        self.all = WeekLine()
+        self.batches: dict[int, WeekLine] = {}
+        self._placed: dict[int, ScheduledClass] = {}
+
+    def __len__(self) -> int:
+        return len(self._placed)
+
+    def _place(self, routine: dict[str, Any]) -> ScheduledClass | None:
+        weekday, start, end = routine.get("weekday"), routine.get("start_minute"), routine.get("end_minute")
+        if weekday is None or start is None or end is None:
+            weekday = parse_day(routine.get("day"))
+            span = parse_time_range(routine.get("time"), self.default_minutes)
+            if weekday is None or span is None:
+                return None
+            start, end = span
+        offset = weekday * MINUTES_PER_DAY
+        return ScheduledClass(offset + start, offset + end, routine["id"], routine)
+
+    def add(self, routine: dict[str, Any]) -> None:
+        """Place a routine, replacing its previous placement."""
+        self.remove(routine["id"])
+        entry = self._place(routine)
+        if entry is None:
+            return
+        self._placed[entry.routine_id] = entry
+        self.all.add(entry)
+        batch_id = routine.get("batch_id")
+        if batch_id is not None:
+            self.batches.setdefault(batch_id, WeekLine()).add(entry)
+
+    def remove(self, routine_id: int) -> None:
+        """Remove a routine, if placed."""
+        entry = self._placed.pop(routine_id, None)
+        if entry is None:
+            return
+        self.all.remove(entry)
+        batch_id = entry.routine.get("batch_id")
+        line = self.batches.get(batch_id)
+        if line is not None:
+            line.remove(entry)
+            if not line:
+                del self.batches[batch_id]
+
+    def lookup(self, minute: int, batch_id: int | None = None) -> Lookup:
+        """Current and next class at a minute of the week, optionally for one batch."""
+        line = self.all if batch_id is None else self.batches.get(batch_id)
+        if line is None:
+            return Lookup([], None, None, None)
+        return line.lookup(minute)
@@ -0,0 +1,93 @@
+"""Single-flight: concurrent identical calls share one in-flight execution."""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it runs await the same task and get the same result or exception.
+    Nothing is kept once it finishes, so unlike a cache this never serves
+    a result that completed before the caller asked.
+
+    Cancellation is per caller: a cancelled caller stops waiting while the
+    others keep theirs, and the call itself is cancelled only when every
+    caller has gone. ``forget`` detaches a key from its running call so
+    that later callers (e.g. after a write) start a fresh one.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+        self.errors = 0
+        self.abandoned = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Run ``fn()`` or join the running call for ``key``.
+
+        Returns:
+            ``(result, shared)``, where ``shared`` is True when the result came
+            from a call started by another caller
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.get_running_loop().create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last caller gone: nobody needs the result any more
+                self.abandoned += 1
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.errors += 1
+
+    def forget(self, key: Hashable) -> None:
+        """Let the next caller for ``key`` start a new call (current waiters keep theirs)."""
+        self._flights.pop(key, None)
+
+    def forget_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """``forget`` every in-flight key matching ``predicate``."""
+        for key in [key for key in self._flights if predicate(key)]:
+            del self._flights[key]
+
+    def stats(self) -> dict[str, Any]:
+        calls = self.calls + self.shared
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "shared_ratio": round(self.shared / calls, 4) if calls else 0.0,
+            "errors": self.errors,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._flights),
+        }
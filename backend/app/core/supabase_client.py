@@ -1,4 +1,102 @@
-from supabase import create_client
-from app.core.config import SUPABASE_URL, SUPABASE_KEY
+import httpx
+from typing import Optional
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from app.core.config import SUPABASE_URL, SUPABASE_KEY, settings
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Sync Supabase client (module attribute ``supabase``), created on first access
+_supabase = None
+
+# Shared async PostgREST client, created on first use
+_async_db: Optional[AsyncPostgrestClient] = None
+
+
+def create_async_db(
+    url: str,
+    key: str,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    timeout: float = 10.0,
+    connect_timeout: float = 5.0,
+    pool_timeout: float = 5.0,
+    http2: bool = True,
+) -> AsyncPostgrestClient:
+    """
+    Create an async PostgREST client backed by a pooled HTTP/2 connection.
+    
+    Args:
+        url: Supabase project URL
+        key: Supabase API key
+        max_connections: Upper bound on open connections in the pool
+        max_keepalive_connections: Idle connections kept for reuse
+        keepalive_expiry: Seconds an idle connection is kept alive
+        timeout: Read/write timeout in seconds
+        connect_timeout: Connect timeout in seconds
+        pool_timeout: Seconds to wait for a free pooled connection
+        http2: Whether to negotiate HTTP/2 (multiplexes requests on one connection)
+        
+    Returns:
+        AsyncPostgrestClient talking to ``{url}/rest/v1``
+    """
+    rest_url = f"{url.rstrip('/')}/rest/v1"
+    headers = {
+        **DEFAULT_POSTGREST_CLIENT_HEADERS,
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+    }
+    http_client = httpx.AsyncClient(
+        base_url=rest_url,
+        headers=headers,
+        http2=http2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout),
+    )
+    return AsyncPostgrestClient(rest_url, headers=headers, http_client=http_client)
+
+
+def get_supabase():
+    """Get the shared sync Supabase client, importing the SDK on first use."""
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+
+def __getattr__(name: str):
+    # ``from app.core.supabase_client import supabase`` keeps working
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_async_db() -> AsyncPostgrestClient:
+    """Get the shared async PostgREST client configured from settings."""
+    global _async_db
+    if _async_db is None:
+        _async_db = create_async_db(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+            timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+            connect_timeout=settings.SUPABASE_CONNECT_TIMEOUT_SECONDS,
+            pool_timeout=settings.SUPABASE_POOL_TIMEOUT_SECONDS,
+            http2=settings.SUPABASE_HTTP2,
+        )
+    return _async_db
+
+
+async def close_async_db() -> None:
+    """Close the shared async client's connection pool."""
+    global _async_db
+    if _async_db is not None:
+        await _async_db.aclose()
+        _async_db = None
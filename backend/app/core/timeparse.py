@@ -0,0 +1,111 @@
+"""Parsing of the free-form ``day`` and ``time`` values stored on routines."""
+import re
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+_DAYS = {}
+for _number, _name in enumerate(DAY_NAMES):
+    _DAYS[_name.lower()] = _number
+    _DAYS[_name[:3].lower()] = _number
+_DAYS.update({"tues": 1, "wed": 2, "thur": 3, "thurs": 3})
+
+_CLOCK_RE = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?", re.IGNORECASE)
+_RANGE_SPLIT_RE = re.compile(r"\s*(?:-|–|—|\bto\b)\s*", re.IGNORECASE)
+
+
+def parse_day(value: str | None) -> int | None:
+    """
+    Parse a day name into a weekday number (Monday is 0).
+
+    Accepts full names and common abbreviations in any case; returns
+    None for anything else.
+    """
+    if not value:
+        return None
+    return _DAYS.get(value.strip().rstrip(".").lower())
+
+
+def normalize_day(value: str | None) -> str | None:
+    """Canonical day name (e.g. 'mon' -> 'Monday'), or None if unrecognised."""
+    number = parse_day(value)
+    return DAY_NAMES[number] if number is not None else None
+
+
+def _parse_clock(value: str) -> tuple[int, bool] | None:
+    """Return (minute of day, had an AM/PM marker), or None."""
+    match = _CLOCK_RE.fullmatch(value.strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").lower().replace(".", "")
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif hour > 23:
+        return None
+    return hour * 60 + minute, bool(meridiem)
+
+
+def parse_clock(value: str | None) -> int | None:
+    """Parse a single clock time ('09:00 AM', '14:30') into minutes since midnight."""
+    if not value:
+        return None
+    parsed = _parse_clock(value)
+    return parsed[0] if parsed else None
+
+
+def parse_time_range(value: str | None, default_minutes: int = 60) -> tuple[int, int] | None:
+    """
+    Parse a routine time into a half-open ``[start, end)`` range of minutes.
+
+    Understands a single clock time ('09:00 AM', '14:30') and ranges
+    ('9:00 - 10:30 AM', '14:00-15:30', '9am to 11am'). A single time lasts
+    ``default_minutes``. In a range, an AM/PM marker on only the end time
+    applies to the start as well. Ranges that end before they start are
+    rejected; ranges are clipped to the end of the day.
+
+    Returns:
+        (start minute, end minute), or None if the value cannot be parsed
+    """
+    if not value or not value.strip():
+        return None
+    parts = _RANGE_SPLIT_RE.split(value.strip(), maxsplit=1)
+
+    if len(parts) == 1:
+        start = _parse_clock(parts[0])
+        if start is None:
+            return None
+        return start[0], min(start[0] + default_minutes, 24 * 60)
+
+    start, end = _parse_clock(parts[0]), _parse_clock(parts[1])
+    if start is None or end is None:
+        return None
+    start_minute, end_minute = start[0], end[0]
+    if not start[1] and end[1]:
+        # '9:00 - 10:30 AM': borrow the end's meridiem for the start
+        marker = _CLOCK_RE.fullmatch(parts[1].strip()).group(3)
+        borrowed = _parse_clock(f"{parts[0].strip()} {marker}")
+        if borrowed is not None and borrowed[0] <= end_minute:
+            start_minute = borrowed[0]
+    if end_minute <= start_minute:
+        return None
+    return start_minute, end_minute
+
+
+def schedule_columns(row: dict, default_minutes: int = 60) -> dict:
+    """
+    Canonical columns derived from whichever of ``day``/``time`` a row carries.
+
+    ``weekday`` follows ``day`` and ``start_minute``/``end_minute`` follow
+    ``time``; values that cannot be parsed become None.
+    """
+    columns = {}
+    if "day" in row:
+        columns["weekday"] = parse_day(row["day"])
+    if "time" in row:
+        span = parse_time_range(row["time"], default_minutes)
+        columns["start_minute"], columns["end_minute"] = span if span else (None, None)
+    return columns
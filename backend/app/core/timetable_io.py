@@ -0,0 +1,335 @@
+"""Streaming timetable encoders (NDJSON, CSV, iCalendar) and incremental parsers."""
+import codecs
+import csv
+import io
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator
+import orjson
+from app.core.timeparse import DAY_NAMES
+
+# Columns written by exports, in order
+EXPORT_COLUMNS = [
+    "id", "title", "day", "time", "teacher", "batch_id", "room", "section_id", "created_at", "updated_at",
+]
+
+# Columns read by imports
+IMPORT_COLUMNS = ["title", "day", "time", "teacher", "batch_id", "room", "section_id"]
+
+# Longest input line, and longest CSV record (quoted fields may span lines), imports accept
+MAX_RECORD_CHARS = 64 * 1024
+
+# Most distinct properties an imported VEVENT may carry
+MAX_EVENT_PROPERTIES = 64
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "ics": "text/calendar; charset=utf-8",
+}
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+async def ndjson_stream(pages: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encode pages of routines as newline-delimited JSON, one chunk per page."""
+    async for page in pages:
+        yield b"".join(
+            orjson.dumps({column: row.get(column) for column in EXPORT_COLUMNS}) + b"\n"
+            for row in page
+        )
+
+
+async def csv_stream(pages: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encode pages of routines as CSV with a header row, one chunk per page."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+
+    async for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(page)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ics_escape(value: Any) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Do not split inside a multi-byte UTF-8 sequence
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start, limit = end, 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_local(day: date, minute: int) -> str:
+    return f"{day:%Y%m%d}T{minute // 60:02d}{minute % 60:02d}00"
+
+
+def _ics_event(row: dict[str, Any], stamp: str, today: date) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:routine-{row['id']}@classmind",
+        f"DTSTAMP:{stamp}",
+        f"SUMMARY:{_ics_escape(row.get('title') or '')}",
+    ]
+    weekday, start, end = row.get("weekday"), row.get("start_minute"), row.get("end_minute")
+    if weekday is not None and start is not None:
+        # Weekly series starting on the next occurrence, in floating local time
+        first = today + timedelta(days=(weekday - today.weekday()) % 7)
+        lines.append(f"DTSTART:{_ics_local(first, start)}")
+        if end is not None:
+            lines.append(f"DTEND:{_ics_local(first, min(end, 24 * 60 - 1))}")
+        lines.append("RRULE:FREQ=WEEKLY")
+    if row.get("time"):
+        lines.append(f"X-CLASSMIND-TIME:{_ics_escape(row['time'])}")
+        lines.append(f"DESCRIPTION:{_ics_escape(row['time'])}")
+    if row.get("day"):
+        lines.append(f"X-CLASSMIND-DAY:{_ics_escape(row['day'])}")
+    if row.get("teacher"):
+        lines.append(f"X-CLASSMIND-TEACHER:{_ics_escape(row['teacher'])}")
+    if row.get("room"):
+        lines.append(f"LOCATION:{_ics_escape(row['room'])}")
+    if row.get("batch_id") is not None:
+        lines.append(f"X-CLASSMIND-BATCH:{row['batch_id']}")
+    if row.get("section_id") is not None:
+        lines.append(f"X-CLASSMIND-SECTION:{row['section_id']}")
+    lines.append("END:VEVENT")
+    return "".join(_ics_fold(line) for line in lines)
+
+
+async def ics_stream(pages: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encode pages of routines as an iCalendar feed, one chunk per page."""
+    now = datetime.now(timezone.utc)
+    stamp = now.strftime("%Y%m%dT%H%M%SZ")
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//ClassMind//Timetable Export//EN\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+    ).encode("utf-8")
+    async for page in pages:
+        yield "".join(_ics_event(row, stamp, now.date()) for row in page).encode("utf-8")
+    yield b"END:VCALENDAR\r\n"
+
+
+ENCODERS = {
+    "ndjson": ndjson_stream,
+    "csv": csv_stream,
+    "ics": ics_stream,
+}
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into text lines without buffering the whole body.
+
+    Decodes UTF-8 incrementally (a BOM is skipped) and strips line endings.
+
+    Raises:
+        ValueError: If a line is longer than MAX_RECORD_CHARS
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending, number = "", 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        number += len(lines)
+        if len(pending) > MAX_RECORD_CHARS:
+            raise ValueError(f"line {number + 1}: longer than {MAX_RECORD_CHARS} characters")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+    """
+    Parse CSV records incrementally.
+
+    The first record is the header. Quoted fields may span lines.
+
+    Yields:
+        Tuples of (record number, {column: value}) restricted to IMPORT_COLUMNS
+
+    Raises:
+        ValueError: If a record is longer than MAX_RECORD_CHARS or a quoted
+            field is still open at the end of the input
+    """
+    header: list[str] | None = None
+    parts: list[str] = []
+    size = quotes = number = 0
+    async for line in lines:
+        parts.append(line)
+        size += len(line) + 1
+        quotes += line.count('"')
+        if quotes % 2:
+            # Inside a quoted field that spans lines
+            if size > MAX_RECORD_CHARS:
+                raise ValueError(
+                    f"record {number + 1}: longer than {MAX_RECORD_CHARS} characters (unterminated quoted field?)"
+                )
+            continue
+        fields = next(csv.reader(["\n".join(parts)]), [])
+        parts.clear()
+        size = quotes = 0
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [field.strip().lower() for field in fields]
+            continue
+        number += 1
+        values = dict(zip(header, fields))
+        yield number, {k: v for k, v in values.items() if k in IMPORT_COLUMNS and v != ""}
+    if parts:
+        raise ValueError(f"record {number + 1}: unterminated quoted field")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+    """Parse newline-delimited JSON objects incrementally."""
+    number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            value = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"record {number}: invalid JSON: {str(e)}")
+        if not isinstance(value, dict):
+            raise ValueError(f"record {number}: expected a JSON object")
+        yield number, {k: v for k, v in value.items() if k in IMPORT_COLUMNS}
+
+
+def _ics_unescape(value: str) -> str:
+    out, chars = [], iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append("\n" if nxt in "nN" else nxt)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _ics_time(value: str) -> str | None:
+    """Turn a DTSTART value such as 20250106T090000 into '09:00 AM'."""
+    if "T" not in value:
+        return None
+    clock = value.split("T", 1)[1]
+    try:
+        hour, minute = int(clock[0:2]), int(clock[2:4])
+    except ValueError:
+        return None
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def _ics_day(value: str) -> str | None:
+    """Turn a DTSTART value such as 20250106T090000 into its weekday name."""
+    try:
+        return DAY_NAMES[datetime.strptime(value[:8], "%Y%m%d").weekday()]
+    except ValueError:
+        return None
+
+
+async def parse_ics(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+    """
+    Parse VEVENTs from an iCalendar stream incrementally.
+
+    SUMMARY becomes the title and LOCATION the room; the day and time come
+    from X-CLASSMIND-DAY/X-CLASSMIND-TIME when present (round-trips our own
+    exports) or from DTSTART.
+
+    Raises:
+        ValueError: If a folded property is longer than MAX_RECORD_CHARS or
+            a VEVENT has more than MAX_EVENT_PROPERTIES properties
+    """
+    event: dict[str, str] | None = None
+    previous: str | None = None
+    number = 0
+    line_number = 0
+
+    def flush(line: str) -> tuple[int, dict[str, Any]] | None:
+        nonlocal event, number
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            number += 1
+            record: dict[str, Any] = {}
+            if "SUMMARY" in event:
+                record["title"] = _ics_unescape(event["SUMMARY"])
+            time_value = event.get("X-CLASSMIND-TIME")
+            if time_value is not None:
+                record["time"] = _ics_unescape(time_value)
+            elif "DTSTART" in event:
+                parsed = _ics_time(event["DTSTART"])
+                if parsed:
+                    record["time"] = parsed
+            for name, column in (("X-CLASSMIND-DAY", "day"), ("X-CLASSMIND-TEACHER", "teacher"), ("LOCATION", "room")):
+                if event.get(name):
+                    record[column] = _ics_unescape(event[name])
+            if "day" not in record and "DTSTART" in event:
+                parsed_day = _ics_day(event["DTSTART"])
+                if parsed_day:
+                    record["day"] = parsed_day
+            for name, column in (("X-CLASSMIND-BATCH", "batch_id"), ("X-CLASSMIND-SECTION", "section_id")):
+                if event.get(name, "").isdigit():
+                    record[column] = int(event[name])
+            event = None
+            return number, record
+        elif event is not None and name not in event:
+            if len(event) >= MAX_EVENT_PROPERTIES:
+                raise ValueError(f"line {line_number}: event has more than {MAX_EVENT_PROPERTIES} properties")
+            event[name] = value
+        return None
+
+    async for line in lines:
+        line_number += 1
+        if line[:1] in (" ", "\t") and previous is not None:
+            if len(previous) + len(line) - 1 > MAX_RECORD_CHARS:
+                raise ValueError(f"line {line_number}: folded property longer than {MAX_RECORD_CHARS} characters")
+            previous += line[1:]  # unfold continuation line
+            continue
+        if previous is not None:
+            parsed = flush(previous)
+            if parsed:
+                yield parsed
+        previous = line
+    if previous is not None:
+        parsed = flush(previous)
+        if parsed:
+            yield parsed
+
+
+PARSERS = {
+    "csv": parse_csv,
+    "ndjson": parse_ndjson,
+    "ics": parse_ics,
+}
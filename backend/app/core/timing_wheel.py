@@ -0,0 +1,102 @@
+"""Hierarchical timing wheel: O(1) timer insertion and cancellation for large timer counts."""
+import math
+import time
+from typing import Any, Hashable, Optional, Protocol
+
+
+class WheelTimer(Protocol):
+    """Anything the wheel can hold: an id plus two bookkeeping slots owned by the wheel."""
+
+    id: Hashable
+    wheel_tick: int
+    wheel_slot: Optional[dict]
+
+
+class TimingWheel:
+    """
+    Timers bucketed by due tick on ``levels`` wheels of ``2**slot_bits`` slots.
+
+    Level 0 has one slot per tick, level 1 one slot per ``2**slot_bits``
+    ticks, and so on; with the defaults (1 s ticks, 256 slots, 3 levels) the
+    wheel spans about 194 days, and later timers wait in an overflow bucket.
+    Adding or cancelling a timer is a dict operation on one slot. Advancing
+    drains one level-0 slot per tick and, every ``2**slot_bits`` ticks,
+    cascades one slot of the level above down a level, so each timer is
+    moved at most ``levels - 1`` times in its life. Nothing is allocated
+    per timer beyond the caller's own object.
+    """
+
+    def __init__(self, tick: float = 1.0, slot_bits: int = 8, levels: int = 3, now: Optional[float] = None):
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self._mask = (1 << slot_bits) - 1
+        self._span = 1 << (slot_bits * levels)
+        self._wheels: list[list[dict]] = [[{} for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._overflow: dict = {}
+        self.current = self.tick_of(time.time() if now is None else now)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def tick_of(self, timestamp: float) -> int:
+        """Tick at which a timer due at ``timestamp`` fires (never early)."""
+        return math.ceil(timestamp / self.tick)
+
+    def add(self, timer: Any, due: float) -> None:
+        """Schedule ``timer`` for ``due`` (epoch seconds); overdue timers fire on the next tick."""
+        self.discard(timer)
+        timer.wheel_tick = max(self.tick_of(due), self.current + 1)
+        self._place(timer)
+        self._count += 1
+
+    def discard(self, timer: Any) -> bool:
+        """Cancel ``timer`` if scheduled; True when it was."""
+        slot = timer.wheel_slot
+        if slot is None:
+            return False
+        del slot[timer.id]
+        timer.wheel_slot = None
+        self._count -= 1
+        return True
+
+    def _place(self, timer: Any) -> None:
+        delta = timer.wheel_tick - self.current
+        if delta >= self._span:
+            slot = self._overflow
+        else:
+            level = 0
+            while delta >> (self.slot_bits * (level + 1)):
+                level += 1
+            slot = self._wheels[level][(timer.wheel_tick >> (self.slot_bits * level)) & self._mask]
+        slot[timer.id] = timer
+        timer.wheel_slot = slot
+
+    def _cascade(self, slot: dict) -> None:
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> list:
+        """Move the wheel up to ``now`` and return the timers that came due, in tick order."""
+        target = math.floor((time.time() if now is None else now) / self.tick)
+        expired: list = []
+        while self.current < target:
+            self.current += 1
+            tick = self.current
+            if tick % self._span == 0 and self._overflow:
+                self._cascade(self._overflow)
+            # Higher levels first, so timers cascading down can cascade again this tick
+            for level in range(self.levels - 1, 0, -1):
+                if tick & ((1 << (self.slot_bits * level)) - 1) == 0:
+                    self._cascade(self._wheels[level][(tick >> (self.slot_bits * level)) & self._mask])
+            slot = self._wheels[0][tick & self._mask]
+            if slot:
+                for timer in slot.values():
+                    timer.wheel_slot = None
+                expired.extend(slot.values())
+                self._count -= len(slot)
+                slot.clear()
+        return expired
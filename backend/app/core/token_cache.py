@@ -0,0 +1,105 @@
+"""Bounded, TTL-aware cache of verified JWT payloads."""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache of already-verified JWT payloads.
+
+    Entries are keyed by the SHA-256 digest of the raw token (the token itself
+    is never stored) and expire at the token's ``exp`` claim, capped at
+    ``max_ttl`` seconds so that a revoked signing key stops being honoured
+    within a bounded window. When the cache is full the least recently used
+    entry is evicted.
+
+    The cache is only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int = 10_000, max_ttl: float = 300.0):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached payload for a token, or None on a miss.
+
+        Args:
+            token: Raw JWT string
+
+        Returns:
+            Previously verified payload, or None if absent or expired
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        """
+        Cache a verified payload until its ``exp`` claim (bounded by max_ttl).
+
+        Args:
+            token: Raw JWT string that was verified
+            payload: Decoded and verified claims
+        """
+        if self.max_size <= 0:
+            return
+
+        now = time.time()
+        expires_at = now + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached entry (counters are kept)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "max_ttl_seconds": self.max_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,116 @@
+"""In-memory per-user timetable indexes kept current by routine events."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Generic, Protocol, TypeVar
+from app.core.events import RoutineChange
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RoutineIndex(Protocol):
+    """Anything that can absorb routine rows incrementally."""
+
+    def __len__(self) -> int: ...
+
+    def add(self, routine: dict[str, Any]) -> None: ...
+
+    def remove(self, routine_id: int) -> None: ...
+
+
+IndexT = TypeVar("IndexT", bound=RoutineIndex)
+
+
+class UserIndexCache(Generic[IndexT]):
+    """
+    Per-user indexes, built on demand and kept current by routine events.
+
+    An index is loaded from the user's routines the first time it is needed
+    and then updated incrementally from ``routine_events``. Indexes are
+    rebuilt after ``ttl`` seconds to pick up writes made by other workers,
+    and at most ``max_users`` are kept in memory.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], IndexT],
+        ttl: float = 300.0,
+        max_users: int = 1024,
+        name: str = "timetable",
+    ):
+        self.factory = factory
+        self.ttl = ttl
+        self.max_users = max_users
+        self.name = name
+        self._indexes: "OrderedDict[str, tuple[IndexT, float]]" = OrderedDict()
+        self._building: dict[str, asyncio.Task] = {}
+        self._replay: dict[str, list[RoutineChange]] = {}
+
+    async def index_for(
+        self,
+        user_id: str,
+        load: Callable[[], AsyncIterator[list[dict[str, Any]]]],
+    ) -> IndexT:
+        """
+        Return the user's index, loading it with ``load()`` when missing or expired.
+
+        Concurrent callers share a single load.
+        """
+        entry = self._indexes.get(user_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._indexes.move_to_end(user_id)
+            return entry[0]
+
+        task = self._building.get(user_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._build(user_id, load))
+            self._building[user_id] = task
+        return await asyncio.shield(task)
+
+    async def _build(
+        self,
+        user_id: str,
+        load: Callable[[], AsyncIterator[list[dict[str, Any]]]],
+    ) -> IndexT:
+        self._replay[user_id] = []
+        try:
+            index = self.factory()
+            async for page in load():
+                for routine in page:
+                    index.add(routine)
+            # Writes that landed while the pages were being read
+            for change in self._replay[user_id]:
+                self._apply(index, change)
+            self._indexes[user_id] = (index, time.monotonic())
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            logger.info("Built %s index for %s: %d routines", self.name, user_id, len(index))
+            return index
+        finally:
+            self._replay.pop(user_id, None)
+            self._building.pop(user_id, None)
+
+    @staticmethod
+    def _apply(index: IndexT, change: RoutineChange) -> None:
+        if change.action == "deleted":
+            index.remove(change.routine_id)
+        else:
+            index.add(change.routine)
+
+    def on_change(self, change: RoutineChange) -> None:
+        """Routine event listener: keep loaded indexes in step with writes."""
+        user_id = change.user_id
+        if user_id in self._replay:
+            self._replay[user_id].append(change)
+        entry = self._indexes.get(user_id)
+        if entry is not None:
+            self._apply(entry[0], change)
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        """Drop one user's index, or all of them."""
+        if user_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(user_id, None)
@@ -0,0 +1,345 @@
+"""Persistent, incrementally updated per-user vector index for routine embeddings."""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+import numpy as np
+from app.core.logging import get_logger
+
+try:  # POSIX only; without it an index directory must not be shared by processes
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = get_logger(__name__)
+
+DIGEST_SIZE = 16
+
+
+def text_digest(text: str) -> bytes:
+    """Content hash used to skip re-embedding unchanged routine text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class RoutineVectorIndex:
+    """
+    Append-only embedding store for one user, read through a memory map.
+
+    Three parallel files hold one entry per row:
+
+    - ``vectors.f32``: unit-normalised float32 vectors (``dim`` per row)
+    - ``ids.i64``: routine id per row, ``-1`` once the row is superseded
+    - ``digests.bin``: hash of the embedded text per row
+
+    Adding or updating a routine appends a row and tombstones the previous
+    one; deleting only tombstones. Cost is proportional to the change, not
+    to the corpus. Tombstoned rows are reclaimed by :meth:`compact` once they
+    outnumber live ones. A torn write (crash between the three appends) is
+    repaired on load by truncating to the shortest file.
+
+    Methods are thread-safe, so searches and writes may run in worker threads.
+    Several processes may share a directory: writes hold an exclusive
+    ``flock`` on ``lock`` and bump the number in ``generation``, and every
+    search or write first reloads the row offsets if another process has
+    changed the files since they were read (:meth:`refresh`).
+    """
+
+    def __init__(self, directory: Path, dim: int):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.f32"
+        self._ids_path = self.directory / "ids.i64"
+        self._digests_path = self.directory / "digests.bin"
+        self._generation_path = self.directory / "generation"
+        self._synced_path = self.directory / "synced_at"
+        self._vectors: np.memmap | None = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._digests: list[bytes] = []
+        self._rows: dict[int, int] = {}
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._lock_file: BinaryIO | None = None
+        with self._lock, self._file_lock(exclusive=True):
+            self._load()
+
+    def close(self) -> None:
+        """
+        Close the lock file and drop the vector memmap.
+
+        Waits for in-flight operations on this object; a caller that still
+        holds the index afterwards reopens the lock file on its next use.
+        """
+        with self._lock:
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            self._vectors = None
+
+    # -- persistence --------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        """Hold the cross-process lock (shared for reads, exclusive for writes)."""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self.directory / "lock", "a+b")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _read_generation(self) -> int:
+        try:
+            return int(self._generation_path.read_bytes() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump_generation(self) -> None:
+        """Record a write so other processes reload before using their offsets."""
+        self._generation = self._read_generation() + 1
+        tmp = self._generation_path.with_suffix(".tmp")
+        tmp.write_bytes(str(self._generation).encode())
+        os.replace(tmp, self._generation_path)
+
+    def _refresh(self) -> None:
+        if self._read_generation() != self._generation:
+            self._load()
+
+    def refresh(self) -> None:
+        """Reload the row offsets if another process has written to the index."""
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+
+    def _load(self) -> None:
+        self._generation = self._read_generation()
+        row_bytes = self.dim * 4
+        sizes = [
+            self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0,
+            self._ids_path.stat().st_size // 8 if self._ids_path.exists() else 0,
+            self._digests_path.stat().st_size // DIGEST_SIZE if self._digests_path.exists() else 0,
+        ]
+        count = min(sizes)
+        if max(sizes) != count:
+            logger.warning("Repairing torn vector index in %s: %s -> %d rows", self.directory, sizes, count)
+            for path, width in (
+                (self._vectors_path, row_bytes),
+                (self._ids_path, 8),
+                (self._digests_path, DIGEST_SIZE),
+            ):
+                with open(path, "ab") as f:
+                    f.truncate(count * width)
+
+        self._ids = np.fromfile(self._ids_path, dtype=np.int64, count=count) if count else np.empty(0, dtype=np.int64)
+        raw = self._digests_path.read_bytes()[:count * DIGEST_SIZE] if count else b""
+        self._digests = [raw[i:i + DIGEST_SIZE] for i in range(0, len(raw), DIGEST_SIZE)]
+        self._rows = {int(routine_id): row for row, routine_id in enumerate(self._ids) if routine_id >= 0}
+        self._vectors = None
+
+    def _tombstone(self, rows: Iterable[int]) -> None:
+        rows = sorted(rows)
+        if not rows:
+            return
+        with open(self._ids_path, "r+b") as f:
+            for row in rows:
+                f.seek(row * 8)
+                f.write(np.int64(-1).tobytes())
+                self._ids[row] = -1
+
+    # -- queries ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def digest(self, routine_id: int) -> bytes | None:
+        """Digest of the text currently indexed for a routine, if any."""
+        row = self._rows.get(routine_id)
+        return self._digests[row] if row is not None else None
+
+    def ids(self) -> list[int]:
+        """Routine ids currently in the index."""
+        return list(self._rows)
+
+    def matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the memory-mapped vector matrix and the row -> routine id array.
+
+        Rows whose id is ``-1`` are tombstones and must be ignored.
+        """
+        count = len(self._ids)
+        if count == 0:
+            return np.empty((0, self.dim), dtype=np.float32), self._ids
+        if self._vectors is None or self._vectors.shape[0] != count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+        return self._vectors, self._ids
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        allowed: list[int] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rank live rows by cosine similarity to a query vector.
+
+        Scores are one matrix-vector product over the memory map; the best
+        ``k`` are selected with ``argpartition`` and only those are sorted.
+
+        Args:
+            query: Query vector of length ``dim``
+            k: Number of results to return
+            allowed: Optional routine ids to restrict the ranking to
+
+        Returns:
+            (routine ids, scores), best match first
+        """
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            vectors, ids = self.matrix()
+            empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if k <= 0 or len(ids) == 0:
+                return empty
+
+            query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+            if allowed is None:
+                candidates = np.flatnonzero(ids >= 0)
+                scores = (vectors @ query)[candidates]
+            else:
+                rows = [self._rows[i] for i in allowed if i in self._rows]
+                candidates = np.asarray(sorted(rows), dtype=np.int64)
+                scores = vectors[candidates] @ query if len(candidates) else np.empty(0, dtype=np.float32)
+            if len(candidates) == 0:
+                return empty
+
+            if k < len(candidates):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return ids[candidates[top]], scores[top]
+
+    # -- updates ------------------------------------------------------------
+
+    def upsert(self, routine_ids: list[int], digests: list[bytes], vectors: np.ndarray) -> None:
+        """
+        Add or replace the vectors of several routines.
+
+        Args:
+            routine_ids: Routine ids, one per vector
+            digests: Text digests, one per vector
+            vectors: Array of shape (n, dim); normalised before storing
+        """
+        if not routine_ids:
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(len(routine_ids), self.dim)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+
+            self._tombstone(self._rows[i] for i in routine_ids if i in self._rows)
+
+            start = len(self._ids)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._ids_path, "ab") as f:
+                f.write(np.asarray(routine_ids, dtype=np.int64).tobytes())
+            with open(self._digests_path, "ab") as f:
+                f.write(b"".join(digests))
+
+            self._ids = np.concatenate([self._ids, np.asarray(routine_ids, dtype=np.int64)])
+            self._digests.extend(digests)
+            for offset, routine_id in enumerate(routine_ids):
+                self._rows[routine_id] = start + offset
+            self._vectors = None
+            self._bump_generation()
+
+    def delete(self, routine_ids: Iterable[int]) -> None:
+        """Remove routines from the index."""
+        routine_ids = list(routine_ids)
+        if not routine_ids:
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            self._tombstone(self._rows.pop(i) for i in routine_ids if i in self._rows)
+            self._bump_generation()
+
+    def compact(self, min_dead: int = 1024) -> bool:
+        """
+        Rewrite the files without tombstones when they outnumber live rows.
+
+        Returns:
+            True if the index was rewritten
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            dead = len(self._ids) - len(self._rows)
+            if dead < min_dead or dead <= len(self._rows):
+                return False
+
+            vectors, ids = self.matrix()
+            live = np.flatnonzero(ids >= 0)
+            for path, data in (
+                (self._vectors_path, np.ascontiguousarray(vectors[live]).tobytes()),
+                (self._ids_path, ids[live].tobytes()),
+                (self._digests_path, b"".join(self._digests[row] for row in live)),
+            ):
+                tmp = path.with_suffix(path.suffix + ".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+            self._bump_generation()
+            self._load()
+            logger.info("Compacted vector index %s: dropped %d dead rows", self.directory, dead)
+            return True
+
+    # -- reconciliation -----------------------------------------------------
+
+    def synced_at(self) -> float | None:
+        """Wall-clock time of the last full reconciliation with the database, if any."""
+        try:
+            return float(self._synced_path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def mark_synced(self, at: float | None = None) -> None:
+        """Record that the index now holds every routine of its user."""
+        tmp = self._synced_path.with_suffix(".tmp")
+        tmp.write_bytes(repr(time.time() if at is None else at).encode())
+        os.replace(tmp, self._synced_path)
+
+
+class VectorIndexStore:
+    """Opens per-user indexes under a root directory, keeping a bounded LRU of them open."""
+
+    def __init__(self, root: str | Path, dim: int, max_open: int = 256):
+        self.root = Path(root)
+        self.dim = dim
+        self.max_open = max_open
+        self._open: "OrderedDict[str, RoutineVectorIndex]" = OrderedDict()
+
+    def path_for(self, user_id: str) -> Path:
+        name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:24]
+        return self.root / f"dim{self.dim}" / name
+
+    def get(self, user_id: str) -> RoutineVectorIndex:
+        """Return the index of a user, creating it on first use."""
+        index = self._open.get(user_id)
+        if index is None:
+            index = RoutineVectorIndex(self.path_for(user_id), self.dim)
+            self._open[user_id] = index
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                evicted.close()
+        self._open.move_to_end(user_id)
+        return index
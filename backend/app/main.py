@@ -1,27 +1,116 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import routines, auth, notifications
-from app.core.supabase_client import supabase
+from app.api import routines, auth, notifications, metrics, hierarchy
+from app.core.supabase_client import get_async_db, close_async_db
+from app.database import dispose_async_engine, dispose_engine
+from app.repos.cached_routines_repo import CachedRoutinesRepo
 from app.core.config import settings
-from app.core.logging import setup_logging, get_logger
-from app.core.jwt import init_jwks_client
+from app.core.logging import parse_sample_rates, setup_logging, get_logger
+from app.core.jwt import init_jwks_client, close_jwks_client, configure_token_cache
+from app.core.events import RoutineEvents, routine_events
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, instrument_serialization, registry
+from contextlib import asynccontextmanager
 import time
 
 # Setup logging
-setup_logging()
+setup_logging(
+    settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    use_queue=settings.LOG_QUEUE,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    sample_rates=parse_sample_rates(settings.LOG_SAMPLE_RATES),
+)
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Set up auth and background subscribers on startup, release shared clients on shutdown.
+    
+    Database engines, the Supabase clients and the embedding model are not
+    built here: each is created on first use, so a cold start only pays for
+    what the first requests need.
+    """
+    # Initialize Clerk JWKS client
+    init_jwks_client(
+        settings.CLERK_JWKS_URL,
+        cache_duration=settings.JWKS_CACHE_SECONDS,
+        refresh_ahead=settings.JWKS_REFRESH_AHEAD_SECONDS,
+        unknown_kid_refetch_interval=settings.JWKS_UNKNOWN_KID_REFETCH_SECONDS,
+    )
+    configure_token_cache(settings.JWT_CACHE_MAX_SIZE, settings.JWT_CACHE_MAX_TTL_SECONDS)
+    logger.info("Clerk JWKS client initialized")
+    
+    # Keep the routine vector index in step with routine writes
+    indexer = None
+    if settings.VECTOR_INDEX_ENABLED:
+        from app.core.rag_pipeline import get_routine_indexer
+        indexer = get_routine_indexer()
+        routine_events.subscribe(indexer.on_change)
+        logger.info("Routine vector index enabled at %s", settings.VECTOR_INDEX_DIR)
+    
+    # Feed the routine change stream, the vector index and the reminder
+    # scheduler from Supabase Realtime (all workers' writes)
+    realtime_source = None
+    if settings.ROUTINES_STREAM_SOURCE == "realtime":
+        from app.core.change_feed import SupabaseRealtimeSource
+        realtime_events = RoutineEvents()
+        realtime_events.subscribe(routines.change_hub.on_change)
+        if indexer is not None:
+            realtime_events.subscribe(indexer.on_change)
+        if settings.NOTIFICATIONS_ENABLED:
+            realtime_events.subscribe(notifications.scheduler.on_change)
+        realtime_source = SupabaseRealtimeSource(realtime_events, settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        await realtime_source.start()
+    
+    # Class reminders (opt-in, one process only): load every routine in the
+    # background, then tick
+    if settings.NOTIFICATIONS_ENABLED:
+        notifications.scheduler.start(lambda: routines.repo.iter_routine_pages(
+            page_size=settings.ROUTINES_EXPORT_PAGE_SIZE,
+            fields=["user_id", "title", "day", "time", "weekday", "start_minute"],
+        ))
+    
+    yield
+    
+    await notifications.scheduler.stop()
+    await routines.change_hub.close()
+    if realtime_source is not None:
+        await realtime_source.stop()
+    if indexer is not None:
+        routine_events.unsubscribe(indexer.on_change)
+    if isinstance(routines.repo, CachedRoutinesRepo):
+        await routines.repo.backend.close()
+    await close_async_db()
+    await dispose_async_engine()
+    dispose_engine()
+    await close_jwks_client()
+
+
 app = FastAPI(
     title="ClassMind Backend",
     version="1.0.0",
-    description="Backend API for ClassMind - AI-powered routine management"
+    description="Backend API for ClassMind - AI-powered routine management",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 logger.info("Starting ClassMind Backend application")
 
-# Initialize Clerk JWKS client
-init_jwks_client(settings.CLERK_JWKS_URL)
-logger.info("Clerk JWKS client initialized")
+# Response compression (innermost, so CORS and metrics see the final headers)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=tuple(settings.COMPRESSION_ENCODINGS),
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        offload_size=settings.COMPRESSION_OFFLOAD_SIZE,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -30,11 +119,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Link", "Server-Timing", "X-Query-Count"],
 )
 
+# Request metrics (outermost, so CORS preflights are measured too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_serialization()
+
 app.include_router(routines.router, prefix="/api/routines", tags=["Routines"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(hierarchy.router, prefix="/api/universities", tags=["Hierarchy"])
 
 @app.get("/")
 def root():
@@ -45,13 +142,20 @@ def health():
     """Basic health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 @app.get("/db-health", tags=["Health"])
-def db_health():
+async def db_health():
     """Health check with database connectivity test and latency measurement"""
     start_time = time.time()
     try:
         # Try to query the routines table
-        res = supabase.table("routines").select("*").limit(1).execute()
+        res = await get_async_db().table("routines").select("*").limit(1).execute()
         latency_ms = round((time.time() - start_time) * 1000, 2)
         
         return {
@@ -0,0 +1,215 @@
+"""Read-through cache in front of RoutinesRepo."""
+import uuid
+from typing import Any, AsyncIterator
+from fastapi import HTTPException
+from app.core.cache import CacheBackend
+from app.core.metrics import instrument_repo
+from app.repos.routines_repo import RoutinesRepo
+
+# Scope used for lists that are not filtered by user
+ALL_USERS = "*"
+
+
+@instrument_repo("routines_cached")
+class CachedRoutinesRepo:
+    """
+    Caches ``list_routines`` per user and ``get_routine`` per routine id.
+
+    List entries are keyed by a per-user generation token. Writes replace the
+    owner's generation (and the all-users one), which invalidates exactly
+    that user's cached lists, and drop the cached row of the routine they
+    touched. Cached values are shared and must not be mutated by callers.
+
+    Entries also expire after ``ttl`` seconds, which bounds staleness when a
+    read races with a write or when rows are changed outside this service.
+    """
+
+    def __init__(self, repo: RoutinesRepo, backend: CacheBackend, ttl: float = 30.0):
+        self.repo = repo
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _routine_key(routine_id: int) -> str:
+        return f"routine:{routine_id}"
+
+    @staticmethod
+    def _generation_key(scope: str) -> str:
+        return f"routines:gen:{scope}"
+
+    async def _generation(self, scope: str) -> str:
+        """Return the current list generation for a scope, creating one if needed."""
+        key = self._generation_key(scope)
+        generation = await self.backend.get(key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            await self.backend.set(key, generation)
+        return generation
+
+    async def _invalidate(self, row: dict[str, Any] | None, routine_id: int | None = None) -> None:
+        """Drop cached state affected by a write to one routine."""
+        self.invalidations += 1
+        scopes = {ALL_USERS}
+        if row and row.get("user_id"):
+            scopes.add(row["user_id"])
+        for scope in scopes:
+            await self.backend.set(self._generation_key(scope), uuid.uuid4().hex)
+        target = routine_id if routine_id is not None else (row or {}).get("id")
+        if target is not None:
+            await self.backend.delete(self._routine_key(target))
+
+    async def _drop_if_stale(self, error: HTTPException, routine_id: int) -> None:
+        """Forget a cached row that a failed precondition proved to be outdated."""
+        if error.status_code == 412:
+            await self.backend.delete(self._routine_key(routine_id))
+
+    async def list_routines(
+        self,
+        limit: int | None = None,
+        user_id: str | None = None,
+        cursor: tuple[str, int] | None = None,
+        fields: list[str] | None = None,
+        weekday: int | None = None,
+        starts_before: int | None = None,
+        ends_after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Cached :meth:`RoutinesRepo.list_routines`."""
+        scope = user_id or ALL_USERS
+        generation = await self._generation(scope)
+        key = (
+            f"routines:list:{scope}:{generation}:{limit}:"
+            f"{cursor[0] + '|' + str(cursor[1]) if cursor else ''}:{','.join(fields or [])}:"
+            f"{weekday}:{starts_before}:{ends_after}"
+        )
+
+        rows = await self.backend.get(key)
+        if rows is not None:
+            self.hits += 1
+            return rows
+
+        self.misses += 1
+        rows = await self.repo.list_routines(
+            limit,
+            user_id=user_id,
+            cursor=cursor,
+            fields=fields,
+            weekday=weekday,
+            starts_before=starts_before,
+            ends_after=ends_after,
+        )
+        await self.backend.set(key, rows, self.ttl)
+        return rows
+
+    def iter_routine_pages(
+        self,
+        user_id: str | None = None,
+        page_size: int = 500,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Uncached :meth:`RoutinesRepo.iter_routine_pages` (full scans would flush the cache)."""
+        return self.repo.iter_routine_pages(user_id=user_id, page_size=page_size, fields=fields)
+
+    async def get_routine(self, routine_id: int) -> dict[str, Any]:
+        """Cached :meth:`RoutinesRepo.get_routine` (404s are not cached)."""
+        key = self._routine_key(routine_id)
+        row = await self.backend.get(key)
+        if row is not None:
+            self.hits += 1
+            return row
+
+        self.misses += 1
+        row = await self.repo.get_routine(routine_id)
+        await self.backend.set(key, row, self.ttl)
+        return row
+
+    async def create_routine(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Create a routine and invalidate its owner's cached lists."""
+        row = await self.repo.create_routine(payload)
+        await self._invalidate(row)
+        return row
+
+    async def update_routine(
+        self,
+        routine_id: int,
+        payload: dict[str, Any],
+        expected_updated_at: str | None = None,
+        user_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Update a routine and invalidate its cached row and owner's lists."""
+        try:
+            row = await self.repo.update_routine(routine_id, payload, expected_updated_at, user_id=user_id)
+        except HTTPException as e:
+            await self._drop_if_stale(e, routine_id)
+            raise
+        await self._invalidate(row, routine_id)
+        return row
+
+    async def delete_routine(
+        self,
+        routine_id: int,
+        user_id: str | None = None,
+        expected_updated_at: str | None = None,
+    ) -> dict[str, Any]:
+        """Delete a routine and invalidate its cached row and owner's lists."""
+        try:
+            row = await self.repo.delete_routine(
+                routine_id, user_id=user_id, expected_updated_at=expected_updated_at
+            )
+        except HTTPException as e:
+            await self._drop_if_stale(e, routine_id)
+            raise
+        await self._invalidate(row, routine_id)
+        return row
+
+    async def _invalidate_many(self, rows: list[dict[str, Any]]) -> None:
+        """Drop cached state affected by a batch write."""
+        if not rows:
+            return
+        self.invalidations += 1
+        scopes = {ALL_USERS} | {row["user_id"] for row in rows if row.get("user_id")}
+        for scope in scopes:
+            await self.backend.set(self._generation_key(scope), uuid.uuid4().hex)
+        await self.backend.delete(*(self._routine_key(row["id"]) for row in rows))
+
+    async def get_routines_by_ids(
+        self,
+        routine_ids: list[int],
+        user_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Uncached :meth:`RoutinesRepo.get_routines_by_ids`."""
+        return await self.repo.get_routines_by_ids(routine_ids, user_id=user_id)
+
+    async def search_routine_ids(self, keyword: str, user_id: str | None = None) -> list[int]:
+        """Uncached :meth:`RoutinesRepo.search_routine_ids`."""
+        return await self.repo.search_routine_ids(keyword, user_id=user_id)
+
+    async def create_routines(self, payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Bulk create and invalidate the owners' cached lists."""
+        rows = await self.repo.create_routines(payloads)
+        await self._invalidate_many(rows)
+        return rows
+
+    async def delete_routines(
+        self,
+        routine_ids: list[int],
+        user_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Bulk delete and invalidate the touched rows and owners' lists."""
+        rows = await self.repo.delete_routines(routine_ids, user_id=user_id)
+        await self._invalidate_many(rows)
+        return rows
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters for this worker."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
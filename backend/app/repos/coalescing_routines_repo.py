@@ -0,0 +1,75 @@
+"""Single-flight reads in front of RoutinesRepo."""
+from typing import Any
+from app.core.events import RoutineChange
+from app.core.metrics import COALESCED_CALLS
+from app.core.single_flight import SingleFlight
+from app.repos.routines_repo import RoutinesRepo
+
+
+class CoalescingRoutinesRepo:
+    """
+    Shares one backend call between concurrent identical reads.
+
+    ``get_routine`` is keyed by routine id and ``list_routines`` by its
+    normalised arguments; a burst of the same request (a shared timetable
+    opened by a whole class) costs one Supabase round-trip. Results are
+    shared between callers and must not be mutated.
+
+    A routine write detaches the in-flight reads it may affect (that row,
+    and lists of its owner or of all users), so a read issued after a write
+    completed never joins a call started before it. Register ``on_change``
+    with ``routine_events`` for that. Every other method goes straight to
+    the wrapped repository.
+    """
+
+    def __init__(self, repo: RoutinesRepo):
+        self.repo = repo
+        self.flights = SingleFlight()
+
+    def __getattr__(self, name: str) -> Any:
+        # Writes and uncoalesced reads
+        return getattr(self.repo, name)
+
+    async def _do(self, method: str, key: tuple, fn) -> Any:
+        result, shared = await self.flights.do(key, fn)
+        COALESCED_CALLS.inc("routines", method, "shared" if shared else "leader")
+        return result
+
+    async def list_routines(
+        self,
+        limit: int | None = None,
+        user_id: str | None = None,
+        cursor: tuple[str, int] | None = None,
+        fields: list[str] | None = None,
+        weekday: int | None = None,
+        starts_before: int | None = None,
+        ends_after: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Coalesced :meth:`RoutinesRepo.list_routines`."""
+        key = (
+            "list", user_id or None, limit or None, tuple(cursor) if cursor else None,
+            tuple(sorted(set(fields))) if fields else None, weekday, starts_before, ends_after,
+        )
+        return await self._do("list_routines", key, lambda: self.repo.list_routines(
+            limit,
+            user_id=user_id,
+            cursor=cursor,
+            fields=fields,
+            weekday=weekday,
+            starts_before=starts_before,
+            ends_after=ends_after,
+        ))
+
+    async def get_routine(self, routine_id: int) -> dict[str, Any]:
+        """Coalesced :meth:`RoutinesRepo.get_routine` (a 404 is shared like a result)."""
+        return await self._do("get_routine", ("get", routine_id), lambda: self.repo.get_routine(routine_id))
+
+    def on_change(self, change: RoutineChange) -> None:
+        """Routine event listener: detach in-flight reads the write may affect."""
+        self.flights.forget(("get", change.routine_id))
+        owner = change.user_id
+        self.flights.forget_where(lambda key: key[0] == "list" and key[1] in (None, owner))
+
+    def stats(self) -> dict[str, Any]:
+        """Return coalescing counters for this worker."""
+        return self.flights.stats()
@@ -0,0 +1,58 @@
+"""Opaque keyset cursors for paginated repository queries."""
+import base64
+import binascii
+import json
+from typing import Any
+from fastapi import HTTPException
+
+
+def encode_cursor(row: dict[str, Any]) -> str:
+    """
+    Encode the ``(created_at, id)`` keyset position of a row.
+    
+    Args:
+        row: Last row of the current page (must include created_at and id)
+        
+    Returns:
+        URL-safe opaque cursor string
+    """
+    raw = json.dumps([row.get("created_at"), row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+    
+    Args:
+        cursor: Opaque cursor string from a previous page
+        
+    Returns:
+        Tuple of (created_at, id)
+        
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, routine_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(created_at, str) or not isinstance(routine_id, int):
+            raise ValueError("unexpected cursor shape")
+        return created_at, routine_id
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+
+
+def keyset_filter(cursor: tuple[str, int]) -> str:
+    """
+    Build the PostgREST ``or`` filter selecting rows after a keyset position.
+    
+    Equivalent to ``(created_at, id) > (:created_at, :id)``, but Postgres
+    cannot turn the ``or`` into an index bound: on its own it scans the
+    user's rows from the start (or bitmap-ORs and sorts everything after
+    the cursor). Pair it with ``created_at >= :created_at`` so the
+    ``(user_id, created_at, id)`` index range scan starts at the cursor.
+    """
+    created_at, routine_id = cursor
+    quoted = '"' + created_at.replace('"', '') + '"'
+    return f"created_at.gt.{quoted},and(created_at.eq.{quoted},id.gt.{routine_id})"
@@ -1,22 +1,75 @@
 """Repository for routines table operations."""
-from typing import Any
+from typing import Any, AsyncIterator
 from fastapi import HTTPException
-from app.core.supabase_client import supabase
+from postgrest import AsyncPostgrestClient
+from app.core.config import settings
+from app.core.events import routine_events
+from app.core.metrics import instrument_repo
+from app.core.supabase_client import get_async_db
+from app.core.timeparse import schedule_columns
+from app.repos.pagination import keyset_filter
 
 
+@instrument_repo("routines")
 class RoutinesRepo:
-    """Repository for managing routines in Supabase."""
+    """
+    Repository for managing routines in Supabase (async, pooled).
     
-    def __init__(self):
+    Every successful write is published on ``routine_events``. Writes that
+    set ``day`` or ``time`` also store their canonical form (``weekday``,
+    ``start_minute``, ``end_minute``) so time-window filters can use an index.
+    """
+    
+    def __init__(self, db: AsyncPostgrestClient | None = None):
         self.table_name = "routines"
+        self._db = db
+    
+    @staticmethod
+    def _columns(fields: list[str] | None) -> str:
+        """Build a select list, keeping the keyset columns in every projection."""
+        if not fields:
+            return "*"
+        columns = ["id", "created_at"]
+        columns.extend(f for f in fields if f not in columns)
+        return ",".join(columns)
+    
+    @staticmethod
+    def _canonical(payload: dict[str, Any]) -> dict[str, Any]:
+        """Add the parsed schedule columns for any ``day``/``time`` in a write."""
+        columns = schedule_columns(payload, settings.ROUTINE_DEFAULT_DURATION_MINUTES)
+        return {**payload, **columns} if columns else payload
+    
+    @property
+    def db(self) -> AsyncPostgrestClient:
+        """Async PostgREST client (the shared pooled client unless one was injected)."""
+        return self._db or get_async_db()
     
-    def list_routines(self, limit: int | None = None, user_id: str | None = None) -> list[dict[str, Any]]:
+    async def list_routines(
+        self,
+        limit: int | None = None,
+        user_id: str | None = None,
+        cursor: tuple[str, int] | None = None,
+        fields: list[str] | None = None,
+        weekday: int | None = None,
+        starts_before: int | None = None,
+        ends_after: int | None = None,
+    ) -> list[dict[str, Any]]:
         """
-        List all routines, optionally limited and filtered by user.
+        List routines in stable ``(created_at, id)`` order.
+        
+        Pages are addressed by keyset rather than offset, so fetching a deep
+        page costs the same as fetching the first one. The schedule filters
+        run on the indexed canonical columns; routines whose day or time
+        could not be parsed never match them.
         
         Args:
             limit: Maximum number of routines to return
             user_id: Optional user ID to filter routines
+            cursor: Optional ``(created_at, id)`` of the last row already seen
+            fields: Optional columns to return (id and created_at are always included)
+            weekday: Only routines on this weekday (Monday is 0)
+            starts_before: Only routines starting before this minute of the day
+            ends_after: Only routines ending after this minute of the day
             
         Returns:
             List of routine dictionaries
@@ -25,15 +78,29 @@ class RoutinesRepo:
             HTTPException: If database query fails
         """
         try:
-            query = supabase.table(self.table_name).select("*")
+            query = self.db.table(self.table_name).select(self._columns(fields))
             
             if user_id:
                 query = query.eq("user_id", user_id)
             
+            if weekday is not None:
+                query = query.eq("weekday", weekday)
+            if starts_before is not None:
+                query = query.lt("start_minute", starts_before)
+            if ends_after is not None:
+                query = query.gt("end_minute", ends_after)
+            
+            if cursor:
+                # The redundant lower bound lets the index scan start at the
+                # cursor; the or-filter then drops the rows already seen
+                query = query.gte("created_at", cursor[0]).or_(keyset_filter(cursor))
+            
+            query = query.order("created_at").order("id")
+            
             if limit:
                 query = query.limit(limit)
             
-            response = query.execute()
+            response = await query.execute()
             return response.data or []
         except Exception as e:
             raise HTTPException(
@@ -41,7 +108,37 @@ class RoutinesRepo:
                 detail=f"Failed to fetch routines: {str(e)}"
             )
     
-    def get_routine(self, routine_id: int) -> dict[str, Any]:
+    async def iter_routine_pages(
+        self,
+        user_id: str | None = None,
+        page_size: int = 500,
+        fields: list[str] | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Yield all matching routines page by page in ``(created_at, id)`` order.
+        
+        Uses keyset pagination, so only one page is held in memory at a time
+        and every page costs the same index range scan.
+        
+        Args:
+            user_id: Optional user ID to filter routines
+            page_size: Rows fetched per round-trip
+            fields: Optional columns to return (id and created_at are always included)
+            
+        Yields:
+            Non-empty lists of routine dictionaries
+        """
+        cursor = None
+        while True:
+            page = await self.list_routines(page_size, user_id=user_id, cursor=cursor, fields=fields)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            cursor = (page[-1]["created_at"], page[-1]["id"])
+    
+    async def get_routine(self, routine_id: int) -> dict[str, Any]:
         """
         Get a single routine by ID.
         
@@ -55,7 +152,7 @@ class RoutinesRepo:
             HTTPException: If routine not found or query fails
         """
         try:
-            response = supabase.table(self.table_name)\
+            response = await self.db.table(self.table_name)\
                 .select("*")\
                 .eq("id", routine_id)\
                 .execute()
@@ -75,7 +172,7 @@ class RoutinesRepo:
                 detail=f"Failed to fetch routine: {str(e)}"
             )
     
-    def create_routine(self, payload: dict[str, Any]) -> dict[str, Any]:
+    async def create_routine(self, payload: dict[str, Any]) -> dict[str, Any]:
         """
         Create a new routine.
         
@@ -89,8 +186,8 @@ class RoutinesRepo:
             HTTPException: If creation fails
         """
         try:
-            response = supabase.table(self.table_name)\
-                .insert(payload)\
+            response = await self.db.table(self.table_name)\
+                .insert(self._canonical(payload))\
                 .execute()
             
             if not response.data:
@@ -99,6 +196,7 @@ class RoutinesRepo:
                     detail="Failed to create routine: no data returned"
                 )
             
+            routine_events.publish("created", response.data[:1])
             return response.data[0]
         except HTTPException:
             raise
@@ -108,25 +206,48 @@ class RoutinesRepo:
                 detail=f"Failed to create routine: {str(e)}"
             )
     
-    def update_routine(self, routine_id: int, payload: dict[str, Any]) -> dict[str, Any]:
+    async def update_routine(
+        self,
+        routine_id: int,
+        payload: dict[str, Any],
+        expected_updated_at: str | None = None,
+        user_id: str | None = None,
+    ) -> dict[str, Any]:
         """
         Update an existing routine.
         
         Args:
             routine_id: ID of the routine to update
             payload: Updated routine data
+            expected_updated_at: If given, only update while the row still has
+                this ``updated_at`` (optimistic concurrency)
+            user_id: Optional user ID to verify ownership
             
         Returns:
             Updated routine dictionary
             
         Raises:
-            HTTPException: If routine not found or update fails
+            HTTPException: 404 if routine not found, 412 if it changed since
+                ``expected_updated_at``, 500 if the update fails
         """
         try:
-            response = supabase.table(self.table_name)\
-                .update(payload)\
-                .eq("id", routine_id)\
-                .execute()
+            query = self.db.table(self.table_name)\
+                .update(self._canonical(payload))\
+                .eq("id", routine_id)
+            
+            if user_id:
+                query = query.eq("user_id", user_id)
+            
+            if expected_updated_at is not None:
+                query = query.eq("updated_at", expected_updated_at)
+            
+            response = await query.execute()
+            
+            if not response.data and expected_updated_at is not None:
+                raise HTTPException(
+                    status_code=412,
+                    detail=f"Routine with id {routine_id} was modified concurrently"
+                )
             
             if not response.data:
                 raise HTTPException(
@@ -134,6 +255,7 @@ class RoutinesRepo:
                     detail=f"Routine with id {routine_id} not found"
                 )
             
+            routine_events.publish("updated", response.data[:1])
             return response.data[0]
         except HTTPException:
             raise
@@ -143,22 +265,30 @@ class RoutinesRepo:
                 detail=f"Failed to update routine: {str(e)}"
             )
     
-    def delete_routine(self, routine_id: int, user_id: str | None = None) -> dict[str, Any]:
+    async def delete_routine(
+        self,
+        routine_id: int,
+        user_id: str | None = None,
+        expected_updated_at: str | None = None,
+    ) -> dict[str, Any]:
         """
         Delete a routine by ID.
         
         Args:
             routine_id: ID of the routine to delete
             user_id: Optional user ID to verify ownership
+            expected_updated_at: If given, only delete while the row still has
+                this ``updated_at`` (optimistic concurrency)
             
         Returns:
             Deleted routine dictionary
             
         Raises:
-            HTTPException: If routine not found or deletion fails
+            HTTPException: 404 if routine not found, 412 if it changed since
+                ``expected_updated_at``, 500 if deletion fails
         """
         try:
-            query = supabase.table(self.table_name).delete()
+            query = self.db.table(self.table_name).delete()
             
             # Filter by ID
             query = query.eq("id", routine_id)
@@ -167,7 +297,16 @@ class RoutinesRepo:
             if user_id:
                 query = query.eq("user_id", user_id)
             
-            response = query.execute()
+            if expected_updated_at is not None:
+                query = query.eq("updated_at", expected_updated_at)
+            
+            response = await query.execute()
+            
+            if not response.data and expected_updated_at is not None:
+                raise HTTPException(
+                    status_code=412,
+                    detail=f"Routine with id {routine_id} was modified concurrently"
+                )
             
             if not response.data:
                 raise HTTPException(
@@ -175,6 +314,7 @@ class RoutinesRepo:
                     detail=f"Routine with id {routine_id} not found or you don't have permission to delete it"
                 )
             
+            routine_events.publish("deleted", response.data[:1])
             return response.data[0]
         except HTTPException:
             raise
@@ -183,3 +323,134 @@ class RoutinesRepo:
                 status_code=500,
                 detail=f"Failed to delete routine: {str(e)}"
             )
+    
+    async def search_routine_ids(self, keyword: str, user_id: str | None = None) -> list[int]:
+        """
+        IDs of routines whose title or time contains a keyword (case-insensitive).
+        
+        Args:
+            keyword: Substring to look for
+            user_id: Optional user ID to restrict results to owned routines
+            
+        Returns:
+            Matching routine IDs
+            
+        Raises:
+            HTTPException: If the query fails
+        """
+        pattern = keyword.replace("\\", "\\\\").replace('"', '\\"')
+        try:
+            query = self.db.table(self.table_name).select("id").or_(
+                f'title.ilike."*{pattern}*",time.ilike."*{pattern}*"'
+            )
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = await query.execute()
+            return [row["id"] for row in response.data or []]
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to search routines: {str(e)}"
+            )
+    
+    async def get_routines_by_ids(
+        self,
+        routine_ids: list[int],
+        user_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch several routines in one round-trip.
+        
+        Args:
+            routine_ids: IDs to fetch
+            user_id: Optional user ID to restrict results to owned routines
+            
+        Returns:
+            Routines that exist (in no particular order)
+            
+        Raises:
+            HTTPException: If the query fails
+        """
+        if not routine_ids:
+            return []
+        try:
+            query = self.db.table(self.table_name).select("*").in_("id", routine_ids)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = await query.execute()
+            return response.data or []
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to fetch routines: {str(e)}"
+            )
+    
+    async def create_routines(self, payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Create several routines with one multi-row insert.
+        
+        Args:
+            payloads: Routine data to insert
+            
+        Returns:
+            Created routines, in the same order as ``payloads``
+            
+        Raises:
+            HTTPException: If creation fails
+        """
+        if not payloads:
+            return []
+        try:
+            response = await self.db.table(self.table_name)\
+                .insert([self._canonical(payload) for payload in payloads])\
+                .execute()
+            
+            if len(response.data or []) != len(payloads):
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to create routines: unexpected number of rows returned"
+                )
+            
+            routine_events.publish("created", response.data)
+            return response.data
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to create routines: {str(e)}"
+            )
+    
+    async def delete_routines(
+        self,
+        routine_ids: list[int],
+        user_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Delete several routines with one filtered delete.
+        
+        Args:
+            routine_ids: IDs to delete
+            user_id: Optional user ID to verify ownership
+            
+        Returns:
+            Deleted routines (IDs that were missing or not owned are absent)
+            
+        Raises:
+            HTTPException: If deletion fails
+        """
+        if not routine_ids:
+            return []
+        try:
+            query = self.db.table(self.table_name).delete().in_("id", routine_ids)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = await query.execute()
+            rows = response.data or []
+            routine_events.publish("deleted", rows)
+            return rows
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete routines: {str(e)}"
+            )
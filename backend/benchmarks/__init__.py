@@ -0,0 +1,12 @@
+"""Offline benchmarks for the ClassMind backend.
+
+Benchmarks talk to local stand-ins instead of Supabase/Clerk, so the
+required settings get harmless defaults unless they are already set.
+"""
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "stub-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "stub-service-key")
+os.environ.setdefault("OPENAI_API_KEY", "stub-openai-key")
+os.environ.setdefault("CLERK_JWKS_URL", "http://127.0.0.1:54322/.well-known/jwks.json")
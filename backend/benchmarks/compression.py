@@ -0,0 +1,57 @@
+"""Compare response encodings on routine payloads: size, CPU time and transfer time.
+
+Builds list responses like ``GET /api/routines`` for several sizes and runs
+each through the encodings the compression middleware offers (brotli only
+when the ``brotli`` package is installed) at the configured levels. Reports
+compressed size, compression time and the time to send the body over a
+slow link (``--link-mbps``; campus Wi-Fi under load).
+
+Usage::
+
+    python -m benchmarks.compression --rows 100,1000,5000 --link-mbps 2
+"""
+import argparse
+import time
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+import orjson
+from app.core import compression
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from benchmarks.json_responses import make_rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Response encodings on routine payloads")
+    parser.add_argument("--rows", default="100,1000,5000", help="Comma-separated list sizes")
+    parser.add_argument("--link-mbps", type=float, default=2.0, help="Client bandwidth in megabits per second")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    middleware = CompressionMiddleware(
+        None,
+        encodings=tuple(settings.COMPRESSION_ENCODINGS),
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    )
+    if compression.brotli is None:
+        print("brotli not installed: 'br' skipped")
+    bytes_per_second = args.link_mbps * 1_000_000 / 8
+
+    for rows in (int(value) for value in args.rows.split(",")):
+        body = orjson.dumps(make_rows(rows))
+        print(f"\n{rows} rows, {len(body) / 1024:.1f} KiB, {len(body) / bytes_per_second * 1000:.0f} ms on the wire uncompressed")
+        for encoding in middleware.encodings:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                compressed = middleware.new_stream(encoding).finish(body)
+            cpu = (time.perf_counter() - start) / args.repeat
+            print(
+                f"  {encoding:<5} {len(compressed) / 1024:8.1f} KiB  ratio {len(body) / len(compressed):5.1f}x  "
+                f"compress {cpu * 1000:6.2f} ms  on the wire {len(compressed) / bytes_per_second * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure the embedding cache and batching against a simulated embedding API.
+
+A timetable-like corpus is generated where many routines share the same
+course title. Embeddings come from the deterministic ``HashEmbeddings``
+backend wrapped with an artificial per-call and per-text latency, which
+stands in for the remote model. Three runs are compared:
+
+- ``direct``: every text sent to the model in sequential batches, no cache
+- ``cold``: ``CachedEmbeddings`` on an empty store (dedupe + parallel batches)
+- ``warm``: the same corpus again, served from the on-disk store
+
+Usage::
+
+    python -m benchmarks.embedding_cache --texts 20000 --distinct 800 --call-ms 150
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+from app.core.embedding_cache import CachedEmbeddings, EmbeddingStore, HashEmbeddings
+
+
+class SimulatedEmbeddings(HashEmbeddings):
+    """HashEmbeddings with the latency profile of a remote embedding API."""
+
+    def __init__(self, dim: int, call_ms: float, text_ms: float):
+        super().__init__(dim)
+        self.call_ms = call_ms
+        self.text_ms = text_ms
+        self.calls = 0
+        self.texts = 0
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        await asyncio.sleep((self.call_ms + self.text_ms * len(texts)) / 1000)
+        return self.embed_documents(texts)
+
+
+def build_corpus(count: int, distinct: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    subjects = ["Mathematics", "Physics", "Chemistry", "Biology", "English", "History", "Economics", "Data Structures"]
+    titles = [f"{rng.choice(subjects)} {100 + i} - {rng.choice(['Lecture', 'Lab', 'Tutorial'])}" for i in range(distinct)]
+    return [rng.choice(titles) for _ in range(count)]
+
+
+def _report(name: str, elapsed: float, model: SimulatedEmbeddings) -> None:
+    print(f"{name:<7} {elapsed * 1000:9.1f} ms   model calls {model.calls:5d}   texts embedded {model.texts:7d}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    corpus = build_corpus(args.texts, args.distinct, args.seed)
+    print(f"{len(corpus)} texts, {len(set(corpus))} distinct, batch {args.batch_size}, concurrency {args.concurrency}")
+
+    model = SimulatedEmbeddings(args.dim, args.call_ms, args.text_ms)
+    start = time.perf_counter()
+    for i in range(0, len(corpus), args.batch_size):
+        await model.aembed_documents(corpus[i:i + args.batch_size])
+    _report("direct", time.perf_counter() - start, model)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(Path(tmp) / "embeddings.sqlite3", max_entries=args.distinct * 2)
+        for name in ("cold", "warm"):
+            model = SimulatedEmbeddings(args.dim, args.call_ms, args.text_ms)
+            cached = CachedEmbeddings(model, store, batch_size=args.batch_size, max_concurrency=args.concurrency)
+            start = time.perf_counter()
+            await cached.aembed_documents(corpus)
+            _report(name, time.perf_counter() - start, model)
+        print(cached.stats())
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--distinct", type=int, default=800)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--call-ms", type=float, default=150.0, help="simulated latency per model call")
+    parser.add_argument("--text-ms", type=float, default=0.5, help="simulated latency per embedded text")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
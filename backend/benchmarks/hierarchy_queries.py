@@ -0,0 +1,105 @@
+"""Check that the university tree endpoint issues a bounded number of queries.
+
+A SQLite database is filled with one university of configurable size and
+the tree is loaded twice:
+
+- ``lazy``: the naive walk over lazy relationships (one query per parent)
+- ``tree``: ``GET /api/universities/{id}/tree`` with eager ``selectinload``
+
+The endpoint must need ``depth + 1`` queries at every depth, whatever the
+size of the university; the script exits non-zero otherwise. It is the
+required check for that endpoint (see "Required Checks" in COMMANDS.md).
+
+Usage::
+
+    python -m benchmarks.hierarchy_queries --faculties 8 --departments 6 --batches 5 --routines 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/hierarchy.sqlite3"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core.auth import get_current_user  # noqa: E402
+from app.core.query_counter import count_queries  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Batch, Department, Faculty, Routine, University  # noqa: E402
+from app.main import app  # noqa: E402
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+def populate(faculties: int, departments: int, batches: int, routines: int) -> int:
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        university = University(name="Bench University")
+        for f in range(faculties):
+            faculty = Faculty(name=f"Faculty {f}", university=university)
+            for d in range(departments):
+                department = Department(name=f"Department {f}.{d}", faculty=faculty)
+                for b in range(batches):
+                    batch = Batch(name=f"Batch {f}.{d}.{b}", department=department)
+                    batch.routines = [
+                        Routine(
+                            course_name=f"Course {r}",
+                            day=DAYS[r % len(DAYS)],
+                            time=f"{8 + r % 8:02d}:00 AM",
+                            teacher=f"Teacher {r % 7}",
+                        )
+                        for r in range(routines)
+                    ]
+        db.add(university)
+        db.commit()
+        return university.id
+
+
+def lazy_walk(university_id: int) -> tuple[int, int, float]:
+    """Naive traversal over lazy relationships: returns (queries, routines, seconds)."""
+    start = time.perf_counter()
+    with SessionLocal() as db, count_queries() as queries:
+        university = db.get(University, university_id)
+        total = 0
+        for faculty in university.faculties:
+            for department in faculty.departments:
+                for batch in department.batches:
+                    total += len(batch.routines)
+    return queries.value, total, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="University tree query count")
+    parser.add_argument("--faculties", type=int, default=8)
+    parser.add_argument("--departments", type=int, default=6)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--routines", type=int, default=20)
+    args = parser.parse_args()
+
+    university_id = populate(args.faculties, args.departments, args.batches, args.routines)
+    queries, routines, elapsed = lazy_walk(university_id)
+    print(f"lazy       {queries:5d} queries   {routines:6d} routines   {elapsed * 1000:8.1f} ms")
+
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "bench", "email": ""}
+    failures = 0
+    with TestClient(app) as client:
+        for depth in range(5):
+            start = time.perf_counter()
+            response = client.get(f"/api/universities/{university_id}/tree", params={"depth": depth})
+            elapsed = time.perf_counter() - start
+            count = int(response.headers["X-Query-Count"])
+            ok = response.status_code == 200 and count == depth + 1
+            failures += not ok
+            print(
+                f"tree d={depth}  {count:5d} queries   {len(response.content):8d} bytes   "
+                f"{elapsed * 1000:8.1f} ms   {'ok' if ok else 'FAIL (expected %d)' % (depth + 1)}"
+            )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
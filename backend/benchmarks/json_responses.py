@@ -0,0 +1,107 @@
+"""Measure list-response serialization: validated vs orjson vs trusted rows.
+
+Serves the same synthetic routine rows (shaped like Supabase's, including
+columns the response model drops) from three in-process endpoints:
+
+- ``validated``: ``response_model=list[RoutineResponse]`` with the stdlib
+  ``JSONResponse`` (the previous behaviour of ``GET /api/routines``)
+- ``orjson``: the same route with ``ORJSONResponse`` as the response class,
+  so rows are still validated but encoded with orjson
+- ``trusted``: ``trusted_response``, which projects the rows onto the model
+  and encodes them with orjson without validating them again
+
+Requests go through the ASGI app in-process (no network), so the time per
+request is framework plus serialization CPU.
+
+Usage::
+
+    python -m benchmarks.json_responses --rows 100,1000,5000 --requests 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.api.routines import RoutineResponse
+from app.core.responses import trusted_response
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "user_id": "user_2abcDEFghiJKLmnoPQRstu",
+            "title": f"Data Structures and Algorithms {i}",
+            "day": "Monday",
+            "time": "09:00 - 10:30 AM",
+            "teacher": "Dr. Rahman",
+            "batch_id": i % 12,
+            "room": f"Room {100 + i % 40}",
+            "section_id": i % 7,
+            "weekday": i % 7,
+            "start_minute": 540,
+            "end_minute": 630,
+            "created_at": "2026-01-05T09:00:00.123456+00:00",
+            "updated_at": "2026-01-05T09:00:00.123456+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(rows: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=list[RoutineResponse], response_class=JSONResponse)
+    async def validated():
+        return rows
+
+    @app.get("/orjson", response_model=list[RoutineResponse], response_class=ORJSONResponse)
+    async def orjson_encoded():
+        return rows
+
+    @app.get("/trusted", response_model=list[RoutineResponse])
+    async def trusted():
+        return trusted_response(RoutineResponse, rows)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> tuple[float, bytes]:
+    body = (await client.get(path)).content  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        await client.get(path)
+    return (time.perf_counter() - start) / requests, body
+
+
+async def run(rows: int, requests: int) -> None:
+    app = build_app(make_rows(rows))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {path: await measure(client, f"/{path}", requests) for path in ("validated", "orjson", "trusted")}
+    baseline = results["validated"][0]
+    for path, (per_request, body) in results.items():
+        print(
+            f"{rows:>6} rows  {path:<9} {per_request * 1000:8.2f} ms/request  "
+            f"{baseline / per_request:5.1f}x  {len(body) / 1024:8.1f} KiB"
+        )
+    # Skipping validation must not change the document clients receive
+    if json.loads(results["validated"][1]) != json.loads(results["trusted"][1]):
+        raise SystemExit("trusted response differs from the validated one")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List-response serialization cost")
+    parser.add_argument("--rows", default="100,1000,5000", help="Comma-separated list sizes")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and size")
+    args = parser.parse_args()
+    for rows in (int(value) for value in args.rows.split(",")):
+        asyncio.run(run(rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
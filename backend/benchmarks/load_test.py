@@ -0,0 +1,294 @@
+"""Offline load test for the routines API, with stored baselines.
+
+Starts three local processes: the stub PostgREST server, the stub JWKS
+server and the backend itself (uvicorn, pointed at both stubs), then drives
+scripted scenarios over HTTP:
+
+- ``list``, ``get``, ``create``, ``patch``, ``delete``: one operation each
+- ``auth``: every request carries a never-seen token, so each one pays for
+  full RS256 verification instead of hitting the verified-token cache
+- ``mixed``: a weighted blend of all of the above
+
+Each scenario reports requests per second and p50/p95/p99 latency.
+``--save-baseline`` stores the results; later runs compare against the
+stored baseline and exit non-zero when throughput drops or tail latency
+grows by more than ``--tolerance``.
+
+Usage::
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 50 --save-baseline
+    python -m benchmarks.load_test --requests 2000 --concurrency 50
+    python -m benchmarks.load_test --scenarios list,auth --latency-ms 20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+import httpx
+from benchmarks import stub_jwks, stub_postgrest
+from benchmarks.stub_postgrest import ServerProcess
+
+SCENARIOS: dict[str, dict[str, int]] = {
+    "list": {"list": 1},
+    "get": {"get": 1},
+    "create": {"create": 1},
+    "patch": {"patch": 1},
+    "delete": {"delete": 1},
+    "auth": {"auth": 1},
+    "mixed": {"list": 40, "get": 30, "create": 10, "patch": 10, "delete": 5, "auth": 5},
+}
+
+DEFAULT_BASELINE = "data/benchmarks/load_test.json"
+
+
+def build_backend():
+    """Import the backend app in the server process (env already points at the stubs)."""
+    from app.main import app
+    return app
+
+
+class LoadState:
+    """Users, their tokens and the routine ids they own."""
+
+    def __init__(self, key: stub_jwks.SigningKey, users: int, seed: int):
+        self.key = key
+        self.rng = random.Random(seed)
+        self.users = [f"bench_{uuid.uuid4().hex[:8]}_{i}" for i in range(users)]
+        self.tokens = {user: key.token(user) for user in self.users}
+        self.routines: dict[str, list[int]] = {user: [] for user in self.users}
+        self.fresh_tokens: list[str] = []
+        self._counter = itertools.count()
+
+    def user(self) -> str:
+        return self.rng.choice(self.users)
+
+    def headers(self, user: str) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[user]}"}
+
+    def routine_body(self) -> dict:
+        n = next(self._counter)
+        return {"title": f"Load test course {n}", "time": f"{8 + n % 9:02d}:00 AM", "section_id": n % 7}
+
+    def mint_fresh_tokens(self, count: int) -> None:
+        """Sign unique tokens ahead of the run, so signing is not timed."""
+        self.fresh_tokens = [
+            self.key.token(self.user(), jti=uuid.uuid4().hex) for _ in range(count)
+        ]
+
+
+async def _timed(request: Awaitable[httpx.Response]) -> tuple[float, int]:
+    start = time.perf_counter()
+    response = await request
+    return time.perf_counter() - start, response.status_code
+
+
+async def _create(client: httpx.AsyncClient, state: LoadState, user: str) -> httpx.Response:
+    response = await client.post("/api/routines/", json=state.routine_body(), headers=state.headers(user))
+    if response.status_code == 201:
+        state.routines[user].append(response.json()["id"])
+    return response
+
+
+async def _owned_routine(client: httpx.AsyncClient, state: LoadState) -> tuple[str, int]:
+    """A user and one of their routines, creating one (untimed) if they have none."""
+    user = state.user()
+    if not state.routines[user]:
+        await _create(client, state, user)
+    return user, state.rng.choice(state.routines[user])
+
+
+async def op_list(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    user = state.user()
+    return await _timed(client.get("/api/routines/", params={"limit": 50}, headers=state.headers(user)))
+
+
+async def op_get(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    user, routine_id = await _owned_routine(client, state)
+    return await _timed(client.get(f"/api/routines/{routine_id}", headers=state.headers(user)))
+
+
+async def op_create(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    return await _timed(_create(client, state, state.user()))
+
+
+async def op_patch(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    user, routine_id = await _owned_routine(client, state)
+    body = {"title": f"Renamed course {next(state._counter)}"}
+    return await _timed(client.patch(f"/api/routines/{routine_id}", json=body, headers=state.headers(user)))
+
+
+async def op_delete(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    # Delete a routine created just for it (untimed), so concurrent get/patch
+    # operations never race with the delete
+    user = state.user()
+    created = await client.post("/api/routines/", json=state.routine_body(), headers=state.headers(user))
+    created.raise_for_status()
+    routine_id = created.json()["id"]
+    return await _timed(client.delete(f"/api/routines/{routine_id}", headers=state.headers(user)))
+
+
+async def op_auth(client: httpx.AsyncClient, state: LoadState) -> tuple[float, int]:
+    token = state.fresh_tokens.pop() if state.fresh_tokens else state.key.token(state.user(), jti=uuid.uuid4().hex)
+    return await _timed(client.get("/api/routines/", params={"limit": 1}, headers={"Authorization": f"Bearer {token}"}))
+
+
+OPERATIONS: dict[str, Callable[[httpx.AsyncClient, LoadState], Awaitable[tuple[float, int]]]] = {
+    "list": op_list,
+    "get": op_get,
+    "create": op_create,
+    "patch": op_patch,
+    "delete": op_delete,
+    "auth": op_auth,
+}
+
+
+async def run_scenario(
+    url: str, state: LoadState, weights: dict[str, int], requests: int, concurrency: int
+) -> dict[str, float]:
+    names = list(weights)
+    plan = state.rng.choices(names, weights=[weights[n] for n in names], k=requests)
+    state.mint_fresh_tokens(plan.count("auth"))
+    latencies: list[float] = []
+    errors = 0
+    work = iter(plan)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def worker() -> None:
+            nonlocal errors
+            for name in work:
+                elapsed, status = await OPERATIONS[name](client, state)
+                latencies.append(elapsed)
+                errors += status >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+async def seed_routines(url: str, state: LoadState, per_user: int) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        await asyncio.gather(*(
+            _create(client, state, user) for user in state.users for _ in range(per_user)
+        ))
+
+
+def compare(name: str, result: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    """Regressions of ``result`` against ``baseline`` beyond ``tolerance``."""
+    if baseline is None:
+        return []
+    problems = []
+    if result["rps"] < baseline["rps"] * (1 - tolerance):
+        problems.append(f"rps {result['rps']} < {baseline['rps']}")
+    for key in ("p95_ms", "p99_ms"):
+        if result[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {result[key]} > {baseline[key]}")
+    if result["errors"] > baseline["errors"]:
+        problems.append(f"errors {result['errors']} > {baseline['errors']}")
+    return [f"{name}: {problem}" for problem in problems]
+
+
+def load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, baseline: dict, meta: dict, results: dict[str, dict]) -> None:
+    scenarios = {**baseline.get("scenarios", {}), **results}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta, "scenarios": scenarios}, indent=2) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test with baselines")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed-routines", type=int, default=20, help="Routines created per user before the run")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected stub PostgREST latency")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    key = stub_jwks.SigningKey()
+    baseline_path = Path(args.baseline)
+    baseline = load_baseline(baseline_path)
+    meta = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "latency_ms": args.latency_ms,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+    }
+    if baseline and baseline.get("meta", {}) != meta:
+        print(f"note: baseline was recorded with {baseline.get('meta')}")
+
+    with ServerProcess(stub_postgrest.build_app, args.latency_ms) as postgrest, \
+            ServerProcess(stub_jwks.build_app, key.private_pem) as jwks:
+        os.environ["SUPABASE_URL"] = postgrest.url
+        os.environ["CLERK_JWKS_URL"] = f"{jwks.url}{stub_jwks.JWKS_PATH}"
+        os.environ["LOG_LEVEL"] = "WARNING"
+        with ServerProcess(build_backend) as backend:
+            state = LoadState(key, args.users, args.seed)
+            asyncio.run(seed_routines(backend.url, state, args.seed_routines))
+            print(
+                f"{len(names)} scenarios x {args.requests} requests, concurrency {args.concurrency}, "
+                f"{args.users} users, stub latency {args.latency_ms} ms"
+            )
+
+            results: dict[str, dict] = {}
+            regressions: list[str] = []
+            for name in names:
+                result = asyncio.run(run_scenario(backend.url, state, SCENARIOS[name], args.requests, args.concurrency))
+                results[name] = result
+                found = compare(name, result, baseline.get("scenarios", {}).get(name), args.tolerance)
+                regressions.extend(found)
+                print(
+                    f"{name:<7} {result['rps']:>8.1f} req/s   p50 {result['p50_ms']:7.2f} ms   "
+                    f"p95 {result['p95_ms']:7.2f} ms   p99 {result['p99_ms']:7.2f} ms   "
+                    f"errors {result['errors']:4d}   {'REGRESSION' if found else 'ok'}"
+                )
+
+    if args.save_baseline:
+        save_baseline(baseline_path, baseline, meta, results)
+        print(f"Baseline saved to {baseline_path}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        if not args.save_baseline:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Measure request throughput with blocking vs queued logging.
+
+Every request goes through ``get_current_user``, which logs "User
+authenticated" at INFO. JWT verification is replaced by an instant stand-in
+and log output goes to a stream whose writes take ``--write-ms`` (a slow
+terminal, pipe or container log driver). Three logging setups are compared:
+
+- ``sync-text``: the stream handler writes in the request's thread
+- ``queue-json``: JSON records written by the background listener thread
+- ``queue-sampled``: as above, keeping 1 in 100 "User authenticated" records
+
+Usage::
+
+    python -m benchmarks.logging_throughput --requests 5000 --concurrency 50 --write-ms 0.2
+"""
+import argparse
+import asyncio
+import io
+import logging
+import time
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+import httpx
+from fastapi import Depends, FastAPI
+from app.core import auth
+from app.core.logging import logging_stats, setup_logging, stop_listener
+
+MODES = {
+    "sync-text": dict(fmt="text", use_queue=False),
+    "queue-json": dict(fmt="json", use_queue=True),
+    "queue-sampled": dict(fmt="json", use_queue=True, sample_rates={"auth.user_authenticated": 0.01}),
+}
+
+
+class SlowStream(io.TextIOBase):
+    """Text stream whose every write blocks for a fixed time."""
+
+    def __init__(self, write_ms: float):
+        self.write_s = write_ms / 1000
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.write_s)
+        self.lines += text.count("\n")
+        return len(text)
+
+
+async def fake_verify(token: str) -> dict:
+    return {"sub": f"user_{token}", "email": ""}
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: dict = Depends(auth.get_current_user)):
+        return user
+
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            for i in remaining:
+                start = time.perf_counter()
+                response = await client.get("/me", headers={"Authorization": f"Bearer {i % 100}"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Request throughput with blocking vs queued logging")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--write-ms", type=float, default=0.2, help="Latency of one write to the log stream")
+    args = parser.parse_args()
+
+    auth.verify_clerk_jwt = fake_verify
+    app = build_app()
+    asyncio.run(run(app, 200, args.concurrency))  # warm-up
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.write_ms} ms per log write")
+
+    for name, options in MODES.items():
+        stream = SlowStream(args.write_ms)
+        setup_logging("INFO", stream=stream, **options)
+        logging.getLogger("httpx").setLevel(logging.WARNING)  # client-side request logs
+        elapsed, latencies = asyncio.run(run(app, args.requests, args.concurrency))
+        stats = logging_stats()
+        stop_listener()  # flush, so the line count is final
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(
+            f"{name:<14} {args.requests / elapsed:8.0f} req/s   p99 {p99:7.2f} ms   "
+            f"lines written {stream.lines:6d}   dropped {stats['dropped']:5d}   sampled out {stats['sampled_out']:5d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure single-flight reads under a thundering herd of identical requests.
+
+Each wave fires ``--clients`` concurrent reads of the same routine and the
+same per-user list (a shared timetable opened by a whole class at once)
+against the local stub PostgREST server, first straight through
+``RoutinesRepo`` and then through ``CoalescingRoutinesRepo``. Reports
+backend calls made, calls saved and per-read latency.
+
+Usage::
+
+    python -m benchmarks.read_coalescing --clients 500 --waves 20 --latency-ms 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+from benchmarks.stub_postgrest import ServerProcess, build_app
+from app.core.supabase_client import create_async_db
+from app.repos.coalescing_routines_repo import CoalescingRoutinesRepo
+from app.repos.routines_repo import RoutinesRepo
+
+USER_ID = "user_bench"
+
+
+class CountingRepo(RoutinesRepo):
+    """RoutinesRepo that counts the queries it sends."""
+
+    def __init__(self, db):
+        super().__init__(db=db)
+        self.queries = 0
+
+    async def get_routine(self, routine_id: int):
+        self.queries += 1
+        return await super().get_routine(routine_id)
+
+    async def list_routines(self, *args, **kwargs):
+        self.queries += 1
+        return await super().list_routines(*args, **kwargs)
+
+
+async def run(url: str, mode: str, clients: int, waves: int, pool: int) -> None:
+    db = create_async_db(url, "stub", max_connections=pool, max_keepalive_connections=pool)
+    backend = CountingRepo(db)
+    repo = CoalescingRoutinesRepo(backend) if mode == "coalesced" else backend
+    routine_id = (await backend.list_routines(1, user_id=USER_ID))[0]["id"]
+    backend.queries = 0
+
+    async def read(i: int) -> float:
+        start = time.perf_counter()
+        if i % 2:
+            await repo.get_routine(routine_id)
+        else:
+            await repo.list_routines(50, user_id=USER_ID)
+        return time.perf_counter() - start
+
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(waves):
+        latencies.extend(await asyncio.gather(*(read(i) for i in range(clients))))
+    elapsed = time.perf_counter() - start
+    await db.aclose()
+
+    q = statistics.quantiles(latencies, n=100)
+    reads = len(latencies)
+    print(
+        f"{mode:<10} {reads / elapsed:>9.1f} reads/s   backend calls {backend.queries:>6}"
+        f" ({reads - backend.queries} saved)   p50 {q[49] * 1000:7.2f} ms   p99 {q[98] * 1000:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Single-flight reads under a thundering herd")
+    parser.add_argument("--clients", type=int, default=500, help="Concurrent identical reads per wave")
+    parser.add_argument("--waves", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected stub round-trip latency")
+    parser.add_argument("--pool", type=int, default=100, help="HTTP connections to the stub")
+    args = parser.parse_args()
+
+    with ServerProcess(build_app, args.latency_ms, 200, USER_ID) as server:
+        print(f"{args.waves} waves x {args.clients} identical reads, stub latency {args.latency_ms} ms")
+        for mode in ("direct", "coalesced"):
+            asyncio.run(run(server.url, mode, args.clients, args.waves, args.pool))
+
+
+if __name__ == "__main__":
+    main()
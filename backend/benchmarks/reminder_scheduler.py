@@ -0,0 +1,114 @@
+"""Measure the reminder scheduler at hundreds of thousands of pending reminders.
+
+Builds a ``ReminderScheduler`` on a simulated clock with a ``MemorySink``,
+schedules one class reminder per routine for ``--routines`` routines spread
+over the week, then reports:
+
+- schedule, reschedule (routine edits) and cancel rates
+- memory held per pending reminder (tracemalloc, on a sample)
+- a simulated day of 1 s ticks: tick cost (mean and worst, including
+  cascades) and delivered notifications/batches
+
+Usage::
+
+    python -m benchmarks.reminder_scheduler --routines 500000 --users 20000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+from app.core.reminders import MemorySink, ReminderScheduler
+
+START = 1_767_571_200.0  # Monday 2026-01-05 00:00 UTC
+
+
+def make_routines(count: int, users: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "user_id": f"user_{rng.randrange(users)}",
+            "title": f"Course {i}",
+            "weekday": rng.randrange(7),
+            "start_minute": rng.randrange(8 * 60, 18 * 60, 5),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f}/s  ({seconds * 1e6 / count:.2f} us each)"
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    routines = make_routines(args.routines, args.users, rng)
+    sink = MemorySink(max_entries=1000)
+    scheduler = ReminderScheduler(sink, lead_minutes=10, batch_size=args.batch_size, now=START)
+
+    started = time.perf_counter()
+    for routine in routines:
+        scheduler.add_routine(routine, START)
+    elapsed = time.perf_counter() - started
+    print(f"{len(scheduler):,} reminders for {args.users:,} users")
+    print(f"schedule      {rate(len(routines), elapsed)}")
+
+    # Memory is traced on a second scheduler: tracing slows every allocation
+    sample = routines[:args.memory_sample]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    traced = ReminderScheduler(MemorySink(), lead_minutes=10, now=START)
+    for routine in sample:
+        traced.add_routine(routine, START)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    per_reminder = held / len(traced)
+    print(f"memory        {per_reminder:.0f} bytes per reminder  (~{per_reminder * len(scheduler) / 2**20:,.0f} MiB in total)")
+    del traced
+
+    edits = rng.sample(routines, min(args.edits, len(routines)))
+    started = time.perf_counter()
+    for routine in edits:
+        routine["start_minute"] = rng.randrange(8 * 60, 18 * 60, 5)
+        scheduler.add_routine(routine, START)
+    print(f"reschedule    {rate(len(edits), time.perf_counter() - started)}")
+
+    cancelled = rng.sample(routines, min(args.edits, len(routines)))
+    started = time.perf_counter()
+    for routine in cancelled:
+        scheduler.remove_routine(routine["id"])
+    print(f"cancel        {rate(len(cancelled), time.perf_counter() - started)}")
+
+    ticks: list[float] = []
+    fired = 0
+    now = START
+    for _ in range(args.hours * 3600):
+        now += 1
+        started = time.perf_counter()
+        fired += await scheduler.fire_due(now)
+        ticks.append(time.perf_counter() - started)
+    busiest = max(ticks)
+    print(
+        f"{args.hours} h of 1 s ticks: {fired:,} delivered in {sink.batches:,} batches, "
+        f"tick mean {statistics.fmean(ticks) * 1e6:.1f} us, worst {busiest * 1000:.2f} ms"
+    )
+    print(f"still pending {len(scheduler):,} (weekly reminders re-armed after firing)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reminder scheduler scale test")
+    parser.add_argument("--routines", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--edits", type=int, default=50_000, help="Routines rescheduled, then cancelled")
+    parser.add_argument("--hours", type=int, default=24, help="Simulated hours of ticking")
+    parser.add_argument("--memory-sample", type=int, default=100_000, help="Reminders traced for the memory figure")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
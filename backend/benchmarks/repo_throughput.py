@@ -0,0 +1,90 @@
+"""Compare the sync threadpool data path with the async pooled RoutinesRepo.
+
+Both paths run the same ``list_routines`` query against the local stub
+PostgREST server. The sync path mirrors the previous behaviour: a shared
+synchronous client called from a 40-thread pool (Starlette's default
+threadpool size). The async path drives ``RoutinesRepo`` over one pooled
+HTTP client from a single event loop.
+
+Usage::
+
+    python -m benchmarks.repo_throughput --requests 2000 --concurrency 200 --latency-ms 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+from postgrest import SyncPostgrestClient
+from benchmarks.stub_postgrest import ServerProcess, build_app
+from app.core.supabase_client import create_async_db
+from app.repos.routines_repo import RoutinesRepo
+
+USER_ID = "user_bench"
+
+
+def _report(name: str, latencies: list[float], elapsed: float) -> None:
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<6} {len(latencies) / elapsed:>9.1f} req/s   "
+        f"p50 {q[49] * 1000:7.2f} ms   p95 {q[94] * 1000:7.2f} ms   p99 {q[98] * 1000:7.2f} ms"
+    )
+
+
+def run_sync(url: str, requests: int, threads: int, limit: int) -> None:
+    client = SyncPostgrestClient(f"{url}/rest/v1", headers={"apikey": "stub", "Authorization": "Bearer stub"})
+
+    def call() -> float:
+        start = time.perf_counter()
+        client.table("routines").select("*").eq("user_id", USER_ID).limit(limit).execute()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: call(), range(threads)))  # warm up connections
+        start = time.perf_counter()
+        latencies = list(pool.map(lambda _: call(), range(requests)))
+        elapsed = time.perf_counter() - start
+    client.session.close()
+    _report("sync", latencies, elapsed)
+
+
+async def run_async(url: str, requests: int, concurrency: int, limit: int) -> None:
+    db = create_async_db(url, "stub", max_connections=concurrency, max_keepalive_connections=concurrency)
+    repo = RoutinesRepo(db=db)
+    gate = asyncio.Semaphore(concurrency)
+
+    async def call() -> float:
+        async with gate:
+            start = time.perf_counter()
+            await repo.list_routines(limit, user_id=USER_ID)
+            return time.perf_counter() - start
+
+    await asyncio.gather(*(call() for _ in range(concurrency)))  # warm up connections
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    await db.aclose()
+    _report("async", list(latencies), elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync vs async RoutinesRepo throughput")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200, help="In-flight requests on the async path")
+    parser.add_argument("--threads", type=int, default=40, help="Threadpool size on the sync path")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected stub round-trip latency")
+    parser.add_argument("--rows", type=int, default=200, help="Routines seeded for the benchmark user")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with ServerProcess(build_app, args.latency_ms, args.rows, USER_ID) as server:
+        print(f"stub PostgREST at {server.url}, {args.latency_ms} ms injected latency")
+        run_sync(server.url, args.requests, args.threads, args.limit)
+        asyncio.run(run_async(server.url, args.requests, args.concurrency, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure cold-start time of the backend in fresh interpreters.
+
+Each run starts a new Python process that imports ``app.main``, runs the
+lifespan startup and serves a first ``GET /health``, timing each step. The
+script also reports which heavy optional modules were loaded by then; the
+Supabase SDK, numpy, langchain and the async database drivers should all
+stay unloaded until a request actually needs them.
+
+Usage::
+
+    python -m benchmarks.startup_time --runs 10 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import benchmarks  # noqa: F401  (offline settings defaults)
+
+# Modules that are only needed by some routes and must not load at startup
+DEFERRED_MODULES = [
+    "supabase",
+    "numpy",
+    "langchain_openai",
+    "langchain_core",
+    "sqlalchemy.ext.asyncio",
+    "asyncpg",
+    "psycopg2",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    client.get("/health").raise_for_status()
+    served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - client_ready) * 1000,
+    "first_request_ms": (served - started) * 1000,
+    "total_ms": (served - start) * 1000 - (client_ready - imported) * 1000,
+    "modules": len(sys.modules),
+    "loaded": [name for name in DEFERRED if name in sys.modules],
+}))
+"""
+
+
+def probe(env: dict[str, str]) -> dict:
+    code = f"DEFERRED = {DEFERRED_MODULES!r}\n{PROBE}"
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(env: dict[str, str], top: int) -> list[tuple[int, str]]:
+    """Slowest modules imported directly by app.main, by cumulative import time."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct imports of app.main: one nesting level (two spaces) deep
+        if (len(name) - len(name.lstrip()) - 1) // 2 == 1:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backend cold-start time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest direct imports of app.main (0 to skip)")
+    args = parser.parse_args()
+
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    probe(env)  # warm the OS file cache and bytecode
+
+    results = [probe(env) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts (fresh interpreter each)")
+    for key in ("import_ms", "startup_ms", "first_request_ms", "total_ms"):
+        values = [r[key] for r in results]
+        print(f"{key:<17} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+    print(f"modules loaded    {results[-1]['modules']}")
+    loaded = results[-1]["loaded"]
+    print(f"deferred modules  {'all deferred' if not loaded else 'LOADED at startup: ' + ', '.join(loaded)}")
+
+    if args.top:
+        print("\nslowest imports of app.main (cumulative, -X importtime):")
+        for micros, name in import_profile(env, args.top):
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
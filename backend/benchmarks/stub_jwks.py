@@ -0,0 +1,103 @@
+"""Local stand-in for Clerk's JWKS endpoint, with a test signing key.
+
+Serves ``/.well-known/jwks.json`` for one RSA key and signs RS256 tokens
+with it, so ``ClerkJWKS`` and ``verify_clerk_jwt`` run unmodified against a
+local URL. The key is generated on first use and can be kept in a PEM
+file, so tokens minted by one process verify in another.
+
+Run standalone::
+
+    python -m benchmarks.stub_jwks --port 54322 --key-file data/bench_jwks.pem
+    python -m benchmarks.stub_jwks --key-file data/bench_jwks.pem --token user_1
+"""
+import argparse
+import base64
+import time
+from pathlib import Path
+
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+JWKS_PATH = "/.well-known/jwks.json"
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class SigningKey:
+    """An RSA key pair that signs test tokens and publishes itself as a JWK."""
+
+    def __init__(self, private_pem: bytes | None = None, kid: str = "bench-key-1"):
+        if private_pem is None:
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            private_pem = private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        else:
+            private_key = serialization.load_pem_private_key(private_pem, password=None)
+        self.private_pem = private_pem
+        self.kid = kid
+        numbers = private_key.public_key().public_numbers()
+        self.jwk = {
+            "kty": "RSA",
+            "use": "sig",
+            "alg": "RS256",
+            "kid": kid,
+            "n": _b64url_uint(numbers.n),
+            "e": _b64url_uint(numbers.e),
+        }
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "SigningKey":
+        """Load the key from a PEM file, creating the file on first use."""
+        path = Path(path)
+        if path.exists():
+            return cls(path.read_bytes())
+        key = cls()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(key.private_pem)
+        return key
+
+    def token(self, sub: str, email: str = "", ttl: float = 3600, **claims) -> str:
+        """Sign a Clerk-like session token for ``sub``."""
+        now = int(time.time())
+        payload = {"sub": sub, "email": email, "iat": now, "nbf": now, "exp": now + int(ttl), **claims}
+        return jwt.encode(payload, self.private_pem.decode(), algorithm="RS256", headers={"kid": self.kid})
+
+
+def build_app(private_pem: bytes) -> Starlette:
+    """Build the JWKS app for a key (used as a ServerProcess factory)."""
+    jwks = {"keys": [SigningKey(private_pem).jwk]}
+
+    async def handle(request):
+        return JSONResponse(jwks, headers={"Cache-Control": "public, max-age=3600"})
+
+    return Starlette(routes=[Route(JWKS_PATH, handle)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54322)
+    parser.add_argument("--key-file", default="data/bench_jwks.pem")
+    parser.add_argument("--token", metavar="SUB", help="Print a signed token for SUB and exit")
+    args = parser.parse_args()
+
+    key = SigningKey.from_file(args.key_file)
+    if args.token:
+        print(key.token(args.token))
+        return
+    uvicorn.run(build_app(key.private_pem), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
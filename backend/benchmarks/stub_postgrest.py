@@ -0,0 +1,367 @@
+"""Local stand-in for the Supabase PostgREST API.
+
+Implements the subset of PostgREST used by ``RoutinesRepo``: ``select``
+projection, ``eq/neq/gt/gte/lt/lte/in/is/like/ilike`` filters (optionally
+negated with ``not.``), ``or=(...)``/``and(...)`` groups, ``order``,
+``limit``/``offset``, inserts (single and multi-row), upserts with
+``on_conflict``, and filtered PATCH/DELETE. Rows live in memory.
+
+An artificial per-request latency can be injected to mimic the network
+round-trip to a hosted Supabase project.
+
+Run standalone::
+
+    python -m benchmarks.stub_postgrest --port 54321 --latency-ms 20 --seed 1000
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top_level(expr: str) -> list[str]:
+    """Split on commas that are not nested in parentheses or quotes."""
+    parts, depth, quoted, escaped, current = [], 0, False, False, []
+    for ch in expr:
+        if escaped:
+            escaped = False
+        elif quoted and ch == "\\":
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _compare(value: Any, arg: str) -> int | None:
+    """Three-way compare a stored value with a filter argument."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        left, right = str(value).lower(), arg.lower()
+    elif isinstance(value, (int, float)):
+        try:
+            left, right = float(value), float(arg)
+        except ValueError:
+            return None
+    else:
+        left, right = str(value), _unquote(arg)
+    return (left > right) - (left < right)
+
+
+def _like(value: Any, pattern: str, flags: int = 0) -> bool:
+    if value is None:
+        return False
+    regex = re.escape(_unquote(pattern)).replace(r"\*", ".*").replace("%", ".*")
+    return re.fullmatch(regex, str(value), flags) is not None
+
+
+def _condition(column: str, expr: str) -> Callable[[dict], bool]:
+    """Build a row predicate from ``column`` and ``op.argument``."""
+    negate = False
+    if expr.startswith("not."):
+        negate, expr = True, expr[4:]
+    op, _, arg = expr.partition(".")
+
+    def test(row: dict) -> bool:
+        value = row.get(column)
+        if op == "eq":
+            return _compare(value, arg) == 0
+        if op == "neq":
+            return _compare(value, arg) not in (0, None)
+        if op in ("gt", "gte", "lt", "lte"):
+            result = _compare(value, arg)
+            if result is None:
+                return False
+            return {"gt": result > 0, "gte": result >= 0, "lt": result < 0, "lte": result <= 0}[op]
+        if op == "in":
+            options = [_unquote(v) for v in _split_top_level(arg.strip("()"))]
+            return any(_compare(value, option) == 0 for option in options)
+        if op == "is":
+            if arg == "null":
+                return value is None
+            return value is (arg == "true")
+        if op == "like":
+            return _like(value, arg)
+        if op == "ilike":
+            return _like(value, arg, re.IGNORECASE)
+        raise ValueError(f"Unsupported operator: {op}")
+
+    return (lambda row: not test(row)) if negate else test
+
+
+def _group(expr: str, combine: Callable) -> Callable[[dict], bool]:
+    """Build a predicate for the body of an ``or(...)``/``and(...)`` group."""
+    predicates = []
+    for part in _split_top_level(expr.strip()[1:-1]):
+        part = part.strip()
+        if part.startswith("or("):
+            predicates.append(_group(part[2:], any))
+        elif part.startswith("and("):
+            predicates.append(_group(part[3:], all))
+        else:
+            column, _, rest = part.partition(".")
+            predicates.append(_condition(column, rest))
+    return lambda row: combine(p(row) for p in predicates)
+
+
+class StubTable:
+    """In-memory table with an auto-incrementing integer ``id``."""
+
+    def __init__(self):
+        self.rows: dict[int, dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    def insert(self, payload: dict[str, Any]) -> dict[str, Any]:
+        row = dict(payload)
+        row.setdefault("id", next(self._ids))
+        row.setdefault("created_at", _now_iso())
+        row.setdefault("updated_at", row["created_at"])
+        self.rows[row["id"]] = row
+        return row
+
+
+class StubPostgrest:
+    """Starlette application serving ``/rest/v1/{table}``."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.tables: dict[str, StubTable] = {}
+        self.request_count = 0
+        self.app = Starlette(routes=[
+            Route("/rest/v1/{table}", self.handle, methods=["GET", "POST", "PATCH", "DELETE"]),
+        ])
+
+    def table(self, name: str) -> StubTable:
+        return self.tables.setdefault(name, StubTable())
+
+    def seed(self, user_id: str, count: int, table: str = "routines") -> None:
+        """Insert ``count`` routines owned by ``user_id``."""
+        target = self.table(table)
+        for i in range(count):
+            hour = 8 + i % 9
+            target.insert({
+                "title": f"Course {i % 40} section {i}",
+                "time": f"{(hour - 1) % 12 + 1:02d}:00 {'AM' if hour < 12 else 'PM'}",
+                "section_id": i % 7,
+                "user_id": user_id,
+            })
+
+    @staticmethod
+    def _predicate(request: Request) -> Callable[[dict], bool]:
+        predicates = []
+        for key, value in request.query_params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key == "or":
+                predicates.append(_group(value, any))
+            elif key == "and":
+                predicates.append(_group(value, all))
+            else:
+                predicates.append(_condition(key, value))
+        return lambda row: all(p(row) for p in predicates)
+
+    @staticmethod
+    def _project(rows: list[dict], select: str | None) -> list[dict]:
+        if not select or select == "*":
+            return rows
+        columns = [c.strip() for c in select.split(",") if c.strip()]
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    @staticmethod
+    def _order(rows: list[dict], order: str | None) -> list[dict]:
+        if not order:
+            return rows
+        for term in reversed(order.split(",")):
+            column, _, direction = term.partition(".")
+            descending = direction.startswith("desc")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=descending)
+            rows = present + missing
+        return rows
+
+    async def handle(self, request: Request) -> Response:
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        table = self.table(request.path_params["table"])
+        params = request.query_params
+        prefer = request.headers.get("prefer", "")
+        minimal = "return=minimal" in prefer
+
+        try:
+            matches = self._predicate(request)
+            if request.method == "GET":
+                rows = [r for r in table.rows.values() if matches(r)]
+                rows = self._order(rows, params.get("order"))
+                offset = int(params.get("offset", 0))
+                limit = params.get("limit")
+                rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+                return JSONResponse(self._project(rows, params.get("select")))
+
+            if request.method == "POST":
+                body = await request.json()
+                payloads = body if isinstance(body, list) else [body]
+                conflict = params.get("on_conflict") if "resolution=merge-duplicates" in prefer else None
+                rows = []
+                for payload in payloads:
+                    existing = None
+                    if conflict:
+                        existing = next(
+                            (r for r in table.rows.values() if r.get(conflict) == payload.get(conflict)),
+                            None,
+                        )
+                    if existing is not None:
+                        existing.update(payload)
+                        existing["updated_at"] = _now_iso()
+                        rows.append(existing)
+                    else:
+                        rows.append(table.insert(payload))
+                if minimal:
+                    return Response(status_code=201)
+                return JSONResponse(self._project(rows, params.get("select")), status_code=201)
+
+            if request.method == "PATCH":
+                payload = await request.json()
+                rows = [r for r in table.rows.values() if matches(r)]
+                for row in rows:
+                    row.update(payload)
+                    row["updated_at"] = _now_iso()  # mirrors the updated_at trigger
+                if minimal:
+                    return Response(status_code=204)
+                return JSONResponse(self._project(rows, params.get("select")))
+
+            rows = [r for r in table.rows.values() if matches(r)]
+            for row in rows:
+                del table.rows[row["id"]]
+            if minimal:
+                return Response(status_code=204)
+            return JSONResponse(self._project(rows, params.get("select")))
+        except ValueError as e:
+            return JSONResponse({"code": "PGRST100", "message": str(e)}, status_code=400)
+
+
+class ServerThread:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        sock = self.server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def _serve(factory: Callable, args: tuple, host: str, port: int) -> None:
+    uvicorn.run(factory(*args), host=host, port=port, log_level="warning")
+
+
+class ServerProcess:
+    """
+    Run an ASGI app in a child process so it does not share the GIL with
+    the load generator. ``factory(*args)`` must build the app.
+    """
+
+    def __init__(self, factory: Callable, *args: Any, host: str = "127.0.0.1"):
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            self.port = sock.getsockname()[1]
+        self.host = host
+        self.process = multiprocessing.Process(
+            target=_serve, args=(factory, args, host, self.port), daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self) -> "ServerProcess":
+        self.process.start()
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((self.host, self.port), timeout=0.1).close()
+                return self
+            except OSError:
+                time.sleep(0.05)
+        self.process.kill()
+        raise RuntimeError("Stub server did not start")
+
+    def __exit__(self, *exc) -> None:
+        self.process.terminate()
+        self.process.join()
+
+
+def build_app(latency_ms: float = 0.0, seed: int = 0, seed_user: str = "user_bench") -> Starlette:
+    """Build a seeded stub app (used as a ServerProcess factory)."""
+    stub = StubPostgrest(latency_ms=latency_ms)
+    stub.seed(seed_user, seed)
+    return stub.app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0, help="Routines to pre-create")
+    parser.add_argument("--seed-user", default="user_bench")
+    args = parser.parse_args()
+
+    app = build_app(args.latency_ms, args.seed, args.seed_user)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+-- ============================================
+-- Routines Keyset Pagination Index
+-- ============================================
+-- GET /api/routines/ pages through a user's routines ordered by
+-- (created_at, id) and continues after the last row of the previous page.
+-- This composite index lets Postgres answer every page, however deep,
+-- with a single index range scan instead of sorting or skipping rows.
+-- PostgREST cannot express the row comparison (created_at, id) > (...),
+-- so the API sends it as an OR plus a redundant created_at >= bound;
+-- without that bound the OR is applied as a filter and the scan starts
+-- at the user's first row.
+--
+-- Run this in your Supabase SQL Editor
+
+-- Step 1: Composite index matching the keyset order
+CREATE INDEX IF NOT EXISTS idx_routines_user_id_created_at_id
+ON public.routines(user_id, created_at, id);
+
+-- ============================================
+-- Verification Queries
+-- ============================================
+-- Run these to verify the migration was successful:
+
+-- Check if index exists
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE schemaname = 'public' 
+  AND tablename = 'routines'
+  AND indexname = 'idx_routines_user_id_created_at_id';
+
+-- Check the plan of a deep page (should show an Index Scan, no Sort)
+-- EXPLAIN ANALYZE
+-- SELECT * FROM public.routines
+-- WHERE user_id = 'user_xxx'
+--   AND created_at >= '2025-01-01T00:00:00+00:00'
+--   AND (created_at > '2025-01-01T00:00:00+00:00'
+--        OR (created_at = '2025-01-01T00:00:00+00:00' AND id > 1000))
+-- ORDER BY created_at, id
+-- LIMIT 50;
+
+-- ============================================
+-- Rollback (if needed)
+-- ============================================
+-- Uncomment and run this if you need to undo the migration:
+
+-- DROP INDEX IF EXISTS idx_routines_user_id_created_at_id;
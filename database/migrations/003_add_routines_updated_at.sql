@@ -0,0 +1,62 @@
+-- ============================================
+-- Routines updated_at Column
+-- ============================================
+-- The routines API derives strong ETags from (id, updated_at) and makes
+-- If-Match PATCH/DELETE requests conditional on updated_at, so every row
+-- needs a timestamp that changes on each update.
+--
+-- Run this in your Supabase SQL Editor
+
+-- Step 1: Add updated_at column (existing rows start at their created_at)
+ALTER TABLE public.routines 
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+
+UPDATE public.routines 
+SET updated_at = COALESCE(created_at, now()) 
+WHERE updated_at IS NULL;
+
+ALTER TABLE public.routines 
+ALTER COLUMN updated_at SET DEFAULT now(),
+ALTER COLUMN updated_at SET NOT NULL;
+
+-- Step 2: Bump updated_at on every update
+CREATE OR REPLACE FUNCTION public.set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = clock_timestamp();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_routines_set_updated_at ON public.routines;
+CREATE TRIGGER trg_routines_set_updated_at
+BEFORE UPDATE ON public.routines
+FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+-- ============================================
+-- Verification Queries
+-- ============================================
+-- Run these to verify the migration was successful:
+
+-- Check if updated_at column exists
+SELECT column_name, data_type, is_nullable, column_default
+FROM information_schema.columns
+WHERE table_schema = 'public' 
+  AND table_name = 'routines' 
+  AND column_name = 'updated_at';
+
+-- Check if trigger exists
+SELECT trigger_name, action_timing, event_manipulation
+FROM information_schema.triggers
+WHERE event_object_schema = 'public' 
+  AND event_object_table = 'routines'
+  AND trigger_name = 'trg_routines_set_updated_at';
+
+-- ============================================
+-- Rollback (if needed)
+-- ============================================
+-- Uncomment and run these if you need to undo the migration:
+
+-- DROP TRIGGER IF EXISTS trg_routines_set_updated_at ON public.routines;
+-- DROP FUNCTION IF EXISTS public.set_updated_at();
+-- ALTER TABLE public.routines DROP COLUMN IF EXISTS updated_at;
@@ -0,0 +1,39 @@
+-- ============================================
+-- Routines Schedule Columns
+-- ============================================
+-- Adds the columns the timetable conflict engine works on: the day of
+-- the week, the teacher, the batch attending and the room. A routine
+-- clashes with another when both book the same teacher, batch or room
+-- at overlapping times on the same day.
+--
+-- Run this in your Supabase SQL Editor
+
+-- Step 1: Add schedule columns (all optional, existing rows are unaffected)
+ALTER TABLE public.routines 
+ADD COLUMN IF NOT EXISTS day TEXT,
+ADD COLUMN IF NOT EXISTS teacher TEXT,
+ADD COLUMN IF NOT EXISTS batch_id INTEGER,
+ADD COLUMN IF NOT EXISTS room TEXT;
+
+-- ============================================
+-- Verification Queries
+-- ============================================
+-- Run these to verify the migration was successful:
+
+-- Check if the columns exist
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_schema = 'public' 
+  AND table_name = 'routines' 
+  AND column_name IN ('day', 'teacher', 'batch_id', 'room');
+
+-- ============================================
+-- Rollback (if needed)
+-- ============================================
+-- Uncomment and run these if you need to undo the migration:
+
+-- ALTER TABLE public.routines 
+-- DROP COLUMN IF EXISTS room,
+-- DROP COLUMN IF EXISTS batch_id,
+-- DROP COLUMN IF EXISTS teacher,
+-- DROP COLUMN IF EXISTS day;
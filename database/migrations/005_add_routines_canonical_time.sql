@@ -0,0 +1,157 @@
+-- ============================================
+-- Routines Canonical Time Columns
+-- ============================================
+-- day and time are free-form text ('Monday', '09:00 AM', '9:00 - 10:30 AM'),
+-- which cannot be range-queried or sorted. This migration stores their
+-- parsed form next to them:
+--
+--   weekday       0 = Monday ... 6 = Sunday
+--   start_minute  minutes since midnight, inclusive
+--   end_minute    minutes since midnight, exclusive
+--
+-- The API fills these on every write (app/core/timeparse.py). Existing
+-- rows are backfilled here with the same rules: a single time lasts 60
+-- minutes (ROUTINE_DEFAULT_DURATION_MINUTES), and in a range an AM/PM on
+-- the end time also applies to the start. Values that cannot be parsed
+-- are left NULL.
+--
+-- Run this in your Supabase SQL Editor
+
+-- Step 1: Add canonical columns
+ALTER TABLE public.routines
+ADD COLUMN IF NOT EXISTS weekday SMALLINT CHECK (weekday BETWEEN 0 AND 6),
+ADD COLUMN IF NOT EXISTS start_minute SMALLINT CHECK (start_minute BETWEEN 0 AND 1439),
+ADD COLUMN IF NOT EXISTS end_minute SMALLINT CHECK (end_minute BETWEEN 1 AND 1440);
+
+-- Step 2: Temporary parsing helpers for the backfill
+CREATE OR REPLACE FUNCTION pg_temp.routine_weekday(value TEXT)
+RETURNS SMALLINT AS $$
+  SELECT CASE lower(rtrim(trim(value), '.'))
+    WHEN 'monday' THEN 0 WHEN 'mon' THEN 0
+    WHEN 'tuesday' THEN 1 WHEN 'tue' THEN 1 WHEN 'tues' THEN 1
+    WHEN 'wednesday' THEN 2 WHEN 'wed' THEN 2
+    WHEN 'thursday' THEN 3 WHEN 'thu' THEN 3 WHEN 'thur' THEN 3 WHEN 'thurs' THEN 3
+    WHEN 'friday' THEN 4 WHEN 'fri' THEN 4
+    WHEN 'saturday' THEN 5 WHEN 'sat' THEN 5
+    WHEN 'sunday' THEN 6 WHEN 'sun' THEN 6
+  END::SMALLINT
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Minutes since midnight of one clock time; meridiem ('a'/'p') is used
+-- when the value has no AM/PM of its own
+CREATE OR REPLACE FUNCTION pg_temp.routine_clock(value TEXT, meridiem TEXT DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+  parts TEXT[];
+  h INTEGER;
+  m INTEGER;
+  ap TEXT;
+BEGIN
+  parts := regexp_match(trim(value), '^(\d{1,2})(?:[:.](\d{2}))?(?:\s*([ap])\.?m\.?)?$', 'i');
+  IF parts IS NULL THEN
+    RETURN NULL;
+  END IF;
+  h := parts[1]::INTEGER;
+  m := COALESCE(parts[2], '0')::INTEGER;
+  ap := lower(COALESCE(parts[3], meridiem));
+  IF m > 59 THEN
+    RETURN NULL;
+  END IF;
+  IF ap IS NOT NULL THEN
+    IF h < 1 OR h > 12 THEN
+      RETURN NULL;
+    END IF;
+    h := h % 12 + CASE WHEN ap = 'p' THEN 12 ELSE 0 END;
+  ELSIF h > 23 THEN
+    RETURN NULL;
+  END IF;
+  RETURN h * 60 + m;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- [start, end) of a time or time range, or NULL
+CREATE OR REPLACE FUNCTION pg_temp.routine_span(value TEXT, default_minutes INTEGER DEFAULT 60)
+RETURNS INTEGER[] AS $$
+DECLARE
+  parts TEXT[];
+  s INTEGER;
+  e INTEGER;
+  borrowed INTEGER;
+  end_meridiem TEXT;
+BEGIN
+  IF value IS NULL OR trim(value) = '' THEN
+    RETURN NULL;
+  END IF;
+  parts := regexp_split_to_array(trim(value), '\s*(?:-|–|—|\mto\M)\s*', 'i');
+  IF array_length(parts, 1) = 1 THEN
+    s := pg_temp.routine_clock(parts[1]);
+    RETURN CASE WHEN s IS NULL THEN NULL ELSE ARRAY[s, LEAST(s + default_minutes, 1440)] END;
+  END IF;
+  IF array_length(parts, 1) <> 2 THEN
+    RETURN NULL;
+  END IF;
+  s := pg_temp.routine_clock(parts[1]);
+  e := pg_temp.routine_clock(parts[2]);
+  IF s IS NULL OR e IS NULL THEN
+    RETURN NULL;
+  END IF;
+  end_meridiem := lower((regexp_match(parts[2], '([ap])\.?m\.?$', 'i'))[1]);
+  IF end_meridiem IS NOT NULL AND parts[1] !~* '[ap]\.?m\.?$' THEN
+    borrowed := pg_temp.routine_clock(parts[1], end_meridiem);
+    IF borrowed IS NOT NULL AND borrowed <= e THEN
+      s := borrowed;
+    END IF;
+  END IF;
+  RETURN CASE WHEN e > s THEN ARRAY[s, e] ELSE NULL END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Step 3: Backfill existing rows
+UPDATE public.routines r
+SET weekday = pg_temp.routine_weekday(r.day),
+    start_minute = span[1],
+    end_minute = span[2]
+FROM (
+  SELECT id, pg_temp.routine_span(time) AS span
+  FROM public.routines
+) parsed
+WHERE parsed.id = r.id
+  AND r.start_minute IS NULL
+  AND r.weekday IS NULL;
+
+-- Step 4: Index for day / time-window filters within a user's timetable
+CREATE INDEX IF NOT EXISTS idx_routines_user_id_weekday_start_minute
+ON public.routines(user_id, weekday, start_minute);
+
+-- ============================================
+-- Verification Queries
+-- ============================================
+-- Run these to verify the migration was successful:
+
+-- Check if the columns exist
+SELECT column_name, data_type, is_nullable
+FROM information_schema.columns
+WHERE table_schema = 'public'
+  AND table_name = 'routines'
+  AND column_name IN ('weekday', 'start_minute', 'end_minute');
+
+-- Rows whose day or time could not be parsed
+SELECT id, day, time
+FROM public.routines
+WHERE (day IS NOT NULL AND weekday IS NULL)
+   OR (time IS NOT NULL AND start_minute IS NULL);
+
+-- A time-window query should use the new index
+EXPLAIN SELECT id FROM public.routines
+WHERE user_id = 'some-user' AND weekday = 0 AND start_minute < 720 AND end_minute > 540;
+
+-- ============================================
+-- Rollback (if needed)
+-- ============================================
+-- Uncomment and run these if you need to undo the migration:
+
+-- DROP INDEX IF EXISTS idx_routines_user_id_weekday_start_minute;
+-- ALTER TABLE public.routines
+-- DROP COLUMN IF EXISTS end_minute,
+-- DROP COLUMN IF EXISTS start_minute,
+-- DROP COLUMN IF EXISTS weekday;
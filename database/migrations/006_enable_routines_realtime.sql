@@ -0,0 +1,45 @@
+-- ============================================
+-- Routines Realtime Publication
+-- ============================================
+-- The routine change stream (/api/routines/stream) is fed from this
+-- worker's own writes by default. With several workers, set
+-- ROUTINES_STREAM_SOURCE=realtime so every worker listens to Supabase
+-- Realtime instead; that needs the routines table in the
+-- supabase_realtime publication.
+--
+-- REPLICA IDENTITY FULL makes DELETE events carry the whole old row,
+-- including user_id, so a delete can be routed to its owner's streams.
+-- Without it only the primary key is sent and deletes are dropped.
+--
+-- Run this in your Supabase SQL Editor
+
+-- Step 1: Log full old rows for updates and deletes
+ALTER TABLE public.routines REPLICA IDENTITY FULL;
+
+-- Step 2: Publish routine changes to Supabase Realtime
+ALTER PUBLICATION supabase_realtime ADD TABLE public.routines;
+
+-- ============================================
+-- Verification Queries
+-- ============================================
+-- Run these to verify the migration was successful:
+
+-- Replica identity should be 'f' (full)
+SELECT relname, relreplident
+FROM pg_class
+WHERE oid = 'public.routines'::regclass;
+
+-- The table should be part of the publication
+SELECT pubname, schemaname, tablename
+FROM pg_publication_tables
+WHERE pubname = 'supabase_realtime'
+  AND schemaname = 'public'
+  AND tablename = 'routines';
+
+-- ============================================
+-- Rollback (if needed)
+-- ============================================
+-- Uncomment and run these if you need to undo the migration:
+
+-- ALTER PUBLICATION supabase_realtime DROP TABLE public.routines;
+-- ALTER TABLE public.routines REPLICA IDENTITY DEFAULT;